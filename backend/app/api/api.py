@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from backend.app.api.endpoints import locations, covid, mpox
+from backend.app.api.endpoints import locations, covid, mpox, comparaison, lot, admin
 
 api_router = APIRouter()
 
@@ -20,4 +20,22 @@ api_router.include_router(
     mpox.router,
     prefix="/mpox",
     tags=["Données Mpox"]
-)
\ No newline at end of file
+)
+
+api_router.include_router(
+    comparaison.router,
+    prefix="/comparaison",
+    tags=["Comparaison COVID-19 / Mpox"]
+)
+
+api_router.include_router(
+    lot.router,
+    prefix="/lot",
+    tags=["Requêtes groupées"]
+)
+
+api_router.include_router(
+    admin.router,
+    prefix="/admin",
+    tags=["Administration"]
+)
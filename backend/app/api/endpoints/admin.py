@@ -0,0 +1,92 @@
+import os
+import secrets
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from backend.app.core.requetes_lentes import requetes_lentes
+from backend.app.core.taches import TacheEnConflit, gestionnaire_taches
+from backend.app.core.tracage import RouteTracee
+from backend.app.schemas.schemas import TacheCreate, TacheRead
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Jeton exigé dans l'en-tête X-Admin-Token ; sans jeton configuré, les routes d'administration sont fermées
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+async def verifier_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Dépendance des routes d'administration : jeton ADMIN_TOKEN obligatoire"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Routes d'administration désactivées (ADMIN_TOKEN non défini)"
+        )
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Jeton d'administration invalide"
+        )
+
+
+router = APIRouter(route_class=RouteTracee, dependencies=[Depends(verifier_admin)])
+
+#Instructions SQL lentes enregistrées, avec paramètres, durée et plan d'exécution
+@router.get("/requetes-lentes")
+async def requetes_lentes_fc(
+    limit: Optional[int] = Query(None, ge=1, description="Nombre d'enregistrements, du plus récent au plus ancien")
+) -> Dict[str, Any]:
+    return {
+        "threshold_ms": requetes_lentes.seuil_ms,
+        "total": requetes_lentes.total,
+        "queries": requetes_lentes.liste(limit),
+    }
+
+#Vider le journal des instructions lentes
+@router.delete("/requetes-lentes", status_code=status.HTTP_204_NO_CONTENT)
+async def vider_requetes_lentes_fc():
+    requetes_lentes.vider()
+
+#Lancer une tâche de fond (ETL, import COVID, import Mpox ou les trois à la suite)
+@router.post("/taches", response_model=TacheRead, status_code=status.HTTP_202_ACCEPTED)
+async def creer_tache_fc(tache: TacheCreate):
+    try:
+        return await gestionnaire_taches.creer(tache.type)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except TacheEnConflit as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+#Dernières tâches de fond, de la plus récente à la plus ancienne
+@router.get("/taches", response_model=List[TacheRead])
+async def liste_taches_fc(limit: int = Query(20, ge=1, le=200)):
+    return await gestionnaire_taches.liste(limit)
+
+#État et avancement d'une tâche de fond
+@router.get("/taches/{tache_id}", response_model=TacheRead)
+async def obtenir_tache_fc(tache_id: int):
+    tache = await gestionnaire_taches.obtenir(tache_id)
+    if tache is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Aucune tâche trouvée avec l'identifiant {tache_id}"
+        )
+    return tache
+
+#Suivre l'avancement d'une tâche (Server-Sent Events : un événement par changement, jusqu'à la fin)
+@router.get("/taches/{tache_id}/progression")
+async def suivre_tache_fc(tache_id: int):
+    if await gestionnaire_taches.obtenir(tache_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Aucune tâche trouvée avec l'identifiant {tache_id}"
+        )
+
+    async def evenements():
+        async for tache in gestionnaire_taches.suivre(tache_id):
+            yield f"data: {TacheRead.model_validate(tache).model_dump_json()}\n\n"
+
+    return StreamingResponse(evenements(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date
+
+from backend.app.core.routage import get_db_lecture
+from backend.app.core.tracage import RouteTracee
+from backend.app.crud.comparaison import obtenir_comparaison
+from backend.app.schemas.schemas import ComparaisonRead
+
+router = APIRouter(route_class=RouteTracee)
+
+# GET - Comparer une métrique COVID et Mpox, alignée par pays et par date
+@router.get("/", response_model=ComparaisonRead)
+async def comparaison_covid_mpox_endpoint(
+    metric: str = "new_cases",
+    location_ids: Optional[List[int]] = Query(None, description="Identifiants des pays à comparer"),
+    location_names: Optional[List[str]] = Query(None, description="Noms des pays à comparer"),
+    bucket: str = "day",
+    agg: str = "sum",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    log_safe: bool = Query(False, description="Remplacer par null les valeurs nulles ou négatives (échelle logarithmique)"),
+    db: AsyncSession = Depends(get_db_lecture)
+):
+    """Séries COVID-19 et Mpox alignées sur les mêmes dates, calculées en une seule requête"""
+    try:
+        return await obtenir_comparaison(
+            db,
+            metric=metric,
+            location_ids=location_ids,
+            location_names=location_names,
+            granularite=bucket,
+            agregat=agg,
+            start_date=start_date,
+            end_date=end_date,
+            log_safe=log_safe
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status, Form
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any, Optional
 from datetime import date
@@ -9,45 +9,162 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 from backend.app.core.database import get_db
+from backend.app.core.routage import get_db_lecture
 from backend.app.crud.covid import (
-    creer_donnees_covid, obtenir_donnees_covid_par_id, liste_donnees_covid, 
-    mettre_a_jour_donnees_covid, supprimer_donnees_covid
+    creer_donnees_covid, obtenir_donnees_covid_par_id, liste_lignes_covid,
+    mettre_a_jour_donnees_covid, supprimer_donnees_covid, LECTURE_COVID
 )
-from backend.app.schemas.schemas import FCovidCreate, FCovidRead
-from backend.app.crud.location import obtenir_pays_par_id
+from backend.app.crud.agregation import obtenir_agregation_temporelle
+from backend.app.crud.analytique import obtenir_analytique
+from backend.app.crud.instantane import instantane_covid
+from backend.app.models.models import FCovid
+from backend.app.schemas.schemas import FCovidCreate, FCovidRead, FCovidProjection, AgregationRead, AnalytiqueRead, ClassementRead, FCovidDernieresValeurs, ResultatImportMasse, ResultatIngestion
+from backend.app.api.masse import (
+    traiter_import_masse, documentation_corps_masse, traiter_ingestion_csv, DOCUMENTATION_CORPS_CSV
+)
+from backend.app.core.cache_pays import cache_pays
+from backend.app.core.cache import modifie_donnees
+from backend.app.core.tracage import RouteTracee
 
-router = APIRouter()
+router = APIRouter(route_class=RouteTracee)
 
 # GET - Récupérer la liste des données COVID
-@router.get("/", response_model=List[FCovidRead])
+@router.get("/", response_model=List[FCovidProjection], response_description="Lignes réduites aux champs demandés par fields= (tous par défaut)")
 async def liste_donnees_covid_endpoint(
     skip: int = 0, 
     limit: int = 100,
     location_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: AsyncSession = Depends(get_db)
+    location_ids: Optional[List[int]] = Query(None, description="Plusieurs identifiants de pays"),
+    location_names: Optional[List[str]] = Query(None, description="Plusieurs noms de pays"),
+    fields: Optional[List[str]] = Query(None, description="Champs à retourner (ex. date,location_id,new_cases) ; tous par défaut"),
+    db: AsyncSession = Depends(get_db_lecture)
 ):
     try:
-        return await liste_donnees_covid(
+        lecture = LECTURE_COVID.projection(fields)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    # Chemin rapide : tuples de colonnes encodés directement, sans ORM ni validation par ligne
+    try:
+        lignes = await liste_lignes_covid(
             db, 
             skip=skip, 
             limit=limit,
             location_id=location_id,
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            location_ids=location_ids,
+            location_names=location_names,
+            fields=list(lecture.champs)
+        )
+        return lecture.reponse(lignes)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur interne du serveur: {str(e)}"
+        )
+
+# GET - Agréger une métrique COVID par intervalle de temps (jour/semaine/mois/année)
+@router.get("/agregation", response_model=List[AgregationRead])
+async def agregation_donnees_covid_endpoint(
+    metric: str = "new_cases",
+    bucket: str = "week",
+    agg: str = "sum",
+    skip: int = 0,
+    limit: int = 1000,
+    location_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    location_ids: Optional[List[int]] = Query(None, description="Plusieurs identifiants de pays"),
+    location_names: Optional[List[str]] = Query(None, description="Plusieurs noms de pays"),
+    db: AsyncSession = Depends(get_db_lecture)
+):
+    try:
+        return await obtenir_agregation_temporelle(
+            db,
+            FCovid,
+            metric,
+            granularite=bucket,
+            agregat=agg,
+            skip=skip,
+            limit=limit,
+            location_id=location_id,
+            start_date=start_date,
+            end_date=end_date,
+            location_ids=location_ids,
+            location_names=location_names
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
     except Exception as e:
+        logger.error(f"Erreur lors de l'agrégation des données COVID: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erreur interne du serveur: {str(e)}"
         )
 
+# GET - Indicateurs glissants d'une métrique COVID par pays
+@router.get("/analytique", response_model=List[AnalytiqueRead])
+async def analytique_donnees_covid_endpoint(
+    metric: str = "new_cases",
+    window: int = Query(7, description="Taille de la fenêtre glissante, en jours"),
+    location_id: Optional[int] = None,
+    location_ids: Optional[List[int]] = Query(None, description="Plusieurs identifiants de pays"),
+    location_names: Optional[List[str]] = Query(None, description="Plusieurs noms de pays"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: AsyncSession = Depends(get_db_lecture)
+):
+    """Moyenne glissante, croissance d'une fenêtre à l'autre et temps de doublement (COVID-19)"""
+    try:
+        ids = await cache_pays.resoudre(db, location_id, location_ids, location_names)
+        return await obtenir_analytique(db, FCovid, metric, ids, window, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+# GET - Dernières valeurs COVID par pays
+@router.get("/latest", response_model=List[FCovidDernieresValeurs])
+async def dernieres_valeurs_covid_endpoint(
+    location_ids: Optional[List[int]] = Query(None, description="Restreindre à certains pays"),
+    db: AsyncSession = Depends(get_db_lecture)
+):
+    """Dernière valeur connue de chaque métrique COVID-19 par pays (instantané en mémoire)"""
+    instantane = await instantane_covid.obtenir(db)
+    return Response(content=instantane.dernieres(location_ids), media_type="application/json")
+
+# GET - Classement des pays sur la dernière valeur d'une métrique COVID
+@router.get("/top", response_model=List[ClassementRead])
+async def classement_covid_endpoint(
+    metric: str = "total_cases",
+    n: int = Query(10, ge=1, le=1000, description="Nombre de pays à retourner"),
+    db: AsyncSession = Depends(get_db_lecture)
+):
+    """Pays ayant la plus forte dernière valeur pour une métrique COVID-19 (instantané en mémoire)"""
+    instantane = await instantane_covid.obtenir(db)
+    try:
+        contenu = instantane.top(metric, n)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return Response(content=contenu, media_type="application/json")
+
 # GET - Récupérer une donnée COVID par son ID
 @router.get("/{covid_fact_id}", response_model=FCovidRead)
 async def obtenir_donnees_covid_par_id_endpoint(
     covid_fact_id: int, 
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_lecture)
 ):
 
     try:
@@ -71,13 +188,14 @@ async def obtenir_donnees_covid_par_id_endpoint(
 
 # POST - Créer une nouvelle donnée COVID (JSON)
 @router.post("/", response_model=FCovidRead, status_code=status.HTTP_201_CREATED)
+@modifie_donnees
 async def creer_donnees_covid_endpoint(
     covid_data: FCovidCreate, 
     db: AsyncSession = Depends(get_db)
 ):
     try:
-        # Vérifier si le pays existe
-        location = await obtenir_pays_par_id(db, covid_data.location_id)
+        # Vérifier si le pays existe (dimension en mémoire, sans requête)
+        location = await cache_pays.par_id(db, covid_data.location_id)
         if not location:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -85,6 +203,8 @@ async def creer_donnees_covid_endpoint(
             )
         
         return await creer_donnees_covid(db, covid_data)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la création des données COVID: {str(e)}")
         raise HTTPException(
@@ -92,8 +212,27 @@ async def creer_donnees_covid_endpoint(
             detail=f"Erreur interne du serveur: {str(e)}"
         )
 
+# POST - Créer des données COVID en masse (tableau JSON ou flux NDJSON)
+@router.post(
+    "/bulk",
+    response_model=ResultatImportMasse,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=documentation_corps_masse(FCovidCreate)
+)
+@modifie_donnees
+async def creer_donnees_covid_masse_endpoint(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    """Insérer des enregistrements COVID-19 par lots, avec un rapport d'erreur par ligne"""
+    resultat = await traiter_import_masse(request, response, db, FCovidCreate, FCovid)
+    logger.info(f"Import en masse COVID: {resultat.inserted} lignes insérées, {len(resultat.errors)} erreurs")
+    return resultat
+
 # POST - Créer une nouvelle donnée COVID (Form)
 @router.post("/form", response_model=FCovidRead, status_code=status.HTTP_201_CREATED)
+@modifie_donnees
 async def creer_donnees_covid_form_endpoint(
     date: date = Form(...),
     location_id: int = Form(...),
@@ -122,8 +261,8 @@ async def creer_donnees_covid_form_endpoint(
             people_vaccinated=people_vaccinated
         )
         
-        # Vérifier si le pays existe
-        location = await obtenir_pays_par_id(db, covid_data.location_id)
+        # Vérifier si le pays existe (dimension en mémoire, sans requête)
+        location = await cache_pays.par_id(db, covid_data.location_id)
         if not location:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -131,6 +270,8 @@ async def creer_donnees_covid_form_endpoint(
             )
         
         return await creer_donnees_covid(db, covid_data)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la création des données COVID via formulaire: {str(e)}")
         raise HTTPException(
@@ -138,16 +279,62 @@ async def creer_donnees_covid_form_endpoint(
             detail=f"Erreur interne du serveur: {str(e)}"
         )
 
+# POST - Charger un fichier CSV COVID (format OWID) en flux continu
+@router.post(
+    "/upload",
+    response_model=ResultatIngestion,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=DOCUMENTATION_CORPS_CSV
+)
+@modifie_donnees
+async def charger_csv_covid_endpoint(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """Charger un CSV COVID-19 via COPY dans une table de transit puis le fusionner dans f_covid"""
+    return await traiter_ingestion_csv(request, db, FCovid)
+
+# PUT - Créer ou remplacer des données COVID en masse selon (location_id, date)
+@router.put(
+    "/bulk",
+    response_model=ResultatImportMasse,
+    openapi_extra=documentation_corps_masse(FCovidCreate)
+)
+@modifie_donnees
+async def upsert_donnees_covid_masse_endpoint(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    """Créer ou remplacer des enregistrements COVID-19 selon la clé (location_id, date)"""
+    return await traiter_import_masse(request, response, db, FCovidCreate, FCovid, mode="upsert")
+
+# PATCH - Corriger partiellement des données COVID en masse
+@router.patch(
+    "/bulk",
+    response_model=ResultatImportMasse,
+    openapi_extra=documentation_corps_masse(FCovidCreate)
+)
+@modifie_donnees
+async def corriger_donnees_covid_masse_endpoint(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    """Mettre à jour uniquement les champs fournis, en une requête par lot, selon (location_id, date)"""
+    return await traiter_import_masse(request, response, db, FCovidCreate, FCovid, mode="patch")
+
 # PUT - Mettre à jour une donnée COVID existante
 @router.put("/{covid_fact_id}", response_model=FCovidRead)
+@modifie_donnees
 async def mettre_a_jour_donnees_covid_endpoint(
     covid_fact_id: int,
     covid_data: FCovidCreate,
     db: AsyncSession = Depends(get_db)
 ):
     """Mettre à jour un enregistrement COVID-19 existant"""
-    # Vérifier si le pays existe
-    location = await obtenir_pays_par_id(db, covid_data.location_id)
+    # Vérifier si le pays existe (dimension en mémoire, sans requête)
+    location = await cache_pays.par_id(db, covid_data.location_id)
     if not location:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -164,6 +351,7 @@ async def mettre_a_jour_donnees_covid_endpoint(
 
 # DELETE - Supprimer une donnée COVID
 @router.delete("/{covid_fact_id}", status_code=status.HTTP_204_NO_CONTENT)
+@modifie_donnees
 async def supprimer_donnees_covid_endpoint(
     covid_fact_id: int,
     db: AsyncSession = Depends(get_db)
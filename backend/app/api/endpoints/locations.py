@@ -1,32 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from backend.app.core.database import get_db
-from backend.app.crud.location import (
-    creer_pays, obtenir_pays_par_id, liste_pays, obtenir_pays_par_nom, supprimer_pays
-)
-from backend.app.schemas.schemas import DLocationCreate, DLocationRead
+from backend.app.core.routage import get_db_lecture
+from backend.app.crud.location import creer_pays, supprimer_pays
+from backend.app.core.cache_pays import cache_pays
+from backend.app.core.recherche_pays import rechercher_pays
+from backend.app.core.cache import modifie_donnees
+from backend.app.core.tracage import RouteTracee
+from backend.app.schemas.schemas import DLocationCreate, DLocationRead, ResultatRecherchePays
 
-router = APIRouter()
+router = APIRouter(route_class=RouteTracee)
 
 #Récupérer la liste de tous les pays
 @router.get("/", response_model=List[DLocationRead])
 async def liste_des_pays_fc(
     skip: int = 0, 
     limit: int = 100, 
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_lecture)
 ):
-    locations = await liste_pays(db, skip=skip, limit=limit)
+    locations = await cache_pays.liste(db, skip=skip, limit=limit)
     return locations
 
+#Rechercher des pays par nom partiel, approché ou alias (ex. "USA", "États-Unis")
+@router.get("/recherche", response_model=List[ResultatRecherchePays])
+async def rechercher_pays_fc(
+    q: str = Query(..., min_length=1, description="Nom, début de nom ou alias du pays"),
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db_lecture)
+):
+    return await rechercher_pays(db, q, limit)
+
 #Récupérer les informations d'un pays par son identifiant
 @router.get("/{location_id}", response_model=DLocationRead)
 async def obtenir_pays_fc(
     location_id: int, 
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_lecture)
 ):
-    db_location = await obtenir_pays_par_id(db, location_id)
+    db_location = await cache_pays.par_id(db, location_id)
     if db_location is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -38,9 +50,9 @@ async def obtenir_pays_fc(
 @router.get("/nom/{location_name}", response_model=DLocationRead)
 async def rechercher_pays_par_nom_fc(
     location_name: str, 
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_lecture)
 ):
-    db_location = await obtenir_pays_par_nom(db, location_name)
+    db_location = await cache_pays.par_nom(db, location_name)
     if db_location is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -50,12 +62,13 @@ async def rechercher_pays_par_nom_fc(
 
 #Ajouter un nouveau pays à la base de données
 @router.post("/", response_model=DLocationRead, status_code=status.HTTP_201_CREATED)
+@modifie_donnees
 async def creer_pays_fc(
     location: DLocationCreate, 
     db: AsyncSession = Depends(get_db)
 ):
     # Vérifier si la location existe déjà
-    db_location = await obtenir_pays_par_nom(db, location.location_name)
+    db_location = await cache_pays.par_nom(db, location.location_name)
     if db_location:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -65,6 +78,7 @@ async def creer_pays_fc(
     return await creer_pays(db, location)
 
 @router.delete("/{location_id}", status_code=status.HTTP_204_NO_CONTENT)
+@modifie_donnees
 async def supprimer_pays_fc(
     location_id: int,
     db: AsyncSession = Depends(get_db)
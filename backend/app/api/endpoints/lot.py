@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException, Response, status
+
+from backend.app.api.lot import OPERATIONS, executer_lot
+from backend.app.core.serialisation import encoder_json
+from backend.app.core.tracage import RouteTracee
+from backend.app.schemas.schemas import RequeteLot, ResultatLot
+
+router = APIRouter(route_class=RouteTracee)
+
+DESCRIPTION_LOT = (
+    "Chaque sous-requête nommée désigne une opération (`op`) et ses paramètres (`params`), "
+    "identiques à ceux de l'endpoint GET correspondant. Les filtres communs (`filters`) "
+    "s'appliquent à toutes les sous-requêtes qui les acceptent.\n\n"
+    "Opérations disponibles :\n\n"
+    + "\n".join(
+        f"- `{op}` : {', '.join(sorted(operation.parametres))}"
+        for op, operation in OPERATIONS.items()
+    )
+)
+
+# POST - Exécuter plusieurs requêtes de lecture en un seul aller-retour
+@router.post("/", response_model=ResultatLot, description=DESCRIPTION_LOT)
+async def executer_lot_endpoint(requete: RequeteLot):
+    """Exécuter un lot de sous-requêtes en parallèle et retourner tous leurs résultats"""
+    try:
+        resultat = await executer_lot(requete)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return Response(content=encoder_json(resultat), media_type="application/json")
@@ -1,66 +1,212 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import date
 
 from backend.app.core.database import get_db
-from backend.app.crud.mpox import (
-    creer_donnees_mpox, obtenir_donnees_mpox_par_id, liste_donnees_mpox,
-    mettre_a_jour_donnees_mpox, supprimer_donnees_mpox
+from backend.app.core.routage import get_db_lecture
+from backend.app.crud.faits import (
+    FAITS_MPOX, creer_fait, obtenir_fait_par_id, liste_lignes_faits, mettre_a_jour_fait, supprimer_fait
 )
-from backend.app.schemas.schemas import FMpoxCreate, FMpoxRead
-from backend.app.crud.location import obtenir_pays_par_id
+from backend.app.crud.agregation import obtenir_agregation_temporelle
+from backend.app.crud.analytique import obtenir_analytique
+from backend.app.crud.instantane import instantane_mpox
+from backend.app.models.models import FMpox
+from backend.app.schemas.schemas import FMpoxCreate, FMpoxRead, FMpoxProjection, AgregationRead, AnalytiqueRead, ClassementRead, FMpoxDernieresValeurs, ResultatImportMasse, ResultatIngestion
+from backend.app.api.masse import (
+    traiter_import_masse, documentation_corps_masse, traiter_ingestion_csv, DOCUMENTATION_CORPS_CSV
+)
+from backend.app.core.cache_pays import cache_pays
+from backend.app.core.cache import modifie_donnees
+from backend.app.core.tracage import RouteTracee
 
-router = APIRouter()
+router = APIRouter(route_class=RouteTracee)
 
-@router.get("/", response_model=List[FMpoxRead])
+@router.get("/", response_model=List[FMpoxProjection], response_description="Lignes réduites aux champs demandés par fields= (tous par défaut)")
 async def liste_donnees_mpox_endpoint(
     skip: int = 0,
     limit: int = 100,
     location_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: AsyncSession = Depends(get_db)
+    location_ids: Optional[List[int]] = Query(None, description="Plusieurs identifiants de pays"),
+    location_names: Optional[List[str]] = Query(None, description="Plusieurs noms de pays"),
+    fields: Optional[List[str]] = Query(None, description="Champs à retourner (ex. date,location_id,new_cases) ; tous par défaut"),
+    db: AsyncSession = Depends(get_db_lecture)
+):
+    try:
+        lecture = FAITS_MPOX.lecture.projection(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    try:
+        lignes = await liste_lignes_faits(
+            db, "mpox", skip, limit, location_id, start_date, end_date, location_ids, location_names,
+            list(lecture.champs)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return lecture.reponse(lignes)
+
+@router.get("/agregation", response_model=List[AgregationRead])
+async def agregation_donnees_mpox_endpoint(
+    metric: str = "new_cases",
+    bucket: str = "week",
+    agg: str = "sum",
+    skip: int = 0,
+    limit: int = 1000,
+    location_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    location_ids: Optional[List[int]] = Query(None, description="Plusieurs identifiants de pays"),
+    location_names: Optional[List[str]] = Query(None, description="Plusieurs noms de pays"),
+    db: AsyncSession = Depends(get_db_lecture)
+):
+    """Agréger une métrique Mpox par intervalle de temps (jour/semaine/mois/année)"""
+    try:
+        return await obtenir_agregation_temporelle(
+            db, FMpox, metric, bucket, agg, skip, limit, location_id, start_date, end_date,
+            location_ids, location_names
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/analytique", response_model=List[AnalytiqueRead])
+async def analytique_donnees_mpox_endpoint(
+    metric: str = "new_cases",
+    window: int = Query(7, description="Taille de la fenêtre glissante, en jours"),
+    location_id: Optional[int] = None,
+    location_ids: Optional[List[int]] = Query(None, description="Plusieurs identifiants de pays"),
+    location_names: Optional[List[str]] = Query(None, description="Plusieurs noms de pays"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: AsyncSession = Depends(get_db_lecture)
+):
+    """Moyenne glissante, croissance d'une fenêtre à l'autre et temps de doublement (Mpox)"""
+    try:
+        ids = await cache_pays.resoudre(db, location_id, location_ids, location_names)
+        return await obtenir_analytique(db, FMpox, metric, ids, window, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/latest", response_model=List[FMpoxDernieresValeurs])
+async def dernieres_valeurs_mpox_endpoint(
+    location_ids: Optional[List[int]] = Query(None, description="Restreindre à certains pays"),
+    db: AsyncSession = Depends(get_db_lecture)
+):
+    """Dernière valeur connue de chaque métrique Mpox par pays (instantané en mémoire)"""
+    instantane = await instantane_mpox.obtenir(db)
+    return Response(content=instantane.dernieres(location_ids), media_type="application/json")
+
+@router.get("/top", response_model=List[ClassementRead])
+async def classement_mpox_endpoint(
+    metric: str = "total_cases",
+    n: int = Query(10, ge=1, le=1000, description="Nombre de pays à retourner"),
+    db: AsyncSession = Depends(get_db_lecture)
 ):
-    return await liste_donnees_mpox(db, skip, limit, location_id, start_date, end_date)
+    """Pays ayant la plus forte dernière valeur pour une métrique Mpox (instantané en mémoire)"""
+    instantane = await instantane_mpox.obtenir(db)
+    try:
+        contenu = instantane.top(metric, n)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return Response(content=contenu, media_type="application/json")
 
 @router.get("/{mpox_fact_id}", response_model=FMpoxRead)
 async def obtenir_donnees_mpox_par_id_endpoint(
     mpox_fact_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_lecture)
 ):
-    db_mpox = await obtenir_donnees_mpox_par_id(db, mpox_fact_id)
+    db_mpox = await obtenir_fait_par_id(db, "mpox", mpox_fact_id)
     if db_mpox is None:
         raise HTTPException(status_code=404, detail="Donnée Mpox non trouvée")
     return db_mpox
 
 @router.post("/", response_model=FMpoxRead, status_code=status.HTTP_201_CREATED)
+@modifie_donnees
 async def creer_donnees_mpox_endpoint(
     mpox_data: FMpoxCreate,
     db: AsyncSession = Depends(get_db)
 ):
-    location = await obtenir_pays_par_id(db, mpox_data.location_id)
+    location = await cache_pays.par_id(db, mpox_data.location_id)
     if not location:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Le pays avec l'ID {mpox_data.location_id} n'existe pas dans la base de données"
         )
-    return await creer_donnees_mpox(db, mpox_data)
+    return await creer_fait(db, "mpox", mpox_data)
+
+@router.post(
+    "/bulk",
+    response_model=ResultatImportMasse,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=documentation_corps_masse(FMpoxCreate)
+)
+@modifie_donnees
+async def creer_donnees_mpox_masse_endpoint(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    """Insérer des enregistrements Mpox par lots (tableau JSON ou flux NDJSON)"""
+    return await traiter_import_masse(request, response, db, FMpoxCreate, FMpox)
+
+@router.post(
+    "/upload",
+    response_model=ResultatIngestion,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=DOCUMENTATION_CORPS_CSV
+)
+@modifie_donnees
+async def charger_csv_mpox_endpoint(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """Charger un CSV Mpox via COPY dans une table de transit puis le fusionner dans f_mpox"""
+    return await traiter_ingestion_csv(request, db, FMpox)
+
+@router.put(
+    "/bulk",
+    response_model=ResultatImportMasse,
+    openapi_extra=documentation_corps_masse(FMpoxCreate)
+)
+@modifie_donnees
+async def upsert_donnees_mpox_masse_endpoint(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    """Créer ou remplacer des enregistrements Mpox selon la clé (location_id, date)"""
+    return await traiter_import_masse(request, response, db, FMpoxCreate, FMpox, mode="upsert")
+
+@router.patch(
+    "/bulk",
+    response_model=ResultatImportMasse,
+    openapi_extra=documentation_corps_masse(FMpoxCreate)
+)
+@modifie_donnees
+async def corriger_donnees_mpox_masse_endpoint(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    """Mettre à jour uniquement les champs fournis, en une requête par lot, selon (location_id, date)"""
+    return await traiter_import_masse(request, response, db, FMpoxCreate, FMpox, mode="patch")
 
 @router.put("/{mpox_fact_id}", response_model=FMpoxRead)
+@modifie_donnees
 async def mettre_a_jour_donnees_mpox_endpoint(
     mpox_fact_id: int,
     mpox_data: FMpoxCreate,
     db: AsyncSession = Depends(get_db)
 ):
     """Mettre à jour un enregistrement Mpox existant"""
-    location = await obtenir_pays_par_id(db, mpox_data.location_id)
+    location = await cache_pays.par_id(db, mpox_data.location_id)
     if not location:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Le pays avec l'ID {mpox_data.location_id} n'existe pas dans la base de données"
         )
-    updated_mpox = await mettre_a_jour_donnees_mpox(db, mpox_fact_id, mpox_data)
+    updated_mpox = await mettre_a_jour_fait(db, "mpox", mpox_fact_id, mpox_data)
     if not updated_mpox:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -69,12 +215,13 @@ async def mettre_a_jour_donnees_mpox_endpoint(
     return updated_mpox
 
 @router.delete("/{mpox_fact_id}", status_code=status.HTTP_204_NO_CONTENT)
+@modifie_donnees
 async def supprimer_donnees_mpox_endpoint(
     mpox_fact_id: int,
     db: AsyncSession = Depends(get_db)
 ):
     """Supprimer un enregistrement Mpox"""
-    result = await supprimer_donnees_mpox(db, mpox_fact_id)
+    result = await supprimer_fait(db, "mpox", mpox_fact_id)
     if not result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.app.core.cache_pays import cache_pays
+from backend.app.core.routage import session_lecture
+from backend.app.crud.agregation import obtenir_agregation_temporelle
+from backend.app.crud.analytique import obtenir_analytique
+from backend.app.crud.comparaison import obtenir_comparaison
+from backend.app.crud.covid import obtenir_statistiques_covid, obtenir_evolution_temporelle_covid
+from backend.app.crud.faits import TABLES_FAITS, liste_lignes_faits
+from backend.app.crud.instantane import instantane_covid, instantane_mpox
+from backend.app.models.models import FCovid, FMpox
+from backend.app.schemas.schemas import FiltresLot, RequeteLot
+
+logger = logging.getLogger(__name__)
+
+# Nombre maximal de sous-requêtes dans un lot
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "20"))
+
+# Sous-requêtes d'un même lot exécutées simultanément (une connexion du pool chacune)
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+
+# Paramètres de filtre pouvant être partagés par toutes les sous-requêtes d'un lot
+FILTRES = frozenset(FiltresLot.model_fields)
+
+
+class Operation(NamedTuple):
+    fonction: Callable[[AsyncSession, Dict[str, Any]], Awaitable[Any]]
+    parametres: FrozenSet[str]
+
+
+def _liste(faits: str):
+    async def executer(db: AsyncSession, p: Dict[str, Any]) -> Any:
+        projection = TABLES_FAITS[faits].lecture.projection(p.get("fields"))
+        lignes = await liste_lignes_faits(
+            db,
+            faits,
+            skip=p.get("skip", 0),
+            limit=p.get("limit", 100),
+            location_id=p.get("location_id"),
+            start_date=p.get("start_date"),
+            end_date=p.get("end_date"),
+            location_ids=p.get("location_ids"),
+            location_names=p.get("location_names"),
+            fields=list(projection.champs)
+        )
+        return [dict(zip(projection.champs, ligne)) for ligne in lignes]
+    return executer
+
+
+def _agregation(modele):
+    async def executer(db: AsyncSession, p: Dict[str, Any]) -> Any:
+        return await obtenir_agregation_temporelle(
+            db,
+            modele,
+            p.get("metric", "new_cases"),
+            granularite=p.get("bucket", "week"),
+            agregat=p.get("agg", "sum"),
+            skip=p.get("skip", 0),
+            limit=p.get("limit", 1000),
+            location_id=p.get("location_id"),
+            start_date=p.get("start_date"),
+            end_date=p.get("end_date"),
+            location_ids=p.get("location_ids"),
+            location_names=p.get("location_names")
+        )
+    return executer
+
+
+def _analytique(modele):
+    async def executer(db: AsyncSession, p: Dict[str, Any]) -> Any:
+        ids = await cache_pays.resoudre(db, p.get("location_id"), p.get("location_ids"), p.get("location_names"))
+        return await obtenir_analytique(
+            db, modele, p.get("metric", "new_cases"), ids, p.get("window", 7), p.get("start_date"), p.get("end_date")
+        )
+    return executer
+
+
+def _dernieres(instantane):
+    async def executer(db: AsyncSession, p: Dict[str, Any]) -> Any:
+        ids = await cache_pays.resoudre(db, p.get("location_id"), p.get("location_ids"), p.get("location_names"))
+        return (await instantane.obtenir(db)).selection(ids)
+    return executer
+
+
+def _top(instantane):
+    async def executer(db: AsyncSession, p: Dict[str, Any]) -> Any:
+        return (await instantane.obtenir(db)).classement(p.get("metric", "total_cases"), p.get("n", 10))
+    return executer
+
+
+async def _statistiques_covid(db: AsyncSession, p: Dict[str, Any]) -> Any:
+    return await obtenir_statistiques_covid(db, location_id=p.get("location_id"))
+
+
+async def _evolution_covid(db: AsyncSession, p: Dict[str, Any]) -> Any:
+    return await obtenir_evolution_temporelle_covid(
+        db,
+        location_id=p.get("location_id"),
+        metric=p.get("metric", "total_cases"),
+        start_date=p.get("start_date"),
+        end_date=p.get("end_date"),
+        location_ids=p.get("location_ids"),
+        location_names=p.get("location_names")
+    )
+
+
+async def _comparaison(db: AsyncSession, p: Dict[str, Any]) -> Any:
+    return await obtenir_comparaison(
+        db,
+        metric=p.get("metric", "new_cases"),
+        location_ids=p.get("location_ids"),
+        location_names=p.get("location_names"),
+        granularite=p.get("bucket", "day"),
+        agregat=p.get("agg", "sum"),
+        start_date=p.get("start_date"),
+        end_date=p.get("end_date"),
+        log_safe=p.get("log_safe", False)
+    )
+
+
+async def _pays(db: AsyncSession, p: Dict[str, Any]) -> Any:
+    pays = await cache_pays.liste(db, skip=p.get("skip", 0), limit=p.get("limit", 100))
+    return [element.model_dump() for element in pays]
+
+
+# Opérations disponibles dans un lot, avec les paramètres acceptés par chacune
+# (mêmes noms et mêmes valeurs par défaut que les endpoints GET correspondants)
+OPERATIONS: Dict[str, Operation] = {
+    "covid.liste": Operation(_liste("covid"), FILTRES | {"skip", "limit", "fields"}),
+    "covid.agregation": Operation(_agregation(FCovid), FILTRES | {"metric", "bucket", "agg", "skip", "limit"}),
+    "covid.analytique": Operation(_analytique(FCovid), FILTRES | {"metric", "window"}),
+    "covid.latest": Operation(_dernieres(instantane_covid), FILTRES - {"start_date", "end_date"}),
+    "covid.top": Operation(_top(instantane_covid), frozenset({"metric", "n"})),
+    "covid.statistiques": Operation(_statistiques_covid, frozenset({"location_id"})),
+    "covid.evolution": Operation(_evolution_covid, FILTRES | {"metric"}),
+    "mpox.liste": Operation(_liste("mpox"), FILTRES | {"skip", "limit", "fields"}),
+    "mpox.agregation": Operation(_agregation(FMpox), FILTRES | {"metric", "bucket", "agg", "skip", "limit"}),
+    "mpox.analytique": Operation(_analytique(FMpox), FILTRES | {"metric", "window"}),
+    "mpox.latest": Operation(_dernieres(instantane_mpox), FILTRES - {"start_date", "end_date"}),
+    "mpox.top": Operation(_top(instantane_mpox), frozenset({"metric", "n"})),
+    "comparaison": Operation(_comparaison, FILTRES - {"location_id"} | {"metric", "bucket", "agg", "log_safe"}),
+    "pays": Operation(_pays, frozenset({"skip", "limit"})),
+}
+
+
+async def _executer_sous_requete(
+    nom: str,
+    op: str,
+    parametres: Dict[str, Any],
+    filtres: Dict[str, Any],
+    semaphore: asyncio.Semaphore
+) -> Dict[str, Any]:
+    operation = OPERATIONS.get(op)
+    if operation is None:
+        return {"status": 400, "detail": f"Opération inconnue: {op}. Doit être l'une de: {', '.join(OPERATIONS)}"}
+    refuses = sorted(set(parametres) - operation.parametres)
+    if refuses:
+        return {"status": 400, "detail": f"Paramètres non acceptés par {op}: {', '.join(refuses)}"}
+
+    # Les filtres communs s'appliquent aux opérations qui les acceptent ; les paramètres propres priment
+    p = {cle: valeur for cle, valeur in filtres.items() if cle in operation.parametres}
+    p.update(parametres)
+
+    async with semaphore:
+        # Une session de lecture par sous-requête : sans réplica, la connexion n'est prise
+        # dans le pool qu'à la première requête SQL (les réponses en cache ou en mémoire n'en utilisent pas)
+        async with session_lecture() as db:
+            try:
+                return {"status": 200, "data": await operation.fonction(db, p)}
+            except ValueError as e:
+                return {"status": 400, "detail": str(e)}
+            except Exception as e:
+                logger.error(f"Erreur lors de la sous-requête {nom} ({op}): {str(e)}")
+                return {"status": 500, "detail": f"Erreur interne du serveur: {str(e)}"}
+
+
+async def executer_lot(requete: RequeteLot) -> Dict[str, Any]:
+    """Exécuter les sous-requêtes d'un lot en parallèle et réunir leurs résultats par nom
+
+    L'échec d'une sous-requête n'interrompt pas les autres : chaque résultat
+    porte son propre statut (200, 400 ou 500).
+    """
+    if not requete.queries:
+        raise ValueError("Le lot doit contenir au moins une sous-requête")
+    if len(requete.queries) > BATCH_MAX_QUERIES:
+        raise ValueError(f"Un lot est limité à {BATCH_MAX_QUERIES} sous-requêtes")
+
+    debut = time.perf_counter()
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    filtres = requete.filters.model_dump(exclude_none=True)
+    noms = list(requete.queries)
+    resultats = await asyncio.gather(*[
+        _executer_sous_requete(
+            nom,
+            requete.queries[nom].op,
+            requete.queries[nom].params.model_dump(exclude_none=True),
+            filtres,
+            semaphore
+        )
+        for nom in noms
+    ])
+    return {
+        "duration_s": round(time.perf_counter() - debut, 4),
+        "results": dict(zip(noms, resultats))
+    }
@@ -0,0 +1,211 @@
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Tuple, Type
+
+from fastapi import HTTPException, Request, Response, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.app.crud.masse import TAILLE_LOT, inserer_lot, upsert_lot, corriger_lot
+from backend.app.core.cache_pays import cache_pays
+from backend.app.crud.ingestion import ingerer_csv
+from backend.app.schemas.schemas import ErreurLigne, ResultatImportMasse
+
+logger = logging.getLogger(__name__)
+
+# Types de contenu traités ligne par ligne (NDJSON)
+TYPES_NDJSON = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-seq")
+
+
+def documentation_corps_masse(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """Décrire le corps accepté par un endpoint d'import en masse dans OpenAPI"""
+    reference = {"$ref": f"#/components/schemas/{schema.__name__}"}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": reference}},
+                "application/x-ndjson": {"schema": {"type": "string", "description": "Un objet JSON par ligne"}},
+            },
+        }
+    }
+
+
+# Description OpenAPI du corps des endpoints d'ingestion CSV
+DOCUMENTATION_CORPS_CSV = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "text/csv": {"schema": {"type": "string", "description": "Fichier CSV au format OWID (colonnes location, date, métriques)"}},
+        },
+    }
+}
+
+
+async def traiter_ingestion_csv(request: Request, db: AsyncSession, modele) -> Dict[str, Any]:
+    """Ingérer le corps de la requête (CSV) en flux continu et convertir les erreurs en réponses HTTP"""
+    try:
+        resultat = await ingerer_csv(db, modele, request.stream())
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    logger.info(
+        f"Ingestion CSV {resultat['table']}: {resultat['rows_received']} lignes reçues, "
+        f"{resultat['rows_merged']} fusionnées ({resultat['rows_per_second']} lignes/s)"
+    )
+    return resultat
+
+
+async def _lignes_ndjson(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    """Lire un flux NDJSON morceau par morceau sans charger tout le corps"""
+    reste = b""
+    index = 0
+    async for morceau in request.stream():
+        reste += morceau
+        *lignes, reste = reste.split(b"\n")
+        for ligne in lignes:
+            if ligne.strip():
+                yield index, ligne
+                index += 1
+    if reste.strip():
+        yield index, reste
+
+
+async def _lignes_json(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    """Lire un tableau JSON"""
+    try:
+        donnees = json.loads(await request.body())
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"JSON invalide: {e}")
+    if not isinstance(donnees, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le corps de la requête doit être un tableau JSON ou un flux NDJSON"
+        )
+    for index, ligne in enumerate(donnees):
+        yield index, ligne
+
+
+def _dedoublonner(lot: List[Tuple[int, BaseModel]], erreurs: List[ErreurLigne]) -> List[Tuple[int, BaseModel]]:
+    """Ne garder que la dernière ligne pour chaque clé (location_id, date) du lot"""
+    dernieres: Dict[Tuple[int, Any], Tuple[int, BaseModel]] = {}
+    for index, ligne in lot:
+        cle = (ligne.location_id, ligne.date)
+        if cle in dernieres:
+            erreurs.append(ErreurLigne(
+                index=dernieres[cle][0],
+                detail=f"Ligne remplacée par la ligne {index} (même location_id et date)"
+            ))
+        dernieres[cle] = (index, ligne)
+    return sorted(dernieres.values(), key=lambda element: element[0])
+
+
+async def _traiter_lot(
+    db: AsyncSession,
+    modele,
+    mode: str,
+    lot: List[Tuple[int, BaseModel]],
+    resultat: ResultatImportMasse
+) -> None:
+    """Vérifier les pays du lot dans la dimension en mémoire puis insérer, fusionner ou corriger les lignes"""
+    if mode != "patch":
+        existants = await cache_pays.ids_existants(db, {ligne.location_id for _, ligne in lot})
+        valides = []
+        for index, ligne in lot:
+            if ligne.location_id in existants:
+                valides.append((index, ligne))
+            else:
+                resultat.errors.append(ErreurLigne(
+                    index=index,
+                    detail=f"Le pays avec l'ID {ligne.location_id} n'existe pas dans la base de données"
+                ))
+        lot = valides
+    lot = _dedoublonner(lot, resultat.errors)
+
+    try:
+        if mode == "insert":
+            inserees = {
+                (location_id, jour): id_ligne
+                for id_ligne, location_id, jour in await inserer_lot(db, modele, [ligne.model_dump() for _, ligne in lot])
+            }
+            for index, ligne in lot:
+                id_ligne = inserees.get((ligne.location_id, ligne.date))
+                if id_ligne is None:
+                    resultat.errors.append(ErreurLigne(
+                        index=index,
+                        detail=f"Un enregistrement existe déjà pour location_id={ligne.location_id} et date={ligne.date}"
+                    ))
+                else:
+                    resultat.ids.append(id_ligne)
+                    resultat.inserted += 1
+        elif mode == "upsert":
+            lignes = await upsert_lot(db, modele, [ligne.model_dump() for _, ligne in lot])
+            for id_ligne, inseree in lignes:
+                resultat.ids.append(id_ligne)
+                if inseree:
+                    resultat.inserted += 1
+                else:
+                    resultat.updated += 1
+        else:
+            correctifs = [ligne.model_dump(exclude_unset=True) for _, ligne in lot]
+            mises_a_jour = {
+                (location_id, jour): id_ligne
+                for id_ligne, location_id, jour in await corriger_lot(db, modele, correctifs)
+            }
+            for index, ligne in lot:
+                id_ligne = mises_a_jour.get((ligne.location_id, ligne.date))
+                if id_ligne is None:
+                    resultat.errors.append(ErreurLigne(
+                        index=index,
+                        detail=f"Aucun enregistrement pour location_id={ligne.location_id} et date={ligne.date}"
+                    ))
+                else:
+                    resultat.ids.append(id_ligne)
+                    resultat.updated += 1
+    except Exception as e:
+        logger.error(f"Erreur lors du traitement d'un lot de {len(lot)} lignes: {str(e)}")
+        resultat.errors.extend(ErreurLigne(index=index, detail=f"Erreur lors du traitement du lot: {str(e)}") for index, _ in lot)
+
+
+async def traiter_import_masse(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    schema: Type[BaseModel],
+    modele,
+    mode: str = "insert",
+    taille_lot: int = TAILLE_LOT
+) -> ResultatImportMasse:
+    """Valider et traiter par lots un tableau JSON ou un flux NDJSON d'enregistrements
+
+    Modes : "insert" (création), "upsert" (création ou remplacement selon
+    la clé location_id/date) et "patch" (mise à jour des seuls champs fournis).
+    En cas d'erreurs de ligne, le statut de la réponse devient 207 si une
+    partie des lignes a été écrite, 422 si aucune ne l'a été.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    ndjson = content_type in TYPES_NDJSON
+    source = _lignes_ndjson(request) if ndjson else _lignes_json(request)
+
+    resultat = ResultatImportMasse(inserted=0, updated=0, ids=[], errors=[])
+    lot: List[Tuple[int, BaseModel]] = []
+
+    async for index, brut in source:
+        try:
+            ligne = schema.model_validate_json(brut) if ndjson else schema.model_validate(brut)
+        except ValidationError as e:
+            resultat.errors.append(ErreurLigne(index=index, detail=str(e)))
+            continue
+        lot.append((index, ligne))
+        if len(lot) >= taille_lot:
+            await _traiter_lot(db, modele, mode, lot, resultat)
+            lot = []
+
+    if lot:
+        await _traiter_lot(db, modele, mode, lot, resultat)
+
+    resultat.errors.sort(key=lambda erreur: erreur.index)
+    if resultat.errors:
+        response.status_code = (
+            status.HTTP_207_MULTI_STATUS if resultat.ids else status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return resultat
@@ -0,0 +1,307 @@
+import asyncio
+import json
+import math
+import os
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from dotenv import load_dotenv
+
+from backend.app.core.cache_pays import cache_pays
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Contrôle d'admission des requêtes de l'API (désactivable pour les mesures)
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+
+# Au-delà de ce nombre de lignes estimées, une lecture passe dans la classe "heavy"
+ADMISSION_HEAVY_ROWS = int(os.getenv("ADMISSION_HEAVY_ROWS", "5000"))
+
+# Taille maximale du corps d'un lot lu pour estimer son coût (au-delà : classe "heavy")
+ADMISSION_BATCH_MAX_BODY = int(os.getenv("ADMISSION_BATCH_MAX_BODY", str(64 * 1024)))
+
+# Durée de l'historique supposée lorsqu'une requête ne borne pas ses dates (jours)
+ADMISSION_FULL_SPAN_DAYS = int(os.getenv("ADMISSION_FULL_SPAN_DAYS", "1100"))
+
+# Attente maximale d'une place dans sa classe avant d'être refusée (secondes)
+ADMISSION_QUEUE_TIMEOUT_S = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_S", "5"))
+
+# Requêtes simultanées et file d'attente de chaque classe de coût, surchargeables
+# par ADMISSION_<CLASSE>_CONCURRENCY et ADMISSION_<CLASSE>_QUEUE :
+# - light : lectures servies depuis la mémoire ou par clé (pays, /latest, /top, /{id})
+# - standard : lectures bornées et écritures unitaires
+# - heavy : lectures et lots estimés à plus de ADMISSION_HEAVY_ROWS lignes, imports en masse
+CLASSES_ADMISSION: Dict[str, Dict[str, int]] = {
+    nom: {
+        "concurrency": int(os.getenv(f"ADMISSION_{nom.upper()}_CONCURRENCY", str(concurrence))),
+        "queue": int(os.getenv(f"ADMISSION_{nom.upper()}_QUEUE", str(file))),
+    }
+    for nom, concurrence, file in (("light", 64, 256), ("standard", 16, 64), ("heavy", 4, 8))
+}
+
+# Routes en lecture seule servies sans parcours de table (dernier segment du chemin)
+_ROUTES_LEGERES = {"latest", "top", "recherche"}
+
+# Routes analytiques : le coût dépend de la période et du nombre de pays, pas de limit
+_ROUTES_ANALYTIQUES = {"agregation", "analytique", "comparaison"}
+
+
+def _date(valeurs: List[str]) -> Optional[date]:
+    try:
+        return date.fromisoformat(valeurs[0]) if valeurs else None
+    except ValueError:
+        return None
+
+
+def estimer_lignes(parametres: Dict[str, List[str]], limit_defaut: Optional[int]) -> int:
+    """Nombre de lignes qu'une lecture peut parcourir, d'après limit, la période et les pays demandés
+
+    La période inconnue vaut ADMISSION_FULL_SPAN_DAYS jours, et l'absence de
+    filtre de pays tous les pays de la dimension.
+    """
+    debut, fin = _date(parametres.get("start_date", [])), _date(parametres.get("end_date", []))
+    jours = ADMISSION_FULL_SPAN_DAYS
+    if debut and fin:
+        jours = (fin - debut).days + 1
+    elif debut:
+        jours = (date.today() - debut).days + 1
+    jours = min(max(jours, 1), ADMISSION_FULL_SPAN_DAYS)
+    if "location_id" in parametres:
+        pays = 1
+    elif "location_ids" in parametres or "location_names" in parametres:
+        pays = len(parametres.get("location_ids", [])) + len(parametres.get("location_names", []))
+    else:
+        pays = max(len(cache_pays), 1)
+    lignes = jours * pays
+    if limit_defaut is not None:
+        try:
+            limit = int(parametres.get("limit", [limit_defaut])[0])
+        except ValueError:
+            limit = limit_defaut
+        lignes = min(lignes, max(limit, 0))
+    return lignes
+
+
+def _cout_lecture(chemin: str, parametres: Dict[str, List[str]]) -> Tuple[str, int]:
+    """Classe de coût et lignes estimées d'une lecture (GET) sur une route de l'API"""
+    segments = [segment for segment in chemin.split("/") if segment][1:]  # sans le préfixe /api
+    ressource = segments[0] if segments else ""
+    dernier = segments[-1] if len(segments) > 1 else ""
+
+    if ressource == "pays" or dernier in _ROUTES_LEGERES or dernier.isdigit():
+        return "light", 0
+
+    if ressource in _ROUTES_ANALYTIQUES or dernier in _ROUTES_ANALYTIQUES:
+        lignes = estimer_lignes(parametres, None)
+    elif ressource in ("covid", "mpox") and len(segments) == 1:
+        lignes = estimer_lignes(parametres, 100)
+    else:
+        return "standard", 0
+    return ("heavy" if lignes > ADMISSION_HEAVY_ROWS else "standard"), lignes
+
+
+def classe_lot(corps: bytes) -> str:
+    """Classe de coût d'un lot (POST /api/lot) d'après ses sous-requêtes
+
+    Chaque sous-requête est estimée comme la route GET correspondante, avec
+    les filtres communs du lot ; le lot est léger si toutes ses sous-requêtes
+    le sont, et lourd si l'une l'est ou si leurs lignes estimées cumulées
+    dépassent ADMISSION_HEAVY_ROWS.
+    """
+    try:
+        requete = json.loads(corps)
+        filtres = requete.get("filters") or {}
+        sous_requetes = [
+            (sous_requete["op"], {**filtres, **(sous_requete.get("params") or {})})
+            for sous_requete in (requete.get("queries") or {}).values()
+        ]
+    except (ValueError, TypeError, AttributeError, KeyError):
+        # Corps invalide : refusé par la validation (422) sans lecture de la base
+        return "standard"
+
+    classes, total = set(), 0
+    for op, parametres in sous_requetes:
+        # covid.liste -> /api/covid, covid.agregation -> /api/covid/agregation, pays -> /api/pays
+        chemin = "/api/" + str(op).removesuffix(".liste").replace(".", "/")
+        classe, lignes = _cout_lecture(chemin, {
+            nom: [str(element) for element in (valeur if isinstance(valeur, list) else [valeur])]
+            for nom, valeur in parametres.items() if valeur is not None
+        })
+        classes.add(classe)
+        total += lignes
+    if "heavy" in classes or total > ADMISSION_HEAVY_ROWS:
+        return "heavy"
+    return "light" if classes == {"light"} else "standard"
+
+
+def classe_requete(methode: str, chemin: str, query_string: str, corps: Optional[bytes] = None) -> str:
+    """Classe de coût d'une requête de l'API (light, standard ou heavy)
+
+    Un lot est classé d'après son corps (`corps`), lourd s'il n'est pas fourni.
+    """
+    segments = [segment for segment in chemin.split("/") if segment][1:]  # sans le préfixe /api
+    ressource = segments[0] if segments else ""
+    dernier = segments[-1] if len(segments) > 1 else ""
+
+    if methode != "GET":
+        if ressource == "lot":
+            return classe_lot(corps) if corps is not None else "heavy"
+        if dernier in ("bulk", "upload"):
+            return "heavy"
+        return "standard"
+
+    return _cout_lecture(chemin, parse_qs(query_string))[0]
+
+
+class ClasseAdmission:
+    """Requêtes simultanées d'une classe de coût, avec une file d'attente bornée"""
+
+    def __init__(self, nom: str, concurrence: int, file: int):
+        self.nom = nom
+        self.concurrence = concurrence
+        self.file = file
+        self._semaphore = asyncio.Semaphore(concurrence)
+        self.en_cours = 0
+        self.en_attente = 0
+        self.admises = 0
+        self.refusees = 0
+        self.duree_moyenne = 0.1  # moyenne glissante des durées de traitement (secondes)
+
+    async def entrer(self) -> bool:
+        """Obtenir une place, en attendant au plus ADMISSION_QUEUE_TIMEOUT_S ; False si la requête est refusée"""
+        if self._semaphore.locked():
+            if self.en_attente >= self.file:
+                self.refusees += 1
+                return False
+            self.en_attente += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), ADMISSION_QUEUE_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                self.refusees += 1
+                return False
+            finally:
+                self.en_attente -= 1
+        else:
+            await self._semaphore.acquire()
+        self.en_cours += 1
+        self.admises += 1
+        return True
+
+    def sortir(self, duree: float) -> None:
+        self.en_cours -= 1
+        self.duree_moyenne = 0.9 * self.duree_moyenne + 0.1 * duree
+        self._semaphore.release()
+
+    def delai_nouvel_essai(self) -> int:
+        """Secondes à attendre avant de réessayer : temps d'écoulement estimé de la file"""
+        return max(1, math.ceil((self.en_attente + 1) / self.concurrence * self.duree_moyenne))
+
+    def etat(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrence,
+            "queue": self.file,
+            "in_flight": self.en_cours,
+            "waiting": self.en_attente,
+            "admitted": self.admises,
+            "rejected": self.refusees,
+            "avg_duration_s": round(self.duree_moyenne, 4),
+        }
+
+
+# Classes de coût partagées par les requêtes d'un même worker
+classes_admission: Dict[str, ClasseAdmission] = {
+    nom: ClasseAdmission(nom, parametres["concurrency"], parametres["queue"])
+    for nom, parametres in CLASSES_ADMISSION.items()
+}
+
+
+def etat_admission() -> Dict[str, Any]:
+    """Occupation et compteurs de chaque classe de coût"""
+    if not ADMISSION_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, "classes": {nom: classe.etat() for nom, classe in classes_admission.items()}}
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI limitant les requêtes simultanées par classe de coût
+
+    Chaque requête de l'API est classée d'après sa route et son coût estimé
+    (limit, période, nombre de pays), puis attend une place dans sa classe.
+    Une file pleine ou une attente trop longue donne une réponse 503 avec
+    Retry-After : les lectures coûteuses ne peuvent pas épuiser le pool de
+    connexions au détriment des lectures légères. Les chemins commençant
+    par un préfixe de `exclure` ne sont pas limités.
+    """
+
+    def __init__(self, app, prefix: str = "/api", classes: Dict[str, ClasseAdmission] = classes_admission, exclure: tuple = ()):
+        self.app = app
+        self.prefix = prefix
+        self.classes = classes
+        self.exclure = tuple(exclure)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not ADMISSION_ENABLED or scope["type"] != "http"
+            or not scope["path"].startswith(self.prefix) or scope["path"].startswith(self.exclure)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        corps = None
+        if scope["method"] == "POST" and scope["path"].rstrip("/") == self.prefix + "/lot":
+            receive, corps = await self._lire_corps(receive)
+        classe = self.classes[classe_requete(
+            scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"), corps
+        )]
+        if not await classe.entrer():
+            await self._refuser(classe, send)
+            return
+
+        debut = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            classe.sortir(time.perf_counter() - debut)
+
+    @staticmethod
+    async def _lire_corps(receive) -> Tuple[Any, Optional[bytes]]:
+        """Lire le corps d'une requête jusqu'à ADMISSION_BATCH_MAX_BODY octets
+
+        Retourne une fonction receive qui rejoue les messages lus avant de
+        passer la main à l'originale, et le corps (None s'il dépasse la limite).
+        """
+        messages, taille = [], 0
+        while True:
+            message = await receive()
+            messages.append(message)
+            taille += len(message.get("body", b""))
+            if message["type"] != "http.request" or not message.get("more_body") or taille > ADMISSION_BATCH_MAX_BODY:
+                break
+        corps = b"".join(message.get("body", b"") for message in messages)
+        complet = messages[-1]["type"] == "http.request" and not messages[-1].get("more_body")
+
+        async def rejouer():
+            return messages.pop(0) if messages else await receive()
+
+        return rejouer, corps if complet and taille <= ADMISSION_BATCH_MAX_BODY else None
+
+    @staticmethod
+    async def _refuser(classe: ClasseAdmission, send):
+        delai = classe.delai_nouvel_essai()
+        corps = json.dumps(
+            {"detail": f"Serveur surchargé (requêtes {classe.nom}), réessayer dans {delai} s"},
+            ensure_ascii=False
+        ).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(corps)).encode()),
+                (b"retry-after", str(delai).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": corps})
@@ -0,0 +1,214 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Fichier témoin de version des données : partagé entre les workers et les scripts d'import
+DATASET_VERSION_FILE = Path(
+    os.getenv("DATASET_VERSION_FILE", Path(__file__).resolve().parents[2] / "data" / ".version")
+)
+
+# Paramètres du cache de réponses
+RESPONSE_CACHE_MAXSIZE = int(os.getenv("RESPONSE_CACHE_MAXSIZE", "512"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_MAX_BODY = int(os.getenv("RESPONSE_CACHE_MAX_BODY", str(5 * 1024 * 1024)))
+
+# Fonctions appelées à chaque modification des données
+_abonnes_invalidation: List[Callable[[], None]] = []
+
+
+def lire_version(fichier: Path) -> str:
+    """Lire le tampon de version porté par la date de modification d'un fichier témoin"""
+    try:
+        return format(fichier.stat().st_mtime_ns, "x")
+    except FileNotFoundError:
+        return "0"
+
+
+def avancer_version(fichier: Path) -> str:
+    """Faire avancer le tampon de version d'un fichier témoin"""
+    fichier.parent.mkdir(parents=True, exist_ok=True)
+    fichier.touch()
+    # Garantir une version strictement croissante même si deux écritures sont très proches
+    ancienne = fichier.stat().st_mtime_ns
+    nouvelle = max(time.time_ns(), ancienne + 1)
+    os.utime(fichier, ns=(nouvelle, nouvelle))
+    return lire_version(fichier)
+
+
+def version_donnees() -> str:
+    """Retourner le tampon de version courant du jeu de données"""
+    return lire_version(DATASET_VERSION_FILE)
+
+
+def marquer_donnees_modifiees() -> str:
+    """Faire avancer la version des données et prévenir les caches abonnés"""
+    version = avancer_version(DATASET_VERSION_FILE)
+    for callback in _abonnes_invalidation:
+        callback()
+    return version
+
+
+def abonner_invalidation(callback: Callable[[], None]) -> None:
+    """Enregistrer une fonction à appeler lorsque les données changent"""
+    _abonnes_invalidation.append(callback)
+
+
+def modifie_donnees(endpoint):
+    """Décorateur d'endpoint : sa réussite fait avancer la version des données
+
+    L'invalidation est déclarée route par route, et non déduite de la
+    méthode HTTP : une route POST en lecture seule (lots, recherches)
+    laisse les caches intacts.
+    """
+    endpoint.__modifie_donnees__ = True
+    return endpoint
+
+
+class CacheLRU:
+    """Cache borné en taille (LRU) avec durée de vie (TTL) par entrée"""
+
+    def __init__(self, maxsize: int = 512, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entrees: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entree = self._entrees.get(key)
+        if entree is None:
+            return None
+        expiration, valeur = entree
+        if expiration < time.monotonic():
+            del self._entrees[key]
+            return None
+        self._entrees.move_to_end(key)
+        return valeur
+
+    def set(self, key: str, valeur: Any) -> None:
+        self._entrees[key] = (time.monotonic() + self.ttl, valeur)
+        self._entrees.move_to_end(key)
+        while len(self._entrees) > self.maxsize:
+            self._entrees.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entrees.clear()
+
+    def __len__(self) -> int:
+        return len(self._entrees)
+
+
+def cle_requete(path: str, query_string: str) -> str:
+    """Construire une clé de cache à partir de la route et des paramètres normalisés"""
+    params = sorted(parse_qsl(query_string, keep_blank_values=True))
+    return f"{path}?{urlencode(params)}" if params else path
+
+
+def calculer_etag(cle: str, version: str) -> str:
+    """ETag fort dérivé de la version des données et de la clé de requête"""
+    empreinte = hashlib.sha1(cle.encode("utf-8")).hexdigest()[:16]
+    return f'"{version}-{empreinte}"'
+
+
+class ResponseCacheMiddleware:
+    """Middleware ASGI mettant en cache les réponses GET de l'API
+
+    Les réponses sont indexées par route et paramètres normalisés, et
+    servies avec un ETag fort pour permettre les requêtes conditionnelles
+    (If-None-Match -> 304). Toute requête réussie vers une route marquée
+    par @modifie_donnees fait avancer la version des données, ce qui
+    invalide les entrées existantes.
+    Les chemins commençant par un préfixe de `exclure` ne sont ni mis en
+    cache ni comptés comme écritures.
+    """
+
+    def __init__(self, app, prefix: str = "/api", maxsize: int = RESPONSE_CACHE_MAXSIZE, ttl: float = RESPONSE_CACHE_TTL, exclure: tuple = ()):
+        self.app = app
+        self.prefix = prefix
+        self.exclure = tuple(exclure)
+        self.cache = CacheLRU(maxsize=maxsize, ttl=ttl)
+        abonner_invalidation(self.cache.clear)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix) or scope["path"].startswith(self.exclure):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] != "GET":
+            await self._ecriture(scope, receive, send)
+            return
+
+        cle = cle_requete(scope["path"], scope.get("query_string", b"").decode("latin-1"))
+        version = version_donnees()
+        etag = calculer_etag(cle, version)
+
+        entree = self.cache.get(cle)
+        en_cache = entree is not None and entree["version"] == version
+
+        # Requête conditionnelle : le client possède déjà la version courante
+        # ("*" ne vaut que pour une représentation effectivement enregistrée)
+        if_none_match = dict(scope["headers"]).get(b"if-none-match", b"").decode("latin-1")
+        if etag in [valeur.strip() for valeur in if_none_match.split(",")] or (if_none_match.strip() == "*" and en_cache):
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", etag.encode()), (b"cache-control", b"no-cache")],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if en_cache:
+            await send({
+                "type": "http.response.start",
+                "status": entree["status"],
+                "headers": entree["headers"] + [(b"x-cache", b"HIT")],
+            })
+            await send({"type": "http.response.body", "body": entree["body"]})
+            return
+
+        # Cache manquant : exécuter la route et capturer la réponse
+        reponse = {"status": 200, "headers": [], "body": []}
+
+        async def send_capture(message):
+            if message["type"] == "http.response.start":
+                reponse["status"] = message["status"]
+                headers = list(message.get("headers", []))
+                if message["status"] == 200:
+                    headers += [(b"etag", etag.encode()), (b"cache-control", b"no-cache")]
+                reponse["headers"] = headers
+                message = dict(message, headers=headers + [(b"x-cache", b"MISS")])
+            elif message["type"] == "http.response.body":
+                reponse["body"].append(message.get("body", b""))
+                if not message.get("more_body", False) and reponse["status"] == 200:
+                    corps = b"".join(reponse["body"])
+                    if len(corps) <= RESPONSE_CACHE_MAX_BODY:
+                        self.cache.set(cle, {
+                            "version": version,
+                            "status": reponse["status"],
+                            "headers": reponse["headers"],
+                            "body": corps,
+                        })
+            await send(message)
+
+        await self.app(scope, receive, send_capture)
+
+    async def _ecriture(self, scope, receive, send):
+        """Transmettre une requête hors GET et invalider le cache si sa route modifie les données et qu'elle réussit"""
+        async def send_statut(message):
+            # Invalider avant de répondre pour qu'une lecture immédiate voie la nouvelle version ;
+            # le routeur a placé l'endpoint dans le scope
+            if (
+                message["type"] == "http.response.start" and message["status"] < 400
+                and getattr(scope.get("endpoint"), "__modifie_donnees__", False)
+            ):
+                marquer_donnees_modifiees()
+            await send(message)
+
+        await self.app(scope, receive, send_statut)
@@ -0,0 +1,123 @@
+import asyncio
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from backend.app.core.cache import DATASET_VERSION_FILE, avancer_version, lire_version
+from backend.app.models.models import DLocation
+from backend.app.schemas.schemas import DLocationRead
+
+# Fichier témoin propre à la dimension des pays : les écritures sur les faits
+# ne provoquent pas de rechargement, seules les créations/suppressions de pays
+LOCATION_VERSION_FILE = Path(
+    os.getenv("LOCATION_VERSION_FILE", DATASET_VERSION_FILE.with_name(".version_pays"))
+)
+
+
+class CachePays:
+    """Copie en mémoire de la table d_location (quelques centaines de lignes)
+
+    Les recherches par identifiant et par nom ne passent pas par la base.
+    Le cache est rechargé en une requête lorsque le fichier témoin de
+    version change, ce qui propage les invalidations entre les workers.
+    """
+
+    def __init__(self):
+        self._par_id: Dict[int, DLocationRead] = {}
+        self._par_nom: Dict[str, DLocationRead] = {}
+        self._pays: List[DLocationRead] = []
+        self._version: Optional[str] = None
+        self._verrou = asyncio.Lock()
+        self._abonnes: List[Callable[[List[DLocationRead]], None]] = []
+
+    def abonner(self, callback: Callable[[List[DLocationRead]], None]) -> None:
+        """Enregistrer une fonction appelée avec la liste des pays après chaque chargement"""
+        self._abonnes.append(callback)
+        if self._version is not None:
+            callback(self._pays)
+
+    async def charger(self, db: AsyncSession) -> None:
+        """Charger toute la dimension des pays depuis la base"""
+        # Lire la version avant la requête : une modification concurrente provoquera un nouveau chargement
+        version = lire_version(LOCATION_VERSION_FILE)
+        result = await db.execute(
+            select(DLocation.location_id, DLocation.location_name).order_by(DLocation.location_id)
+        )
+        pays = [
+            DLocationRead(location_id=row.location_id, location_name=row.location_name)
+            for row in result.all()
+        ]
+        self._pays = pays
+        self._par_id = {element.location_id: element for element in pays}
+        self._par_nom = {element.location_name: element for element in pays}
+        self._version = version
+        for callback in self._abonnes:
+            callback(pays)
+
+    async def actualiser(self, db: AsyncSession) -> None:
+        """Recharger le cache si la dimension a changé depuis le dernier chargement"""
+        if self._version == lire_version(LOCATION_VERSION_FILE):
+            return
+        async with self._verrou:
+            if self._version != lire_version(LOCATION_VERSION_FILE):
+                await self.charger(db)
+
+    def invalider(self) -> None:
+        """Signaler une modification de d_location à tous les workers"""
+        avancer_version(LOCATION_VERSION_FILE)
+        self._version = None
+
+    async def par_id(self, db: AsyncSession, location_id: int) -> Optional[DLocationRead]:
+        await self.actualiser(db)
+        return self._par_id.get(location_id)
+
+    async def par_nom(self, db: AsyncSession, location_name: str) -> Optional[DLocationRead]:
+        await self.actualiser(db)
+        return self._par_nom.get(location_name)
+
+    async def liste(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[DLocationRead]:
+        await self.actualiser(db)
+        return self._pays[skip:skip + limit]
+
+    async def ids_existants(self, db: AsyncSession, location_ids: Iterable[int]) -> Set[int]:
+        await self.actualiser(db)
+        return {location_id for location_id in location_ids if location_id in self._par_id}
+
+    async def resoudre(
+        self,
+        db: AsyncSession,
+        location_id: Optional[int] = None,
+        location_ids: Optional[Iterable[int]] = None,
+        location_names: Optional[Iterable[str]] = None
+    ) -> Optional[List[int]]:
+        """Réunir (union) les pays désignés par identifiant ou par nom (None si aucun filtre n'est donné)
+
+        Un nom inconnu est une erreur (ValueError) : la requête ne se réduit pas
+        silencieusement aux autres pays.
+        """
+        if location_id is None and location_ids is None and location_names is None:
+            return None
+        await self.actualiser(db)
+        ids = set(location_ids or [])
+        if location_id is not None:
+            ids.add(location_id)
+        inconnus = []
+        for nom in location_names or []:
+            pays = self._par_nom.get(nom)
+            if pays is None:
+                inconnus.append(nom)
+            else:
+                ids.add(pays.location_id)
+        if inconnus:
+            raise ValueError(f"Pays inconnu(s): {', '.join(inconnus)}")
+        return sorted(ids)
+
+    def __len__(self) -> int:
+        return len(self._pays)
+
+
+# Instance partagée par les endpoints d'un même worker
+cache_pays = CachePays()
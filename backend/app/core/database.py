@@ -1,7 +1,18 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from pathlib import Path
+from typing import Any, Dict, Optional
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
+from backend.app.core.cache import DATASET_VERSION_FILE, lire_version
+from backend.app.core.metriques import METRICS_ENABLED, classe_pool, instrumenter_engine
+from backend.app.core.requetes_lentes import requetes_lentes
+from backend.app.core.tracage import TRACING_ENABLED, tracer_engine
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -13,8 +24,204 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL n'est pas défini dans le fichier .env")
 
-# Créer l'engine SQLAlchemy
-engine = create_async_engine(DATABASE_URL, echo=True)
+# Profils de configuration de l'engine, surchargeables paramètre par paramètre
+# par les variables DB_<PARAMETRE> (ex. DB_POOL_SIZE=40, DB_ECHO=false)
+PROFILS_DB: Dict[str, Dict[str, Any]] = {
+    # Développement : journalisation SQL complète, petit pool
+    "dev": {
+        "echo": True,
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 0,
+        "prepared_statement_cache_size": 100,
+        "pool_warmup": 0,
+    },
+    # Production : pas de journalisation SQL, pool dimensionné pour la concurrence,
+    # attente de connexion courte et requêtes interrompues au-delà de 30 s
+    "prod": {
+        "echo": False,
+        "pool_size": 20,
+        "max_overflow": 30,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 30000,
+        "prepared_statement_cache_size": 500,
+        "pool_warmup": 5,
+    },
+    # Mesures de performance : grand pool, sans vérification des connexions
+    "bench": {
+        "echo": False,
+        "pool_size": 50,
+        "max_overflow": 50,
+        "pool_timeout": 30,
+        "pool_recycle": -1,
+        "pool_pre_ping": False,
+        "statement_timeout_ms": 0,
+        "prepared_statement_cache_size": 1000,
+        "pool_warmup": 10,
+    },
+}
+
+DB_PROFILE = os.getenv("DB_PROFILE", "dev")
+
+# Fichier témoin avancé par les scripts d'import lorsqu'ils recréent les tables : dans chaque
+# worker, les connexions ouvertes avant sont écartées à leur prochain emprunt
+SCHEMA_VERSION_FILE = Path(
+    os.getenv("SCHEMA_VERSION_FILE", DATASET_VERSION_FILE.with_name(".version_schema"))
+)
+
+# Le fichier témoin est relu au plus une fois par intervalle (secondes), pas à chaque emprunt
+SCHEMA_VERSION_CHECK_S = float(os.getenv("SCHEMA_VERSION_CHECK_S", "1"))
+
+_version_schema = {"valeur": "", "lue_a": float("-inf")}
+
+
+def version_schema() -> str:
+    """Tampon de SCHEMA_VERSION_FILE, relu au plus toutes les SCHEMA_VERSION_CHECK_S secondes"""
+    maintenant = time.monotonic()
+    if maintenant - _version_schema["lue_a"] >= SCHEMA_VERSION_CHECK_S:
+        _version_schema["valeur"] = lire_version(SCHEMA_VERSION_FILE)
+        _version_schema["lue_a"] = maintenant
+    return _version_schema["valeur"]
+
+
+def parametres_engine(profil: str = DB_PROFILE) -> Dict[str, Any]:
+    """Paramètres de l'engine pour un profil, après application des variables DB_<PARAMETRE>"""
+    if profil not in PROFILS_DB:
+        raise ValueError(f"Profil de base de données invalide: {profil}. Doit être l'un de: {', '.join(PROFILS_DB)}")
+    parametres = dict(PROFILS_DB[profil])
+    for nom, defaut in parametres.items():
+        valeur = os.getenv(f"DB_{nom.upper()}")
+        if valeur is None:
+            continue
+        if isinstance(defaut, bool):
+            parametres[nom] = valeur.strip().lower() in ("1", "true", "yes", "on")
+        else:
+            parametres[nom] = int(valeur)
+    return parametres
+
+
+PARAMETRES_DB = parametres_engine()
+
+
+def _options_connexion(url: str, parametres: Dict[str, Any]) -> Dict[str, Any]:
+    """Options transmises au pilote asyncpg à l'ouverture de chaque connexion"""
+    if not make_url(url).drivername.endswith("+asyncpg"):
+        return {}
+    server_settings = {"application_name": os.getenv("DB_APPLICATION_NAME", "mspr_api")}
+    if parametres["statement_timeout_ms"] > 0:
+        server_settings["statement_timeout"] = str(parametres["statement_timeout_ms"])
+    options = {
+        "prepared_statement_cache_size": parametres["prepared_statement_cache_size"],
+        "server_settings": server_settings,
+    }
+    if parametres.get("connect_timeout_s"):
+        options["timeout"] = parametres["connect_timeout_s"]
+    return options
+
+
+# Compteurs cumulés de chaque pool de connexions, pour ce worker
+_compteurs_pool: Dict[int, Dict[str, int]] = {}
+
+
+def creer_engine(url: str, parametres: Dict[str, Any] = PARAMETRES_DB) -> AsyncEngine:
+    """Créer un engine selon les paramètres d'un profil, avec les compteurs de son pool"""
+    options = {}
+    if METRICS_ENABLED:
+        # Attente des emprunts de connexion et durée des instructions, exposées sur /metrics
+        options["poolclass"] = classe_pool(make_url(url).render_as_string(hide_password=True))
+    moteur = create_async_engine(
+        url,
+        echo=parametres["echo"],
+        pool_size=parametres["pool_size"],
+        max_overflow=parametres["max_overflow"],
+        pool_timeout=parametres["pool_timeout"],
+        pool_recycle=parametres["pool_recycle"],
+        pool_pre_ping=parametres["pool_pre_ping"],
+        connect_args=_options_connexion(url, parametres),
+        **options
+    )
+    compteurs = {"connexions_ouvertes": 0, "emprunts": 0, "invalidations": 0}
+    _compteurs_pool[id(moteur.sync_engine)] = compteurs
+
+    @event.listens_for(moteur.sync_engine, "connect")
+    def _compter_connexion(dbapi_connection, connection_record):
+        compteurs["connexions_ouvertes"] += 1
+        connection_record.info["version_schema"] = version_schema()
+
+    @event.listens_for(moteur.sync_engine, "checkout")
+    def _compter_emprunt(dbapi_connection, connection_record, connection_proxy):
+        compteurs["emprunts"] += 1
+        # Tables recréées depuis l'ouverture : les instructions préparées de la connexion ne sont
+        # plus valides, le pool la remplace par une nouvelle
+        if connection_record.info.get("version_schema") != version_schema():
+            raise DisconnectionError("Tables recréées depuis l'ouverture de la connexion")
+
+    @event.listens_for(moteur.sync_engine, "invalidate")
+    def _compter_invalidation(dbapi_connection, connection_record, exception):
+        compteurs["invalidations"] += 1
+
+    if METRICS_ENABLED:
+        instrumenter_engine(moteur.sync_engine)
+    if TRACING_ENABLED:
+        tracer_engine(moteur.sync_engine)
+    # Instructions plus lentes que SLOW_QUERY_MS, avec leur plan, sur GET /api/admin/requetes-lentes
+    requetes_lentes.surveiller(moteur)
+    return moteur
+
+
+# Créer l'engine SQLAlchemy (base principale : toutes les écritures)
+engine = creer_engine(DATABASE_URL)
+
+
+def etat_pool(moteur: Optional[AsyncEngine] = None) -> Dict[str, Any]:
+    """Occupation d'un pool de connexions et compteurs cumulés depuis le démarrage du worker"""
+    moteur = moteur or engine
+    pool = moteur.pool
+    compteurs = _compteurs_pool[id(moteur.sync_engine)]
+    return {
+        "profile": DB_PROFILE,
+        "pool_size": pool.size(),
+        "max_overflow": PARAMETRES_DB["max_overflow"],
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "connections_opened": compteurs["connexions_ouvertes"],
+        "checkouts": compteurs["emprunts"],
+        "invalidations": compteurs["invalidations"],
+    }
+
+
+async def prechauffer_pool(moteur: Optional[AsyncEngine] = None, connexions: Optional[int] = None) -> int:
+    """Ouvrir d'avance des connexions du pool (pool_warmup du profil, au plus pool_size)
+
+    Les connexions sont empruntées simultanément pour en établir autant de
+    distinctes, puis rendues au pool : les premières requêtes servies n'ont
+    pas à attendre l'établissement d'une connexion.
+    """
+    moteur = moteur or engine
+    if connexions is None:
+        connexions = PARAMETRES_DB["pool_warmup"]
+    connexions = min(connexions, moteur.pool.size())
+    if connexions <= 0:
+        return 0
+    ouvertes = await asyncio.gather(*[moteur.connect().start() for _ in range(connexions)])
+    await asyncio.gather(*[connexion.close() for connexion in ouvertes])
+    return connexions
+
+
+async def definir_delai_requetes(session: AsyncSession, delai_ms: int) -> None:
+    """Changer le délai maximal des requêtes SQL pour la transaction en cours de la session
+
+    Remplace, jusqu'au commit ou rollback, la valeur statement_timeout du
+    profil (0 pour aucune limite).
+    """
+    await session.execute(text(f"SET LOCAL statement_timeout = {int(delai_ms)}"))
+
 
 # Créer une session asynchrone
 SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
@@ -25,4 +232,4 @@ Base = declarative_base()
 # Fonction pour récupérer une session DB
 async def get_db():
     async with SessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
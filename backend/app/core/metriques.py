@@ -0,0 +1,260 @@
+import bisect
+import functools
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.routing import Match
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Mesures exposées sur GET /metrics (format texte Prometheus), propres à chaque worker
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+
+# Bornes des histogrammes : durées (secondes) et tailles de réponse (octets)
+BORNES_DUREE = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BORNES_TAILLE = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+Etiquettes = Tuple[str, ...]
+
+
+def _valeur_etiquette(valeur: str) -> str:
+    return str(valeur).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _etiquettes(noms: Sequence[str], valeurs: Etiquettes, extra: str = "") -> str:
+    paires = [f'{nom}="{_valeur_etiquette(valeur)}"' for nom, valeur in zip(noms, valeurs)]
+    if extra:
+        paires.append(extra)
+    return "{" + ",".join(paires) + "}" if paires else ""
+
+
+def _nombre(valeur: float) -> str:
+    return repr(float(valeur)) if valeur != int(valeur) else str(int(valeur))
+
+
+class Metrique(ABC):
+    """Métrique nommée avec ses étiquettes ; chaque combinaison de valeurs forme une série"""
+
+    type = "untyped"
+
+    def __init__(self, nom: str, aide: str, etiquettes: Sequence[str] = ()):
+        self.nom = nom
+        self.aide = aide
+        self.etiquettes = tuple(etiquettes)
+        registre.append(self)
+
+    def lignes(self) -> List[str]:
+        return [f"# HELP {self.nom} {self.aide}", f"# TYPE {self.nom} {self.type}"] + self.series()
+
+    @abstractmethod
+    def series(self) -> List[str]:
+        ...
+
+
+class Compteur(Metrique):
+    type = "counter"
+
+    def __init__(self, nom: str, aide: str, etiquettes: Sequence[str] = ()):
+        super().__init__(nom, aide, etiquettes)
+        self._valeurs: Dict[Etiquettes, float] = {}
+
+    def inc(self, etiquettes: Etiquettes = (), valeur: float = 1) -> None:
+        self._valeurs[etiquettes] = self._valeurs.get(etiquettes, 0) + valeur
+
+    def series(self) -> List[str]:
+        return [
+            f"{self.nom}{_etiquettes(self.etiquettes, cle)} {_nombre(valeur)}"
+            for cle, valeur in sorted(self._valeurs.items())
+        ]
+
+
+class Jauge(Compteur):
+    type = "gauge"
+
+    def dec(self, etiquettes: Etiquettes = (), valeur: float = 1) -> None:
+        self.inc(etiquettes, -valeur)
+
+
+class JaugeCalculee(Metrique):
+    """Jauge (ou compteur) dont les valeurs sont lues au moment de l'exposition"""
+
+    def __init__(self, nom: str, aide: str, etiquettes: Sequence[str], lire: Callable[[], Dict[Etiquettes, float]], type: str = "gauge"):
+        super().__init__(nom, aide, etiquettes)
+        self.lire = lire
+        self.type = type
+
+    def series(self) -> List[str]:
+        return [
+            f"{self.nom}{_etiquettes(self.etiquettes, cle)} {_nombre(valeur)}"
+            for cle, valeur in sorted(self.lire().items())
+        ]
+
+
+class Histogramme(Metrique):
+    """Histogramme à bornes fixes : une observation coûte une recherche dichotomique et trois additions"""
+
+    type = "histogram"
+
+    def __init__(self, nom: str, aide: str, etiquettes: Sequence[str] = (), bornes: Sequence[float] = BORNES_DUREE):
+        super().__init__(nom, aide, etiquettes)
+        self.bornes = tuple(bornes)
+        # Par série : effectif de chaque intervalle (le dernier au-delà de la plus grande borne), somme, total
+        self._series: Dict[Etiquettes, list] = {}
+
+    def observer(self, valeur: float, etiquettes: Etiquettes = ()) -> None:
+        serie = self._series.get(etiquettes)
+        if serie is None:
+            serie = self._series[etiquettes] = [[0] * (len(self.bornes) + 1), 0.0, 0]
+        serie[0][bisect.bisect_left(self.bornes, valeur)] += 1
+        serie[1] += valeur
+        serie[2] += 1
+
+    def series(self) -> List[str]:
+        lignes = []
+        for cle, (effectifs, somme, total) in sorted(self._series.items()):
+            cumul = 0
+            for borne, effectif in zip(self.bornes, effectifs):
+                cumul += effectif
+                le = 'le="' + _nombre(borne) + '"'
+                lignes.append(f"{self.nom}_bucket{_etiquettes(self.etiquettes, cle, le)} {cumul}")
+            le = 'le="+Inf"'
+            lignes.append(f"{self.nom}_bucket{_etiquettes(self.etiquettes, cle, le)} {total}")
+            lignes.append(f"{self.nom}_sum{_etiquettes(self.etiquettes, cle)} {_nombre(somme)}")
+            lignes.append(f"{self.nom}_count{_etiquettes(self.etiquettes, cle)} {total}")
+        return lignes
+
+
+# Métriques du worker, dans l'ordre d'exposition
+registre: List[Metrique] = []
+
+duree_requetes = Histogramme(
+    "api_request_duration_seconds", "Durée de traitement des requêtes HTTP", ("method", "route", "status")
+)
+requetes_en_cours = Jauge("api_requests_in_flight", "Requêtes HTTP en cours de traitement", ("method",))
+taille_reponses = Histogramme(
+    "api_response_size_bytes", "Taille du corps des réponses HTTP", ("route",), BORNES_TAILLE
+)
+cache_reponses = Compteur(
+    "api_response_cache_total", "Réponses GET servies depuis le cache (hit, 304) ou calculées (miss)", ("result",)
+)
+attente_pool = Histogramme(
+    "db_pool_checkout_seconds",
+    "Attente d'une connexion du pool (y compris l'ouverture d'une nouvelle connexion)",
+    ("database",)
+)
+duree_instructions = Histogramme(
+    "db_statement_duration_seconds", "Durée d'exécution des instructions SQL", ("operation", "table")
+)
+
+
+def exposer() -> str:
+    """Toutes les métriques du worker au format texte de Prometheus"""
+    return "\n".join(ligne for metrique in registre for ligne in metrique.lignes()) + "\n"
+
+
+# Instruction SQL -> (opération, table principale), pour des étiquettes de cardinalité bornée
+_OPERATIONS_SQL = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "COPY", "BEGIN", "COMMIT", "ROLLBACK", "SET", "EXPLAIN"}
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+\"?(\w+)", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def _instruction(statement: str) -> Tuple[str, str]:
+    mots = statement.lstrip().split(None, 1)
+    operation = mots[0].upper() if mots else ""
+    if operation not in _OPERATIONS_SQL:
+        operation = "OTHER"
+    table = _TABLE.search(statement)
+    return operation, table.group(1) if table else ""
+
+
+def instrumenter_engine(moteur) -> None:
+    """Mesurer la durée des instructions SQL exécutées par un engine (sync_engine d'un AsyncEngine)"""
+    @event.listens_for(moteur, "before_cursor_execute")
+    def _debut(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metriques_debut", []).append(time.perf_counter())
+
+    @event.listens_for(moteur, "after_cursor_execute")
+    def _fin(conn, cursor, statement, parameters, context, executemany):
+        debut = conn.info["metriques_debut"].pop()
+        duree_instructions.observer(time.perf_counter() - debut, _instruction(statement))
+
+    @event.listens_for(moteur, "handle_error")
+    def _erreur(contexte):
+        pile = contexte.connection.info.get("metriques_debut") if contexte.connection is not None else None
+        if pile:
+            pile.pop()
+
+
+def classe_pool(database: str):
+    """Classe de pool mesurant l'attente de chaque emprunt de connexion (poolclass de create_async_engine)"""
+    class PoolMesure(AsyncAdaptedQueuePool):
+        def _do_get(self):
+            debut = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                attente_pool.observer(time.perf_counter() - debut, (database,))
+    return PoolMesure
+
+
+@functools.lru_cache(maxsize=2048)
+def modele_route(app, methode: str, chemin: str) -> str:
+    """Modèle de chemin de la route correspondant à une requête (ex. /api/pays/{location_id})"""
+    scope = {"type": "http", "method": methode, "path": chemin, "root_path": ""}
+    for route in app.router.routes:
+        correspondance, _ = route.matches(scope)
+        if correspondance == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetriquesMiddleware:
+    """Middleware ASGI mesurant durée, taille et statut des réponses par route
+
+    La route est le modèle de chemin (ex. /api/covid/{covid_fact_id}) et non
+    le chemin demandé, pour que le nombre de séries reste borné.
+    """
+
+    def __init__(self, app, exclure: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.exclure = tuple(exclure)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclure:
+            await self.app(scope, receive, send)
+            return
+
+        methode = scope["method"]
+        reponse = {"status": 500, "taille": 0, "cache": None}
+
+        async def send_mesure(message):
+            if message["type"] == "http.response.start":
+                reponse["status"] = message["status"]
+                for nom, valeur in message.get("headers", []):
+                    if nom == b"x-cache":
+                        reponse["cache"] = valeur.decode("latin-1").lower()
+            elif message["type"] == "http.response.body":
+                reponse["taille"] += len(message.get("body", b""))
+            await send(message)
+
+        requetes_en_cours.inc((methode,))
+        debut = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_mesure)
+        finally:
+            duree = time.perf_counter() - debut
+            requetes_en_cours.dec((methode,))
+            route = scope["route"].path if "route" in scope else modele_route(scope["app"], methode, scope["path"])
+            duree_requetes.observer(duree, (methode, route, str(reponse["status"])))
+            taille_reponses.observer(reponse["taille"], (route,))
+            if reponse["status"] == 304:
+                cache_reponses.inc(("not_modified",))
+            elif reponse["cache"] is not None:
+                cache_reponses.inc((reponse["cache"],))
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import os
+import threading
+from collections import namedtuple
+from pathlib import Path
+from typing import Any, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import Numeric, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.app.core.cache import version_donnees
+from backend.app.core.cache_pays import cache_pays
+from backend.app.models.models import DLocation, FCovid, FMpox
+
+try:
+    import duckdb
+except ImportError:  # duckdb est optionnel : les requêtes analytiques restent sur PostgreSQL
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Moteur des requêtes analytiques (agrégations, séries, comparaisons) : postgres | duckdb
+ANALYTICS_BACKEND = os.getenv("ANALYTICS_BACKEND", "postgres")
+
+# Dossier des fichiers produits par l'ETL (covid_processed.csv / .parquet, mpox_processed.csv / .parquet)
+ANALYTICS_DATA_DIR = Path(
+    os.getenv("ANALYTICS_DATA_DIR", Path(__file__).resolve().parents[2] / "data")
+)
+
+# Nombre de threads de DuckDB (par défaut : un par cœur)
+ANALYTICS_DUCKDB_THREADS = os.getenv("ANALYTICS_DUCKDB_THREADS")
+
+# Fichiers de l'ETL dont sont reconstruites les tables de faits
+# (mêmes noms de tables et de colonnes que dans PostgreSQL)
+SOURCES = {FCovid: "covid_processed", FMpox: "mpox_processed"}
+
+# Les requêtes SQLAlchemy sont compilées pour PostgreSQL (syntaxe comprise par
+# DuckDB) avec des paramètres positionnels "?"
+_DIALECTE = postgresql.dialect(paramstyle="qmark")
+
+
+class MoteurDuckDB:
+    """Base DuckDB en mémoire chargée depuis les fichiers de l'ETL
+
+    Les tables d_location, f_covid et f_mpox y sont reconstruites comme
+    le fait import_db.py (identifiants de pays dans l'ordre d'apparition
+    de covid_processed.csv), si bien que les requêtes construites pour
+    PostgreSQL s'y exécutent sans modification. Les données sont
+    rechargées lorsque les fichiers changent.
+    """
+
+    def __init__(self, dossier: Path):
+        self.dossier = dossier
+        self._connexion = None
+        self._signature: Optional[str] = None
+        self._verrou = threading.Lock()
+
+    def _fichier(self, nom: str) -> Path:
+        parquet = self.dossier / f"{nom}.parquet"
+        return parquet if parquet.exists() else self.dossier / f"{nom}.csv"
+
+    def version(self) -> str:
+        """Tampon de version des fichiers sources (dates de modification)"""
+        return "-".join(
+            format(self._fichier(nom).stat().st_mtime_ns, "x") for nom in SOURCES.values()
+        )
+
+    @staticmethod
+    def _lecture(fichier: Path) -> str:
+        chemin = str(fichier).replace("'", "''")
+        if fichier.suffix == ".parquet":
+            return f"read_parquet('{chemin}')"
+        return f"read_csv('{chemin}', header = true)"
+
+    def _charger(self):
+        config = {"threads": int(ANALYTICS_DUCKDB_THREADS)} if ANALYTICS_DUCKDB_THREADS else {}
+        connexion = duckdb.connect(":memory:", config=config)
+        for modele, nom in SOURCES.items():
+            connexion.execute(
+                f"CREATE TABLE {modele.__tablename__}_source AS SELECT * FROM {self._lecture(self._fichier(nom))}"
+            )
+
+        # Dimension des pays : ordre de première apparition dans le fichier COVID, à partir de 0
+        connexion.execute(
+            "CREATE TABLE d_location AS "
+            "SELECT CAST(row_number() OVER (ORDER BY min(rowid)) - 1 AS INTEGER) AS location_id, "
+            "location AS location_name FROM f_covid_source GROUP BY location"
+        )
+        for modele in SOURCES:
+            table = modele.__tablename__
+            metriques = [colonne.name for colonne in modele.__table__.columns if isinstance(colonne.type, Numeric)]
+            colonnes = ", ".join(f"TRY_CAST(s.{metrique} AS DOUBLE) AS {metrique}" for metrique in metriques)
+            connexion.execute(
+                f"CREATE TABLE {table} AS "
+                f"SELECT l.location_id, CAST(s.date AS DATE) AS date, {colonnes} "
+                f"FROM {table}_source s JOIN d_location l ON l.location_name = s.location "
+                f"ORDER BY l.location_id, date"
+            )
+            connexion.execute(f"DROP TABLE {table}_source")
+        return connexion
+
+    def _curseur(self):
+        signature = self.version()
+        with self._verrou:
+            if self._connexion is None or signature != self._signature:
+                self._connexion = self._charger()
+                self._signature = signature
+                logger.info(f"Fichiers de l'ETL chargés dans DuckDB depuis {self.dossier}")
+            return self._connexion.cursor()
+
+    def _executer(self, sql: str, parametres: List[Any]) -> List[Any]:
+        curseur = self._curseur()
+        try:
+            curseur.execute(sql, parametres)
+            Ligne = namedtuple("Ligne", [colonne[0] for colonne in curseur.description], rename=True)
+            return [Ligne(*ligne) for ligne in curseur.fetchall()]
+        finally:
+            curseur.close()
+
+    async def charger(self) -> None:
+        """Charger les fichiers de l'ETL sans attendre la première requête"""
+        await asyncio.to_thread(lambda: self._curseur().close())
+
+    async def executer(self, query) -> List[Any]:
+        """Exécuter une requête SQLAlchemy dans DuckDB (hors de la boucle d'événements)"""
+        compilee = query.compile(dialect=_DIALECTE, compile_kwargs={"render_postcompile": True})
+        parametres = [compilee.params[nom] for nom in compilee.positiontup]
+        return await asyncio.to_thread(self._executer, str(compilee), parametres)
+
+
+def _moteur() -> Optional[MoteurDuckDB]:
+    if ANALYTICS_BACKEND != "duckdb":
+        return None
+    if duckdb is None:
+        logger.warning("ANALYTICS_BACKEND=duckdb mais duckdb n'est pas installé : requêtes analytiques sur PostgreSQL")
+        return None
+    return MoteurDuckDB(ANALYTICS_DATA_DIR)
+
+
+# Moteur DuckDB partagé par les requêtes d'un même worker (None : PostgreSQL)
+moteur_duckdb = _moteur()
+
+
+async def executer_analytique(db: AsyncSession, query) -> List[Any]:
+    """Exécuter une requête analytique sur DuckDB s'il est activé, sinon via la session PostgreSQL"""
+    if moteur_duckdb is not None:
+        return await moteur_duckdb.executer(query)
+    result = await db.execute(query)
+    return result.fetchall()
+
+
+def version_analytique() -> str:
+    """Version des données servies par le moteur analytique (clé du cache de requêtes)"""
+    if moteur_duckdb is not None:
+        return f"duckdb-{moteur_duckdb.version()}"
+    return version_donnees()
+
+
+async def resoudre_pays_analytique(
+    db: AsyncSession,
+    location_id: Optional[int] = None,
+    location_ids: Optional[List[int]] = None,
+    location_names: Optional[List[str]] = None
+) -> Optional[List[int]]:
+    """Réunir les pays désignés par identifiant ou par nom, dans la dimension du moteur analytique
+
+    Même règle que cache_pays.resoudre : union des filtres, nom inconnu refusé (ValueError).
+    """
+    if moteur_duckdb is None:
+        return await cache_pays.resoudre(db, location_id, location_ids, location_names)
+    if location_id is None and location_ids is None and location_names is None:
+        return None
+    ids = set(location_ids or [])
+    if location_id is not None:
+        ids.add(location_id)
+    if location_names:
+        lignes = await moteur_duckdb.executer(
+            select(DLocation.location_id, DLocation.location_name).where(DLocation.location_name.in_(location_names))
+        )
+        trouves = {ligne.location_name: ligne.location_id for ligne in lignes}
+        inconnus = [nom for nom in location_names if nom not in trouves]
+        if inconnus:
+            raise ValueError(f"Pays inconnu(s): {', '.join(inconnus)}")
+        ids.update(trouves.values())
+    return sorted(ids)
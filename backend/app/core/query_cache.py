@@ -0,0 +1,391 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from contextlib import closing
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set
+
+from dotenv import load_dotenv
+
+from backend.app.core.cache import abonner_invalidation, version_donnees
+
+# Charger les variables d'environnement
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration du cache partagé entre les workers
+QUERY_CACHE_BACKEND = os.getenv("QUERY_CACHE_BACKEND", "sqlite")  # sqlite | redis | none
+QUERY_CACHE_URL = os.getenv("QUERY_CACHE_URL")
+QUERY_CACHE_SQLITE_PATH = str(Path(__file__).resolve().parents[2] / "data" / "query_cache.sqlite")
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "600"))
+
+# Durée maximale pendant laquelle un worker attend le résultat calculé par un autre
+QUERY_CACHE_LOCK_TTL = float(os.getenv("QUERY_CACHE_LOCK_TTL", "30"))
+
+# Compteur de version des données conservé dans le backend partagé (Redis), avancé par
+# chaque écriture de l'API et par import_db.py, quel que soit l'hôte
+CLE_VERSION_PARTAGEE = "qc:version"
+
+
+# ----------- Sérialisation -----------#
+def _encoder(valeur: Any) -> Any:
+    """Encoder les types non JSON (dates, décimaux, objets ORM)"""
+    if isinstance(valeur, datetime):
+        return {"__datetime__": valeur.isoformat()}
+    if isinstance(valeur, date):
+        return {"__date__": valeur.isoformat()}
+    if isinstance(valeur, Decimal):
+        return {"__decimal__": str(valeur)}
+    if hasattr(valeur, "__table__"):
+        colonnes = {c.key: getattr(valeur, c.key) for c in valeur.__table__.columns}
+        return {"__modele__": type(valeur).__name__, "colonnes": colonnes}
+    raise TypeError(f"Type non sérialisable: {type(valeur).__name__}")
+
+
+def _decoder(objet: Dict[str, Any]) -> Any:
+    """Reconstruire les types encodés par _encoder"""
+    if "__datetime__" in objet:
+        return datetime.fromisoformat(objet["__datetime__"])
+    if "__date__" in objet:
+        return date.fromisoformat(objet["__date__"])
+    if "__decimal__" in objet:
+        return Decimal(objet["__decimal__"])
+    if "__modele__" in objet:
+        from backend.app.models import models
+        return getattr(models, objet["__modele__"])(**objet["colonnes"])
+    return objet
+
+
+def serialiser(valeur: Any) -> bytes:
+    return json.dumps(valeur, default=_encoder, separators=(",", ":")).encode("utf-8")
+
+
+def deserialiser(donnees: bytes) -> Any:
+    return json.loads(donnees, object_hook=_decoder)
+
+
+# ----------- Backends -----------#
+class BackendCache(ABC):
+    """Interface commune des stockages du cache partagé"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, valeur: bytes, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def acquerir_verrou(self, key: str, ttl: float) -> bool:
+        ...
+
+    @abstractmethod
+    async def liberer_verrou(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def verrou_present(self, key: str) -> bool:
+        ...
+
+    async def version(self) -> str:
+        """Version des données propre au backend, ajoutée aux clés
+
+        Un backend local à la machine n'en a pas besoin : le fichier témoin
+        de version est déjà partagé par ses workers.
+        """
+        return ""
+
+    async def avancer_version(self) -> None:
+        """Faire avancer la version des données propre au backend"""
+
+
+class SQLiteBackend(BackendCache):
+    """Stockage sur disque local partagé par tous les workers d'une même machine"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._ecritures = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connexion()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS verrous (key TEXT PRIMARY KEY, expires REAL)"
+            )
+
+    def _connexion(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with closing(self._connexion()) as conn:
+            row = conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, valeur: bytes, ttl: float) -> None:
+        with closing(self._connexion()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, valeur, time.time() + ttl)
+            )
+            # Purger régulièrement les entrées expirées (anciennes versions comprises)
+            self._ecritures += 1
+            if self._ecritures % 256 == 0:
+                conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+
+    def _acquerir_verrou(self, key: str, ttl: float) -> bool:
+        maintenant = time.time()
+        with closing(self._connexion()) as conn:
+            conn.execute("DELETE FROM verrous WHERE key = ? AND expires <= ?", (key, maintenant))
+            curseur = conn.execute(
+                "INSERT OR IGNORE INTO verrous (key, expires) VALUES (?, ?)", (key, maintenant + ttl)
+            )
+            return curseur.rowcount == 1
+
+    def _liberer_verrou(self, key: str) -> None:
+        with closing(self._connexion()) as conn:
+            conn.execute("DELETE FROM verrous WHERE key = ?", (key,))
+
+    def _verrou_present(self, key: str) -> bool:
+        with closing(self._connexion()) as conn:
+            return conn.execute(
+                "SELECT 1 FROM verrous WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone() is not None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, valeur: bytes, ttl: float) -> None:
+        await asyncio.to_thread(self._set, key, valeur, ttl)
+
+    async def acquerir_verrou(self, key: str, ttl: float) -> bool:
+        return await asyncio.to_thread(self._acquerir_verrou, key, ttl)
+
+    async def liberer_verrou(self, key: str) -> None:
+        await asyncio.to_thread(self._liberer_verrou, key)
+
+    async def verrou_present(self, key: str) -> bool:
+        return await asyncio.to_thread(self._verrou_present, key)
+
+
+class RedisBackend(BackendCache):
+    """Stockage compatible avec le protocole Redis (nécessite le paquet `redis`)"""
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ImportError(
+                "Le backend Redis nécessite le paquet 'redis' (pip install redis)"
+            ) from None
+        self.client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, valeur: bytes, ttl: float) -> None:
+        await self.client.set(key, valeur, px=int(ttl * 1000))
+
+    async def acquerir_verrou(self, key: str, ttl: float) -> bool:
+        return bool(await self.client.set(f"verrou:{key}", b"1", nx=True, px=int(ttl * 1000)))
+
+    async def liberer_verrou(self, key: str) -> None:
+        await self.client.delete(f"verrou:{key}")
+
+    async def verrou_present(self, key: str) -> bool:
+        return bool(await self.client.exists(f"verrou:{key}"))
+
+    async def version(self) -> str:
+        # Le fichier témoin est propre à chaque hôte : le compteur partagé
+        # garantit qu'une écriture sur un hôte change les clés lues par tous
+        valeur = await self.client.get(CLE_VERSION_PARTAGEE)
+        return valeur.decode() if valeur else "0"
+
+    async def avancer_version(self) -> None:
+        await self.client.incr(CLE_VERSION_PARTAGEE)
+
+
+def creer_backend(nom: str = QUERY_CACHE_BACKEND, url: Optional[str] = QUERY_CACHE_URL) -> Optional[BackendCache]:
+    """Instancier le backend configuré (None désactive le cache partagé)"""
+    if nom == "none":
+        return None
+    if nom == "redis":
+        return RedisBackend(url or "redis://localhost:6379/0")
+    if nom == "sqlite":
+        return SQLiteBackend(url or QUERY_CACHE_SQLITE_PATH)
+    raise ValueError(f"Backend de cache inconnu: {nom}. Doit être l'un de: sqlite, redis, none")
+
+
+_backend: Optional[BackendCache] = None
+_backend_initialise = False
+
+# Requêtes en cours dans ce processus, pour ne lancer qu'une seule requête par clé
+_en_cours: Dict[str, asyncio.Future] = {}
+
+
+def obtenir_backend() -> Optional[BackendCache]:
+    global _backend, _backend_initialise
+    if not _backend_initialise:
+        _backend = creer_backend()
+        _backend_initialise = True
+    return _backend
+
+
+# Tâches d'avancement de la version partagée en cours (références conservées jusqu'à leur fin)
+_avancements: Set[asyncio.Task] = set()
+
+
+def _avancer_version_partagee() -> None:
+    """Abonné aux écritures : faire avancer la version du backend partagé"""
+    backend = obtenir_backend()
+    if backend is None:
+        return
+    try:
+        boucle = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+
+    async def avancer():
+        try:
+            await backend.avancer_version()
+        except Exception as e:
+            logger.warning(f"Impossible d'avancer la version du cache partagé: {e}")
+
+    tache = boucle.create_task(avancer())
+    _avancements.add(tache)
+    tache.add_done_callback(_avancements.discard)
+
+
+abonner_invalidation(_avancer_version_partagee)
+
+
+def definir_backend(backend: Optional[BackendCache]) -> None:
+    """Remplacer le backend utilisé (configuration ou tests)"""
+    global _backend, _backend_initialise
+    _backend = backend
+    _backend_initialise = True
+
+
+# ----------- Décorateur -----------#
+def _construire_cle(fonction, signature: inspect.Signature, args, kwargs, version: Callable[[], str], version_backend: str = "") -> str:
+    arguments = signature.bind(*args, **kwargs)
+    arguments.apply_defaults()
+    # Le premier paramètre est la session de base de données : il ne fait pas partie de la clé
+    params = dict(list(arguments.arguments.items())[1:])
+    empreinte = hashlib.sha1(serialiser(params)).hexdigest()
+    return f"qc:{version()}{version_backend and '.' + version_backend}:{fonction.__module__}.{fonction.__qualname__}:{empreinte}"
+
+
+async def _attendre_resultat(backend: BackendCache, cle: str) -> Optional[bytes]:
+    """Attendre qu'un autre worker publie le résultat d'une requête identique
+
+    L'attente cesse dès que le verrou est libéré : si le détenteur a échoué
+    (paramètre invalide, erreur SQL), rien ne sera publié et l'appelant
+    exécute la requête lui-même.
+    """
+    delai = 0.01
+    limite = time.monotonic() + QUERY_CACHE_LOCK_TTL
+    while time.monotonic() < limite:
+        await asyncio.sleep(delai)
+        donnees = await backend.get(cle)
+        if donnees is not None:
+            return donnees
+        if not await backend.verrou_present(cle):
+            # Le résultat a pu être publié juste avant la libération du verrou
+            return await backend.get(cle)
+        delai = min(delai * 2, 0.5)
+    return None
+
+
+def cache_requete(ttl: Optional[float] = None, version: Callable[[], str] = version_donnees):
+    """Mettre en cache le résultat d'une fonction CRUD de lecture dans le cache partagé
+
+    La clé dépend des arguments (hors session) et de la version des données
+    (fichier témoin local et, pour Redis, compteur partagé entre les hôtes),
+    si bien que toute écriture ou tout import invalide les entrées existantes.
+    `version` fournit ce tampon lorsque les données ne viennent pas de PostgreSQL.
+    """
+    duree = ttl if ttl is not None else QUERY_CACHE_TTL
+
+    def decorateur(fonction):
+        signature = inspect.signature(fonction)
+
+        async def calculer(backend: BackendCache, cle: str, args, kwargs):
+            verrou = False
+            try:
+                verrou = await backend.acquerir_verrou(cle, QUERY_CACHE_LOCK_TTL)
+                if not verrou:
+                    donnees = await _attendre_resultat(backend, cle)
+                    if donnees is not None:
+                        return deserialiser(donnees)
+            except Exception as e:
+                logger.warning(f"Cache partagé indisponible: {e}")
+
+            try:
+                resultat = await fonction(*args, **kwargs)
+                try:
+                    await backend.set(cle, serialiser(resultat), duree)
+                except Exception as e:
+                    logger.warning(f"Impossible d'écrire dans le cache partagé: {e}")
+                return resultat
+            finally:
+                if verrou:
+                    try:
+                        await backend.liberer_verrou(cle)
+                    except Exception as e:
+                        logger.warning(f"Impossible de libérer le verrou du cache partagé: {e}")
+
+        @functools.wraps(fonction)
+        async def wrapper(*args, **kwargs):
+            backend = obtenir_backend()
+            if backend is None:
+                return await fonction(*args, **kwargs)
+
+            try:
+                cle = _construire_cle(fonction, signature, args, kwargs, version, await backend.version())
+                donnees = await backend.get(cle)
+                if donnees is not None:
+                    return deserialiser(donnees)
+            except Exception as e:
+                logger.warning(f"Cache partagé indisponible: {e}")
+                return await fonction(*args, **kwargs)
+
+            # Regrouper les requêtes identiques simultanées de ce processus
+            futur = _en_cours.get(cle)
+            if futur is not None:
+                return await asyncio.shield(futur)
+
+            futur = asyncio.get_running_loop().create_future()
+            _en_cours[cle] = futur
+            try:
+                resultat = await calculer(backend, cle, args, kwargs)
+                futur.set_result(resultat)
+                return resultat
+            except asyncio.CancelledError:
+                futur.cancel()
+                raise
+            except Exception as e:
+                futur.set_exception(e)
+                # Éviter l'avertissement "exception never retrieved" s'il n'y a pas d'attente
+                futur.exception()
+                raise
+            finally:
+                del _en_cours[cle]
+
+        return wrapper
+
+    return decorateur
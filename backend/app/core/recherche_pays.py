@@ -0,0 +1,210 @@
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.app.core.cache_pays import cache_pays
+from backend.app.schemas.schemas import DLocationRead
+
+# Similarité trigramme minimale pour qu'un nom approché soit proposé (même seuil que pg_trgm)
+SEUIL_SIMILARITE = 0.3
+
+# Autres noms usuels des pays, indexés par leur nom dans d_location (format OWID)
+ALIAS_PAYS: Dict[str, List[str]] = {
+    "United States": ["USA", "US", "United States of America", "America", "États-Unis", "Amérique"],
+    "United Kingdom": ["UK", "Great Britain", "Britain", "England", "Royaume-Uni", "Angleterre", "Grande-Bretagne"],
+    "Germany": ["Allemagne", "Deutschland"],
+    "France": ["République française"],
+    "Spain": ["Espagne", "España"],
+    "Italy": ["Italie", "Italia"],
+    "Portugal": [],
+    "Belgium": ["Belgique", "België"],
+    "Netherlands": ["Pays-Bas", "Holland", "Hollande", "Nederland"],
+    "Switzerland": ["Suisse", "Schweiz"],
+    "Austria": ["Autriche", "Österreich"],
+    "Ireland": ["Irlande", "Eire"],
+    "Denmark": ["Danemark"],
+    "Sweden": ["Suède", "Sverige"],
+    "Norway": ["Norvège", "Norge"],
+    "Finland": ["Finlande", "Suomi"],
+    "Poland": ["Pologne", "Polska"],
+    "Czechia": ["Czech Republic", "République tchèque", "Tchéquie"],
+    "Greece": ["Grèce", "Hellas"],
+    "Hungary": ["Hongrie"],
+    "Romania": ["Roumanie"],
+    "Russia": ["Russian Federation", "Russie"],
+    "Ukraine": [],
+    "Turkey": ["Türkiye", "Turquie"],
+    "Canada": [],
+    "Mexico": ["Mexique", "México"],
+    "Brazil": ["Brésil", "Brasil"],
+    "Argentina": ["Argentine"],
+    "Chile": ["Chili"],
+    "Colombia": ["Colombie"],
+    "Peru": ["Pérou"],
+    "China": ["Chine", "PRC", "People's Republic of China"],
+    "Japan": ["Japon", "Nippon"],
+    "South Korea": ["Korea", "Republic of Korea", "Corée du Sud", "Corée"],
+    "North Korea": ["DPRK", "Corée du Nord"],
+    "India": ["Inde", "Bharat"],
+    "Indonesia": ["Indonésie"],
+    "Thailand": ["Thaïlande"],
+    "Vietnam": ["Viet Nam"],
+    "Philippines": [],
+    "Singapore": ["Singapour"],
+    "Australia": ["Australie"],
+    "New Zealand": ["Nouvelle-Zélande"],
+    "South Africa": ["Afrique du Sud"],
+    "Egypt": ["Égypte"],
+    "Morocco": ["Maroc"],
+    "Algeria": ["Algérie"],
+    "Tunisia": ["Tunisie"],
+    "Nigeria": ["Nigéria"],
+    "Cameroon": ["Cameroun"],
+    "Cote d'Ivoire": ["Ivory Coast", "Côte d'Ivoire"],
+    "Democratic Republic of Congo": ["DRC", "DR Congo", "Congo-Kinshasa", "RDC", "République démocratique du Congo"],
+    "Congo": ["Republic of the Congo", "Congo-Brazzaville"],
+    "Saudi Arabia": ["Arabie saoudite"],
+    "United Arab Emirates": ["UAE", "Émirats arabes unis"],
+    "Israel": ["Israël"],
+    "Iran": ["Islamic Republic of Iran"],
+}
+
+
+def normaliser(texte: str) -> str:
+    """Mettre un nom sous forme comparable : sans accents, en minuscules, ponctuation remplacée par des espaces"""
+    texte = unicodedata.normalize("NFKD", texte)
+    texte = "".join(caractere for caractere in texte if not unicodedata.combining(caractere))
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", texte.lower()).split())
+
+
+def trigrammes(texte: str) -> Set[str]:
+    """Découper un texte normalisé en trigrammes, chaque mot étant bordé d'espaces comme dans pg_trgm"""
+    resultat = set()
+    for mot in texte.split():
+        borde = f"  {mot} "
+        resultat.update(borde[i:i + 3] for i in range(len(borde) - 2))
+    return resultat
+
+
+class _NoeudTrie:
+    __slots__ = ("enfants", "correspondances")
+
+    def __init__(self):
+        self.enfants: Dict[str, "_NoeudTrie"] = {}
+        # location_id -> (score de base, terme indexé) pour tout terme passant par ce nœud
+        self.correspondances: Dict[int, Tuple[float, str]] = {}
+
+
+class IndexPays:
+    """Index en mémoire des noms de pays et de leurs alias
+
+    Un arbre préfixe répond aux saisies partielles (début du nom ou d'un
+    de ses mots) et un index inversé de trigrammes tolère les fautes de
+    frappe. Les résultats sont classés par score décroissant :
+    correspondance exacte, préfixe du nom, préfixe d'un mot, puis
+    similarité trigramme.
+    """
+
+    def __init__(self, pays: Optional[List[DLocationRead]] = None):
+        self.construire(pays or [])
+
+    def construire(self, pays: List[DLocationRead]) -> None:
+        """Reconstruire l'index à partir de la liste complète des pays"""
+        racine = _NoeudTrie()
+        exacts: Dict[str, Set[int]] = {}
+        termes: List[Tuple[int, str, Set[str]]] = []
+        par_trigramme: Dict[str, List[int]] = {}
+        noms: Dict[int, str] = {}
+
+        for element in pays:
+            noms[element.location_id] = element.location_name
+            for alias in [element.location_name] + ALIAS_PAYS.get(element.location_name, []):
+                terme = normaliser(alias)
+                if not terme:
+                    continue
+                exacts.setdefault(terme, set()).add(element.location_id)
+                # Le terme complet puis chacun de ses mots suivants sont insérés dans l'arbre
+                debuts = [0] + [position + 1 for position, caractere in enumerate(terme) if caractere == " "]
+                for debut in debuts:
+                    self._inserer(racine, terme[debut:], element.location_id, 0.8 if debut == 0 else 0.7, terme)
+                grammes = trigrammes(terme)
+                for gramme in grammes:
+                    par_trigramme.setdefault(gramme, []).append(len(termes))
+                termes.append((element.location_id, terme, grammes))
+
+        # Remplacement en bloc : une recherche concurrente voit l'ancien ou le nouvel index
+        self._racine, self._exacts, self._termes, self._par_trigramme, self._noms = (
+            racine, exacts, termes, par_trigramme, noms
+        )
+
+    @staticmethod
+    def _inserer(racine: _NoeudTrie, suffixe: str, location_id: int, score: float, terme: str) -> None:
+        noeud = racine
+        for caractere in suffixe:
+            noeud = noeud.enfants.setdefault(caractere, _NoeudTrie())
+            actuel = noeud.correspondances.get(location_id)
+            if actuel is None or (score, -len(terme)) > (actuel[0], -len(actuel[1])):
+                noeud.correspondances[location_id] = (score, terme)
+
+    def rechercher(self, q: str, limit: int = 10) -> List[Dict[str, object]]:
+        """Retourner les pays les plus proches de la saisie, classés par score"""
+        requete = normaliser(q)
+        if not requete:
+            return []
+        meilleurs: Dict[int, Tuple[float, str]] = {}
+
+        def proposer(location_id: int, score: float, terme: str) -> None:
+            if location_id not in meilleurs or score > meilleurs[location_id][0]:
+                meilleurs[location_id] = (score, terme)
+
+        for location_id in self._exacts.get(requete, ()):
+            proposer(location_id, 1.0, requete)
+
+        # Préfixe : le score augmente avec la part du terme couverte par la saisie
+        noeud = self._racine
+        for caractere in requete:
+            noeud = noeud.enfants.get(caractere)
+            if noeud is None:
+                break
+        else:
+            for location_id, (base, terme) in noeud.correspondances.items():
+                proposer(location_id, base + 0.1 * len(requete) / len(terme), terme)
+
+        # Similarité trigramme (indice de Jaccard) sur les termes partageant au moins un trigramme
+        grammes = trigrammes(requete)
+        communs = Counter(
+            indice for gramme in grammes for indice in self._par_trigramme.get(gramme, ())
+        )
+        for indice, partages in communs.items():
+            location_id, terme, grammes_terme = self._termes[indice]
+            similarite = partages / (len(grammes) + len(grammes_terme) - partages)
+            if similarite >= SEUIL_SIMILARITE:
+                proposer(location_id, 0.7 * similarite, terme)
+
+        classement = sorted(
+            meilleurs.items(),
+            key=lambda element: (-element[1][0], len(self._noms[element[0]]), self._noms[element[0]])
+        )
+        return [
+            {
+                "location_id": location_id,
+                "location_name": self._noms[location_id],
+                "score": round(score, 3),
+                "match": terme,
+            }
+            for location_id, (score, terme) in classement[:limit]
+        ]
+
+
+# Index partagé, reconstruit à chaque rechargement de la dimension des pays
+index_pays = IndexPays()
+cache_pays.abonner(index_pays.construire)
+
+
+async def rechercher_pays(db: AsyncSession, q: str, limit: int = 10) -> List[Dict[str, object]]:
+    """Rechercher des pays par nom partiel, approché ou alias"""
+    await cache_pays.actualiser(db)
+    return index_pays.rechercher(q, limit)
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Seuil au-delà duquel une instruction SQL est enregistrée (millisecondes, 0 : désactivé)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+
+# Nombre d'instructions lentes conservées (les plus anciennes sont écartées)
+SLOW_QUERY_BUFFER = int(os.getenv("SLOW_QUERY_BUFFER", "100"))
+
+# Plan d'exécution capturé pour les instructions lentes : plan (EXPLAIN seul, par défaut),
+# analyze (EXPLAIN ANALYZE, BUFFERS pour les SELECT, qui réexécute l'instruction lente ;
+# simple EXPLAIN pour les écritures) ou none
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "plan")
+
+# Une même instruction n'est pas réexpliquée avant ce délai (secondes)
+SLOW_QUERY_EXPLAIN_INTERVAL_S = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_S", "60"))
+
+# Plans capturés simultanément au plus (les suivants sont enregistrés sans plan)
+SLOW_QUERY_EXPLAIN_CONCURRENCY = int(os.getenv("SLOW_QUERY_EXPLAIN_CONCURRENCY", "2"))
+
+# Délai maximal d'un EXPLAIN ANALYZE, qui réexécute l'instruction (millisecondes)
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "10000"))
+
+# Taille maximale de la représentation d'un paramètre lié, et nombre de paramètres conservés
+_LONGUEUR_PARAMETRE = 200
+_MAX_PARAMETRES = 50
+
+
+def _parametres(parameters: Any) -> Any:
+    if isinstance(parameters, dict):
+        return {cle: repr(valeur)[:_LONGUEUR_PARAMETRE] for cle, valeur in list(parameters.items())[:_MAX_PARAMETRES]}
+    if isinstance(parameters, (list, tuple)):
+        return [repr(valeur)[:_LONGUEUR_PARAMETRE] for valeur in list(parameters)[:_MAX_PARAMETRES]]
+    return repr(parameters)[:_LONGUEUR_PARAMETRE]
+
+
+class EnregistreurRequetesLentes:
+    """Instructions SQL plus lentes que SLOW_QUERY_MS, avec leur plan d'exécution
+
+    La durée est mesurée par les événements before/after_cursor_execute de
+    chaque engine surveillé. Le plan (EXPLAIN, ou EXPLAIN ANALYZE, BUFFERS
+    avec SLOW_QUERY_EXPLAIN=analyze) est capturé en tâche de fond sur une
+    autre connexion du pool, dans une transaction annulée : la requête qui
+    a déclenché l'enregistrement n'attend pas.
+    Les enregistrements sont conservés dans un tampon circulaire.
+    """
+
+    def __init__(self, seuil_ms: float = SLOW_QUERY_MS, taille: int = SLOW_QUERY_BUFFER):
+        self.seuil_ms = seuil_ms
+        self.enregistrements: deque = deque(maxlen=taille)
+        self.total = 0
+        self._explications: Dict[str, float] = {}
+        self._taches: Set[asyncio.Task] = set()
+
+    def surveiller(self, moteur: AsyncEngine) -> None:
+        """Mesurer les instructions exécutées par un engine"""
+        if self.seuil_ms <= 0:
+            return
+        nom = moteur.url.render_as_string(hide_password=True)
+
+        @event.listens_for(moteur.sync_engine, "before_cursor_execute")
+        def _debut(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("requetes_lentes_debut", []).append(time.perf_counter())
+
+        @event.listens_for(moteur.sync_engine, "after_cursor_execute")
+        def _fin(conn, cursor, statement, parameters, context, executemany):
+            duree_ms = (time.perf_counter() - conn.info["requetes_lentes_debut"].pop()) * 1000
+            if duree_ms >= self.seuil_ms and not conn.info.get("requetes_lentes_explain"):
+                self._enregistrer(moteur, nom, statement, parameters, executemany, duree_ms)
+
+        @event.listens_for(moteur.sync_engine, "handle_error")
+        def _erreur(contexte):
+            pile = contexte.connection.info.get("requetes_lentes_debut") if contexte.connection is not None else None
+            if pile:
+                pile.pop()
+
+    def _enregistrer(self, moteur: AsyncEngine, nom: str, statement: str, parameters: Any, executemany: bool, duree_ms: float) -> None:
+        enregistrement = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "database": nom,
+            "duration_ms": round(duree_ms, 3),
+            "statement": statement,
+            "parameters": _parametres(parameters),
+            "executemany": executemany,
+            "plan": None,
+        }
+        self.enregistrements.append(enregistrement)
+        self.total += 1
+        logger.warning(f"Requête lente ({duree_ms:.0f} ms): {statement[:200]}")
+
+        if SLOW_QUERY_EXPLAIN == "none" or executemany:
+            return
+        maintenant = time.monotonic()
+        if maintenant - self._explications.get(statement, float("-inf")) < SLOW_QUERY_EXPLAIN_INTERVAL_S:
+            enregistrement["plan_skipped"] = "déjà expliquée récemment"
+            return
+        if len(self._taches) >= SLOW_QUERY_EXPLAIN_CONCURRENCY:
+            enregistrement["plan_skipped"] = "trop de plans en cours de capture"
+            return
+        self._explications[statement] = maintenant
+        if len(self._explications) > 10 * SLOW_QUERY_BUFFER:
+            self._explications = {
+                cle: instant for cle, instant in self._explications.items()
+                if maintenant - instant < SLOW_QUERY_EXPLAIN_INTERVAL_S
+            }
+
+        # Les événements s'exécutent dans la boucle de la requête : le plan est capturé par une tâche
+        tache = asyncio.get_running_loop().create_task(self._expliquer(moteur, enregistrement, parameters))
+        self._taches.add(tache)
+        tache.add_done_callback(self._taches.discard)
+
+    async def _expliquer(self, moteur: AsyncEngine, enregistrement: Dict[str, Any], parameters: Any) -> None:
+        statement = enregistrement["statement"]
+        # ANALYZE réexécute l'instruction : réservé aux lectures, dans une transaction annulée
+        analyser = SLOW_QUERY_EXPLAIN == "analyze" and statement.lstrip()[:6].upper() == "SELECT"
+        options = "ANALYZE, BUFFERS" if analyser else "VERBOSE"
+        try:
+            async with moteur.connect() as conn:
+                conn.sync_connection.info["requetes_lentes_explain"] = True
+                try:
+                    await conn.execute(text(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}"))
+                    resultat = await conn.exec_driver_sql(f"EXPLAIN ({options}) {statement}", parameters)
+                    enregistrement["plan"] = [ligne[0] for ligne in resultat]
+                    enregistrement["explain"] = options
+                finally:
+                    conn.sync_connection.info.pop("requetes_lentes_explain", None)
+                    await conn.rollback()
+        except Exception as e:
+            enregistrement["plan_error"] = str(e)
+            logger.warning(f"Impossible de capturer le plan d'une requête lente: {str(e)}")
+
+    def liste(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Instructions lentes enregistrées, de la plus récente à la plus ancienne"""
+        enregistrements = list(reversed(self.enregistrements))
+        return enregistrements[:limit] if limit else enregistrements
+
+    def vider(self) -> None:
+        self.enregistrements.clear()
+        self._explications.clear()
+
+
+# Enregistreur partagé par les engines d'un même worker
+requetes_lentes = EnregistreurRequetesLentes()
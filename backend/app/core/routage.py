@@ -0,0 +1,151 @@
+import itertools
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
+
+from dotenv import load_dotenv
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from backend.app.core.cache import version_donnees
+from backend.app.core.database import PARAMETRES_DB, SessionLocal, creer_engine, etat_pool, prechauffer_pool
+
+logger = logging.getLogger(__name__)
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# URLs des réplicas en lecture, séparées par des virgules (vide : tout passe par la base principale)
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+
+# Délai de connexion à un réplica avant de basculer sur le suivant (secondes)
+DB_REPLICA_CONNECT_TIMEOUT_S = float(os.getenv("DB_REPLICA_CONNECT_TIMEOUT_S", "2"))
+
+# Durée pendant laquelle un réplica injoignable est écarté avant un nouvel essai (secondes)
+DB_REPLICA_RETRY_S = float(os.getenv("DB_REPLICA_RETRY_S", "30"))
+
+# Après une écriture, les lectures restent sur la base principale pendant ce délai
+# (secondes), le temps que les réplicas rattrapent leur retard de réplication
+DB_READ_AFTER_WRITE_S = float(os.getenv("DB_READ_AFTER_WRITE_S", "5"))
+
+
+class Replica:
+    """Engine d'un réplica en lecture et son état de disponibilité"""
+
+    def __init__(self, url: str):
+        self.engine: AsyncEngine = creer_engine(
+            url, {**PARAMETRES_DB, "connect_timeout_s": DB_REPLICA_CONNECT_TIMEOUT_S}
+        )
+        self.indisponible_jusqua = 0.0
+        self.echecs = 0
+
+    @property
+    def disponible(self) -> bool:
+        return time.monotonic() >= self.indisponible_jusqua
+
+    def marquer_indisponible(self) -> None:
+        self.echecs += 1
+        self.indisponible_jusqua = time.monotonic() + DB_REPLICA_RETRY_S
+
+    def marquer_disponible(self) -> None:
+        self.indisponible_jusqua = 0.0
+
+
+class RouteurLecture:
+    """Répartir les sessions de lecture entre les réplicas (tourniquet avec bascule)
+
+    Un réplica injoignable est écarté pendant DB_REPLICA_RETRY_S ; si aucun
+    n'est joignable, la lecture se fait sur la base principale. Les lectures
+    qui suivent de peu une écriture (fichier témoin de version des données,
+    partagé par les workers) restent sur la base principale pour lire ce qui
+    vient d'être écrit.
+    """
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._tour = itertools.count()
+        self.lectures_principale = 0
+
+    def _candidats(self) -> List[Replica]:
+        if not self.replicas:
+            return []
+        debut = next(self._tour) % len(self.replicas)
+        ordre = self.replicas[debut:] + self.replicas[:debut]
+        return [replica for replica in ordre if replica.disponible]
+
+    @staticmethod
+    def ecriture_recente() -> bool:
+        derniere_ecriture = int(version_donnees(), 16) / 1e9
+        return time.time() - derniere_ecriture < DB_READ_AFTER_WRITE_S
+
+    async def ouvrir_session(self) -> AsyncSession:
+        """Ouvrir une session de lecture sur un réplica joignable, ou sur la base principale"""
+        if self.replicas and not self.ecriture_recente():
+            for replica in self._candidats():
+                session = AsyncSession(bind=replica.engine, expire_on_commit=False)
+                try:
+                    # Connexion immédiate pour pouvoir basculer avant d'exécuter la moindre requête
+                    await session.connection()
+                except (OSError, DBAPIError, TimeoutError) as e:
+                    await session.close()
+                    replica.marquer_indisponible()
+                    logger.warning(f"Réplica {self._nom(replica)} injoignable, écarté pendant {DB_REPLICA_RETRY_S:g} s: {str(e)}")
+                    continue
+                replica.marquer_disponible()
+                return session
+        self.lectures_principale += 1
+        return SessionLocal()
+
+    @staticmethod
+    def _nom(replica: Replica) -> str:
+        return replica.engine.url.render_as_string(hide_password=True)
+
+    def etat(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "url": self._nom(replica),
+                "available": replica.disponible,
+                "failures": replica.echecs,
+                "pool": etat_pool(replica.engine),
+            }
+            for replica in self.replicas
+        ]
+
+    async def prechauffer(self) -> int:
+        """Ouvrir d'avance les connexions des réplicas joignables (un réplica injoignable est écarté)"""
+        total = 0
+        for replica in self.replicas:
+            try:
+                total += await prechauffer_pool(replica.engine)
+            except (OSError, DBAPIError, TimeoutError) as e:
+                replica.marquer_indisponible()
+                logger.warning(f"Réplica {self._nom(replica)} injoignable au démarrage, écarté pendant {DB_REPLICA_RETRY_S:g} s: {str(e)}")
+        return total
+
+    async def fermer(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+# Routeur partagé par les endpoints d'un même worker
+routeur_lecture = RouteurLecture(DATABASE_REPLICA_URLS)
+
+
+@asynccontextmanager
+async def session_lecture() -> AsyncIterator[AsyncSession]:
+    """Session de lecture routée, à utiliser comme SessionLocal : `async with session_lecture() as db`"""
+    session = await routeur_lecture.ouvrir_session()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+# Fonction pour récupérer une session DB de lecture (endpoints GET)
+async def get_db_lecture():
+    async with session_lecture() as session:
+        yield session
@@ -0,0 +1,85 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import Float, Numeric, cast
+
+from backend.app.core.tracage import span
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : repli sur le module json standard
+    orjson = None
+
+
+def _encoder_json(valeur: Any) -> Any:
+    if isinstance(valeur, (date, datetime)):
+        return valeur.isoformat()
+    if isinstance(valeur, Decimal):
+        return float(valeur)
+    raise TypeError(f"Type non sérialisable: {type(valeur).__name__}")
+
+
+def encoder_json(objets: Any) -> bytes:
+    """Encoder en JSON avec orjson s'il est installé, sinon avec le module standard"""
+    with span("serialisation.json"):
+        if orjson is not None:
+            return orjson.dumps(objets, default=_encoder_json)
+        return json.dumps(objets, default=_encoder_json, separators=(",", ":")).encode("utf-8")
+
+
+class SchemaLecture:
+    """Schéma de lecture précompilé pour servir une table de faits sans ORM ni Pydantic
+
+    Les colonnes sont sélectionnées dans l'ordre des champs du schéma de
+    réponse, les colonnes Numeric étant converties en float8 par PostgreSQL.
+    Les lignes obtenues sont des tuples de types JSON natifs, encodés
+    directement : le contrat OpenAPI reste celui du schéma Pydantic.
+    Une projection ne lit et n'encode que certains champs.
+    """
+
+    def __init__(self, modele, schema: Type[BaseModel], champs: Optional[Sequence[str]] = None):
+        self.modele = modele
+        self.schema = schema
+        self.champs = tuple(champs) if champs else tuple(schema.model_fields)
+        self.colonnes = [self._colonne(champ) for champ in self.champs]
+        self._projections: Dict[Tuple[str, ...], "SchemaLecture"] = {}
+
+    def projection(self, fields: Optional[Sequence[str]] = None) -> "SchemaLecture":
+        """Restreindre la lecture aux champs demandés, contrôlés par la liste blanche du schéma
+
+        Accepte des noms répétés ou séparés par des virgules ("date,new_cases").
+        Les champs sont conservés dans l'ordre du schéma de réponse.
+        """
+        if not fields:
+            return self
+        demandes = {nom.strip() for champ in fields for nom in champ.split(",") if nom.strip()}
+        inconnus = sorted(demandes - set(self.champs))
+        if inconnus:
+            raise ValueError(
+                f"Champs invalides: {', '.join(inconnus)}. Doivent être parmi: {', '.join(self.champs)}"
+            )
+        cle = tuple(champ for champ in self.champs if champ in demandes)
+        if cle == self.champs:
+            return self
+        if cle not in self._projections:
+            self._projections[cle] = SchemaLecture(self.modele, self.schema, cle)
+        return self._projections[cle]
+
+    def _colonne(self, champ: str):
+        colonne = getattr(self.modele, champ)
+        if isinstance(colonne.type, Numeric) and not isinstance(colonne.type, Float):
+            return cast(colonne, Float).label(champ)
+        return colonne
+
+    def encoder(self, lignes: Iterable[Sequence[Any]]) -> bytes:
+        """Encoder des lignes (tuples dans l'ordre des champs) en tableau JSON d'objets"""
+        champs = self.champs
+        return encoder_json([dict(zip(champs, ligne)) for ligne in lignes])
+
+    def reponse(self, lignes: Iterable[Sequence[Any]]) -> Response:
+        return Response(content=self.encoder(lignes), media_type="application/json")
+
@@ -0,0 +1,303 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import func, select, text, update
+
+from backend.app.core.cache import marquer_donnees_modifiees
+from backend.app.core.cache_pays import cache_pays
+from backend.app.core.database import SessionLocal
+from backend.app.models.models import Tache
+from backend.scripts.progression import PREFIXE_PROGRESSION
+
+logger = logging.getLogger(__name__)
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Exécution des tâches de fond par les workers de l'API (désactivable pour un worker dédié aux lectures)
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+
+# Délai entre deux recherches de tâche en attente, pour les tâches créées par un autre worker (secondes)
+JOBS_POLL_S = float(os.getenv("JOBS_POLL_S", "5"))
+
+# Durée maximale d'une tâche avant l'arrêt de son script (secondes)
+JOBS_TIMEOUT_S = float(os.getenv("JOBS_TIMEOUT_S", "3600"))
+
+# Une tâche en cours sans signe de vie depuis ce délai est considérée comme interrompue (secondes)
+JOBS_STALE_S = float(os.getenv("JOBS_STALE_S", "120"))
+
+# Nombre de lignes de sortie des scripts conservées dans le journal d'une tâche
+JOBS_LOG_LINES = int(os.getenv("JOBS_LOG_LINES", "50"))
+
+# Script des commandes de données (run.py), lancé depuis le dossier backend comme en ligne de commande
+DOSSIER_BACKEND = Path(__file__).resolve().parents[2]
+SCRIPT_COMMANDES = DOSSIER_BACKEND / "run.py"
+
+# Types de tâche : commandes de run.py exécutées dans l'ordre, et invalidation
+# des caches et instantanés de l'API à la fin (tables de la base remplacées)
+TYPES_TACHES: Dict[str, Dict[str, Any]] = {
+    "etl": {"commandes": ("etl",), "invalider": False},
+    "import_covid": {"commandes": ("importCovid",), "invalider": True},
+    "import_mpox": {"commandes": ("importMpox",), "invalider": True},
+    "actualisation": {"commandes": ("etl", "importCovid", "importMpox"), "invalider": True},
+}
+
+# Statuts des tâches
+STATUTS_ACTIFS = ("queued", "running")
+STATUTS_FINAUX = ("succeeded", "failed")
+
+# Verrou consultatif PostgreSQL sérialisant la création et la réclamation des tâches entre les workers
+_CLE_VERROU = 0x7461636865
+
+# Intervalle minimal entre deux enregistrements de l'avancement (secondes)
+_INTERVALLE_ENREGISTREMENT = 1.0
+
+
+class TacheEnConflit(Exception):
+    """Une tâche active exécute déjà une des commandes demandées"""
+
+    def __init__(self, tache_id: int, type: str):
+        super().__init__(f"La tâche {tache_id} ({type}) est déjà en attente ou en cours")
+        self.tache_id = tache_id
+
+
+class Avancement:
+    """Étapes, lignes et sortie d'une tâche en cours, enregistrées au plus une fois par seconde"""
+
+    def __init__(self, tache_id: int):
+        self.tache_id = tache_id
+        self.etape: Optional[str] = None
+        self.lignes = 0
+        self.etapes: List[Dict[str, Any]] = []
+        self.journal: deque = deque(maxlen=JOBS_LOG_LINES)
+        self._enregistre = 0.0
+
+    def commencer(self, etape: str, lignes: Optional[int] = None) -> None:
+        if etape != self.etape:
+            self.etape = etape
+            self.etapes.append({"stage": etape, "rows": None, "started_at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+        if lignes is not None:
+            self.lignes = lignes
+            self.etapes[-1]["rows"] = lignes
+
+    def lire_ligne(self, ligne: str) -> None:
+        """Interpréter une ligne de sortie du script : avancement signalé ou texte du journal"""
+        if ligne.startswith(PREFIXE_PROGRESSION):
+            try:
+                donnees = json.loads(ligne[len(PREFIXE_PROGRESSION):])
+                self.commencer(donnees["stage"], donnees.get("rows"))
+                return
+            except (ValueError, KeyError):
+                pass
+        self.journal.append(ligne)
+
+    async def enregistrer(self, force: bool = False, **valeurs) -> None:
+        if not force and time.monotonic() - self._enregistre < _INTERVALLE_ENREGISTREMENT:
+            return
+        self._enregistre = time.monotonic()
+        async with SessionLocal() as db:
+            await db.execute(
+                update(Tache).where(Tache.tache_id == self.tache_id).values(
+                    etape=self.etape,
+                    lignes=self.lignes,
+                    etapes=list(self.etapes),
+                    journal="\n".join(self.journal),
+                    heartbeat_at=func.now(),
+                    **valeurs
+                )
+            )
+            await db.commit()
+
+
+class GestionnaireTaches:
+    """File persistante des tâches de fond (ETL, imports) et leur exécuteur
+
+    Les tâches sont enregistrées dans la table `tache`. Chaque worker de
+    l'API exécute une boucle qui réclame la plus ancienne tâche en
+    attente, sous un verrou consultatif : une seule tâche s'exécute à la
+    fois sur l'ensemble des workers, car toutes réécrivent les mêmes
+    fichiers ou tables. Les commandes de run.py sont lancées dans un
+    processus séparé, hors du chemin des requêtes ; l'avancement qu'elles
+    signalent (étapes, lignes) est enregistré dans la table.
+    """
+
+    def __init__(self):
+        self._reveil = asyncio.Event()
+        self._boucle: Optional[asyncio.Task] = None
+
+    async def creer(self, type: str) -> Tache:
+        """Mettre une tâche en attente ; TacheEnConflit si une tâche active exécute une même commande"""
+        if type not in TYPES_TACHES:
+            raise ValueError(f"Type de tâche inconnu : {type} (types : {', '.join(TYPES_TACHES)})")
+        commandes = set(TYPES_TACHES[type]["commandes"])
+        async with SessionLocal() as db:
+            await db.execute(text("SELECT pg_advisory_xact_lock(:cle)"), {"cle": _CLE_VERROU})
+            await self._liberer_interrompues(db)
+            actives = (await db.execute(
+                select(Tache).where(Tache.statut.in_(STATUTS_ACTIFS)).order_by(Tache.tache_id)
+            )).scalars().all()
+            for active in actives:
+                if commandes & set(TYPES_TACHES.get(active.type, {}).get("commandes", ())):
+                    raise TacheEnConflit(active.tache_id, active.type)
+            tache = Tache(type=type, statut="queued", etapes=[], lignes=0)
+            db.add(tache)
+            await db.commit()
+            await db.refresh(tache)
+        self._reveil.set()
+        return tache
+
+    async def obtenir(self, tache_id: int) -> Optional[Tache]:
+        async with SessionLocal() as db:
+            return await db.get(Tache, tache_id)
+
+    async def liste(self, limit: int = 20) -> List[Tache]:
+        async with SessionLocal() as db:
+            result = await db.execute(select(Tache).order_by(Tache.tache_id.desc()).limit(limit))
+            return list(result.scalars().all())
+
+    async def suivre(self, tache_id: int, intervalle: float = 1.0) -> AsyncIterator[Tache]:
+        """Produire l'état de la tâche à chaque changement d'avancement, jusqu'à sa fin"""
+        precedent = None
+        while True:
+            tache = await self.obtenir(tache_id)
+            if tache is None:
+                return
+            etat = (tache.statut, tache.etape, tache.lignes, tache.journal)
+            if etat != precedent:
+                precedent = etat
+                yield tache
+            if tache.statut in STATUTS_FINAUX:
+                return
+            await asyncio.sleep(intervalle)
+
+    @staticmethod
+    async def _liberer_interrompues(db) -> None:
+        """Marquer en échec les tâches en cours dont le worker ne donne plus signe de vie"""
+        await db.execute(
+            update(Tache)
+            .where(Tache.statut == "running", Tache.heartbeat_at < func.now() - timedelta(seconds=JOBS_STALE_S))
+            .values(statut="failed", erreur="Tâche interrompue (worker arrêté)", finished_at=func.now())
+        )
+
+    async def _reclamer(self) -> Optional[Tache]:
+        """Passer la plus ancienne tâche en attente en cours, si aucune tâche ne s'exécute"""
+        async with SessionLocal() as db:
+            await db.execute(text("SELECT pg_advisory_xact_lock(:cle)"), {"cle": _CLE_VERROU})
+            await self._liberer_interrompues(db)
+            en_cours = (await db.execute(select(Tache.tache_id).where(Tache.statut == "running").limit(1))).first()
+            tache = None
+            if en_cours is None:
+                tache = (await db.execute(
+                    select(Tache).where(Tache.statut == "queued").order_by(Tache.tache_id).limit(1)
+                )).scalar_one_or_none()
+            if tache is not None:
+                tache.statut = "running"
+                tache.pid = os.getpid()
+                tache.started_at = func.now()
+                tache.heartbeat_at = func.now()
+            await db.commit()
+            if tache is not None:
+                await db.refresh(tache)
+            return tache
+
+    async def _executer_commande(self, commande: str, avancement: Avancement, echeance: float) -> None:
+        avancement.commencer(f"run.py {commande}")
+        await avancement.enregistrer(force=True)
+        processus = await asyncio.create_subprocess_exec(
+            sys.executable, "-u", str(SCRIPT_COMMANDES), commande,
+            cwd=DOSSIER_BACKEND,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            env={**os.environ, "JOB_PROGRESS": "1", "PYTHONIOENCODING": "utf-8"},
+        )
+        try:
+            while True:
+                restant = echeance - time.monotonic()
+                if restant <= 0:
+                    raise RuntimeError(f"run.py {commande} interrompu après {JOBS_TIMEOUT_S:g} s")
+                try:
+                    ligne = await asyncio.wait_for(processus.stdout.readline(), min(restant, JOBS_STALE_S / 4))
+                except asyncio.TimeoutError:
+                    # Étape silencieuse (index, téléchargement) : signe de vie pour les autres workers
+                    await avancement.enregistrer(force=True)
+                    continue
+                if not ligne:
+                    break
+                avancement.lire_ligne(ligne.decode("utf-8", errors="replace").rstrip())
+                await avancement.enregistrer()
+            code = await processus.wait()
+        finally:
+            if processus.returncode is None:
+                processus.kill()
+                await processus.wait()
+        if code != 0:
+            raise RuntimeError(f"run.py {commande} a échoué (code de sortie {code})")
+
+    async def _executer(self, tache: Tache) -> None:
+        definition = TYPES_TACHES[tache.type]
+        avancement = Avancement(tache.tache_id)
+        echeance = time.monotonic() + JOBS_TIMEOUT_S
+        logger.info(f"Tâche {tache.tache_id} ({tache.type}) démarrée")
+        try:
+            for commande in definition["commandes"]:
+                await self._executer_commande(commande, avancement, echeance)
+            if definition["invalider"]:
+                # Caches de réponses et de requêtes, instantanés et dimension des pays (les connexions
+                # ouvertes avant la recréation des tables sont écartées par chaque worker à leur
+                # prochain emprunt : SCHEMA_VERSION_FILE, avancé par import_db)
+                marquer_donnees_modifiees()
+                cache_pays.invalider()
+        except asyncio.CancelledError:
+            await avancement.enregistrer(
+                force=True, statut="failed", erreur="Tâche interrompue à l'arrêt du worker", finished_at=func.now()
+            )
+            raise
+        except Exception as e:
+            logger.warning(f"Tâche {tache.tache_id} ({tache.type}) en échec: {str(e)}")
+            await avancement.enregistrer(force=True, statut="failed", erreur=str(e), finished_at=func.now())
+            return
+        await avancement.enregistrer(force=True, statut="succeeded", finished_at=func.now())
+        logger.info(f"Tâche {tache.tache_id} ({tache.type}) terminée")
+
+    async def executer(self) -> None:
+        """Boucle du worker : exécuter les tâches en attente, l'une après l'autre"""
+        while True:
+            try:
+                tache = await self._reclamer()
+            except Exception as e:
+                logger.warning(f"Impossible de réclamer une tâche en attente: {str(e)}")
+                tache = None
+            if tache is not None:
+                await self._executer(tache)
+                continue
+            self._reveil.clear()
+            try:
+                await asyncio.wait_for(self._reveil.wait(), JOBS_POLL_S)
+            except asyncio.TimeoutError:
+                pass
+
+    def demarrer(self) -> None:
+        if self._boucle is None:
+            self._boucle = asyncio.create_task(self.executer())
+
+    async def arreter(self) -> None:
+        if self._boucle is not None:
+            self._boucle.cancel()
+            try:
+                await self._boucle
+            except asyncio.CancelledError:
+                pass
+            self._boucle = None
+
+
+# Gestionnaire partagé par les requêtes d'un même worker
+gestionnaire_taches = GestionnaireTaches()
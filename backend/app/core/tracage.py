@@ -0,0 +1,268 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import secrets
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from backend.app.core.metriques import modele_route
+
+logger = logging.getLogger(__name__)
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Part des requêtes tracées (0 : aucune, 1 : toutes)
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "0"))
+
+# Exporter aussi toute requête plus lente que ce seuil (millisecondes, 0 : désactivé) ;
+# les requêtes sont alors toutes tracées en mémoire, seules les lentes sont exportées
+TRACING_SLOW_MS = float(os.getenv("TRACING_SLOW_MS", "0"))
+
+# Destination des traces : console (sortie d'erreur) ou file (une trace JSON par ligne)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "console")
+TRACING_FILE = Path(
+    os.getenv("TRACING_FILE", Path(__file__).resolve().parents[2] / "data" / "traces.jsonl")
+)
+
+TRACING_ENABLED = TRACING_SAMPLE_RATE > 0 or TRACING_SLOW_MS > 0
+
+# Longueur maximale du texte SQL conservé dans un span
+_LONGUEUR_SQL = 500
+
+
+class Trace:
+    """Spans d'une requête, du middleware jusqu'aux instructions SQL"""
+
+    def __init__(self, trace_id: str, echantillonnee: bool):
+        self.trace_id = trace_id
+        self.echantillonnee = echantillonnee
+        self.debut = time.perf_counter()
+        self.horodatage = datetime.now(timezone.utc)
+        self.spans: List[Dict[str, Any]] = []
+        self.terminee = False
+
+
+class Span:
+    def __init__(self, trace: Trace, nom: str, parent: Optional["Span"], attributs: Dict[str, Any]):
+        self.trace = trace
+        self.id = len(trace.spans) + 1
+        self.nom = nom
+        self.parent = parent
+        self.attributs = attributs
+        self.debut = time.perf_counter()
+        self.donnees = {"id": self.id, "parent": parent.id if parent else None, "name": nom}
+        trace.spans.append(self.donnees)
+
+    def terminer(self, fin: Optional[float] = None) -> None:
+        fin = time.perf_counter() if fin is None else fin
+        self.donnees["start_ms"] = round((self.debut - self.trace.debut) * 1000, 3)
+        self.donnees["duration_ms"] = round((fin - self.debut) * 1000, 3)
+        if self.attributs:
+            self.donnees["attributes"] = self.attributs
+
+
+# Span courant de la requête ; copié dans chaque tâche asyncio créée pendant la requête
+_span_courant: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("span_courant", default=None)
+
+
+def _ouvrir(nom: str, attributs: Dict[str, Any]) -> Optional[Span]:
+    parent = _span_courant.get()
+    if parent is None or parent.trace.terminee:
+        return None
+    return Span(parent.trace, nom, parent, attributs)
+
+
+@contextlib.contextmanager
+def span(nom: str, **attributs):
+    """Mesurer un bloc de code comme span enfant du span courant (sans effet hors d'une requête tracée)"""
+    courant = _ouvrir(nom, attributs)
+    if courant is None:
+        yield None
+        return
+    jeton = _span_courant.set(courant)
+    try:
+        yield courant
+    finally:
+        _span_courant.reset(jeton)
+        courant.terminer()
+
+
+def tracer(nom: Optional[str] = None):
+    """Décorateur : chaque appel de la fonction asynchrone devient un span (crud.<module>.<fonction> par défaut)"""
+    def decorateur(fonction):
+        nom_span = nom or f"crud.{fonction.__module__.rsplit('.', 1)[-1]}.{fonction.__name__}"
+
+        @functools.wraps(fonction)
+        async def enveloppe(*args, **kwargs):
+            if _span_courant.get() is None:
+                return await fonction(*args, **kwargs)
+            with span(nom_span):
+                return await fonction(*args, **kwargs)
+        return enveloppe
+    return decorateur
+
+
+class RouteTracee(APIRoute):
+    """Route FastAPI dont la fonction d'endpoint est un span
+
+    Le temps écoulé entre la fin de l'endpoint et l'envoi de la réponse
+    (validation par response_model et encodage JSON) est rapporté par le
+    middleware dans un span "serialisation".
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        # include_router recrée la route à chaque niveau : l'endpoint n'est enveloppé qu'une fois
+        if TRACING_ENABLED and inspect.iscoroutinefunction(endpoint) and not hasattr(endpoint, "__trace__"):
+            endpoint = tracer(f"endpoint.{endpoint.__name__}")(endpoint)
+            endpoint.__trace__ = True
+        super().__init__(path, endpoint, **kwargs)
+
+
+def tracer_engine(moteur) -> None:
+    """Un span par instruction SQL exécutée par un engine (sync_engine d'un AsyncEngine)"""
+    @event.listens_for(moteur, "before_cursor_execute")
+    def _debut(conn, cursor, statement, parameters, context, executemany):
+        courant = _ouvrir("sql", {"statement": statement[:_LONGUEUR_SQL]}) if _span_courant.get() is not None else None
+        conn.info.setdefault("tracage_spans", []).append(courant)
+
+    @event.listens_for(moteur, "after_cursor_execute")
+    def _fin(conn, cursor, statement, parameters, context, executemany):
+        courant = conn.info["tracage_spans"].pop()
+        if courant is not None:
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                courant.attributs["rows"] = cursor.rowcount
+            courant.terminer()
+
+    @event.listens_for(moteur, "handle_error")
+    def _erreur(contexte):
+        pile = contexte.connection.info.get("tracage_spans") if contexte.connection is not None else None
+        if pile:
+            courant = pile.pop()
+            if courant is not None:
+                courant.attributs["error"] = type(contexte.original_exception).__name__
+                courant.terminer()
+
+
+def _exporter(trace: Trace, racine: Span) -> None:
+    enregistrement = {
+        "trace_id": trace.trace_id,
+        "name": racine.nom,
+        "timestamp": trace.horodatage.isoformat(),
+        "duration_ms": racine.donnees["duration_ms"],
+        "spans": trace.spans,
+    }
+    if TRACING_EXPORTER == "file":
+        TRACING_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(TRACING_FILE, "a", encoding="utf-8") as fichier:
+            fichier.write(json.dumps(enregistrement, ensure_ascii=False, default=str) + "\n")
+        return
+
+    # Console : arbre des spans, chaque enfant sous son parent par ordre de début
+    enfants: Dict[Optional[int], List[Dict[str, Any]]] = {}
+    for donnees in trace.spans:
+        enfants.setdefault(donnees["parent"], []).append(donnees)
+    lignes = [f"trace {trace.trace_id} {racine.nom} {racine.donnees['duration_ms']:.1f} ms"]
+
+    def parcourir(parent: Optional[int], profondeur: int) -> None:
+        for donnees in sorted(enfants.get(parent, []), key=lambda d: d.get("start_ms", 0)):
+            attributs = donnees.get("attributes", {})
+            detail = f" {attributs['statement'][:120]!r}" if "statement" in attributs else ""
+            lignes.append(
+                f"{'  ' * profondeur}{donnees['name']} "
+                f"+{donnees.get('start_ms', 0):.1f} ms {donnees.get('duration_ms', 0):.1f} ms{detail}"
+            )
+            parcourir(donnees["id"], profondeur + 1)
+
+    parcourir(None, 0)
+    print("\n".join(lignes), file=sys.stderr)
+
+
+def _contexte_entrant(scope) -> tuple:
+    """Identifiant de trace et décision d'échantillonnage d'un en-tête traceparent (W3C)"""
+    for nom, valeur in scope["headers"]:
+        if nom == b"traceparent":
+            parties = valeur.decode("latin-1").split("-")
+            if len(parties) == 4 and len(parties[1]) == 32:
+                return parties[1], parties[3] == "01"
+    return None, False
+
+
+class TracageMiddleware:
+    """Middleware ASGI ouvrant le span racine de chaque requête tracée
+
+    Les spans enfants (endpoint, fonctions CRUD, instructions SQL,
+    sérialisation) s'y rattachent par le contexte asynchrone, y compris
+    dans les tâches lancées par la requête. La trace est exportée si la
+    requête est échantillonnée ou plus lente que TRACING_SLOW_MS.
+    """
+
+    def __init__(self, app, exclure: tuple = ("/metrics",)):
+        self.app = app
+        self.exclure = exclure
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclure:
+            await self.app(scope, receive, send)
+            return
+
+        trace_id, force = _contexte_entrant(scope)
+        echantillonnee = force or random.random() < TRACING_SAMPLE_RATE
+        if not echantillonnee and TRACING_SLOW_MS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(trace_id or secrets.token_hex(16), echantillonnee)
+        racine = Span(trace, f"{scope['method']} {scope['path']}", None, {})
+        jeton = _span_courant.set(racine)
+        statut = {"code": 500, "envoi": None}
+
+        async def send_trace(message):
+            if message["type"] == "http.response.start":
+                statut["code"] = message["status"]
+                statut["envoi"] = time.perf_counter()
+                message = dict(message, headers=list(message.get("headers", [])) + [(b"x-trace-id", trace.trace_id.encode())])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_trace)
+        finally:
+            _span_courant.reset(jeton)
+            fin = time.perf_counter()
+            trace.terminee = True
+            racine.nom = f"{scope['method']} {scope['route'].path if 'route' in scope else modele_route(scope['app'], scope['method'], scope['path'])}"
+            racine.attributs.update({"path": scope["path"], "status": statut["code"]})
+            racine.terminer(fin)
+            self._ajouter_serialisation(trace, racine, statut["envoi"])
+            if echantillonnee or racine.donnees["duration_ms"] >= TRACING_SLOW_MS:
+                try:
+                    _exporter(trace, racine)
+                except OSError as e:
+                    logger.warning(f"Impossible d'exporter la trace {trace.trace_id}: {str(e)}")
+
+    @staticmethod
+    def _ajouter_serialisation(trace: Trace, racine: Span, envoi: Optional[float]) -> None:
+        """Span de la validation et de l'encodage de la réponse : de la fin de l'endpoint à l'envoi"""
+        endpoint = next((s for s in trace.spans if s["name"].startswith("endpoint.")), None)
+        if envoi is None or endpoint is None or "duration_ms" not in endpoint:
+            return
+        debut_ms = endpoint["start_ms"] + endpoint["duration_ms"]
+        trace.spans.append({
+            "id": len(trace.spans) + 1,
+            "parent": racine.id,
+            "name": "serialisation",
+            "start_ms": round(debut_ms, 3),
+            "duration_ms": round(max((envoi - trace.debut) * 1000 - debut_ms, 0), 3),
+        })
@@ -0,0 +1,103 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from typing import List, Optional, Dict, Any
+from sqlalchemy import func, and_, cast, literal_column, Date
+from datetime import date
+from backend.app.models.models import DLocation
+from backend.app.crud.faits import TABLES_FAITS
+from backend.app.crud.location import filtres_pays
+from backend.app.core.moteur_analytique import executer_analytique
+from backend.app.core.tracage import tracer
+
+
+# Granularités acceptées par date_trunc
+GRANULARITES = ["day", "week", "month", "year"]
+
+# Fonctions d'agrégation disponibles pour regrouper les valeurs d'un intervalle
+AGREGATS = ["sum", "avg", "max", "last"]
+
+# Métriques autorisées pour chaque table de faits (colonnes numériques du modèle)
+METRIQUES = {table.modele: table.metriques for table in TABLES_FAITS.values()}
+
+
+def expression_agregat(modele, agregat: str, colonne):
+    """Construire l'expression SQL correspondant à la fonction d'agrégation demandée"""
+    if agregat == "sum":
+        return func.sum(colonne)
+    if agregat == "avg":
+        return func.avg(colonne)
+    if agregat == "max":
+        return func.max(colonne)
+    # "last" : dernière valeur de l'intervalle selon la date
+    return array_agg(aggregate_order_by(colonne, modele.date.desc()))[1]
+
+
+@tracer()
+async def obtenir_agregation_temporelle(
+    db: AsyncSession,
+    modele,
+    metric: str,
+    granularite: str = "week",
+    agregat: str = "sum",
+    skip: int = 0,
+    limit: Optional[int] = None,
+    location_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    location_ids: Optional[List[int]] = None,
+    location_names: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """Agréger une métrique par intervalle de temps et par pays directement dans PostgreSQL"""
+    # Vérifier les paramètres avant de construire la requête
+    valid_metrics = METRIQUES[modele]
+    if metric not in valid_metrics:
+        raise ValueError(f"Métrique invalide. Doit être l'une de: {', '.join(valid_metrics)}")
+    if granularite not in GRANULARITES:
+        raise ValueError(f"Granularité invalide. Doit être l'une de: {', '.join(GRANULARITES)}")
+    if agregat not in AGREGATS:
+        raise ValueError(f"Agrégat invalide. Doit être l'un de: {', '.join(AGREGATS)}")
+
+    # La granularité est insérée littéralement (valeur contrôlée) pour que
+    # l'expression du SELECT soit identique à celle du GROUP BY
+    intervalle = cast(
+        func.date_trunc(literal_column(f"'{granularite}'"), modele.date),
+        Date
+    ).label("date")
+    valeur = expression_agregat(modele, agregat, getattr(modele, metric)).label("value")
+
+    query = (
+        select(intervalle, modele.location_id, DLocation.location_name, valeur)
+        .join(DLocation, modele.location_id == DLocation.location_id)
+    )
+
+    # Appliquer les mêmes filtres que les endpoints de liste
+    filters = await filtres_pays(db, modele, location_id, location_ids, location_names)
+    if start_date:
+        filters.append(modele.date >= start_date)
+    if end_date:
+        filters.append(modele.date <= end_date)
+
+    if filters:
+        query = query.where(and_(*filters))
+
+    query = (
+        query.group_by(intervalle, modele.location_id, DLocation.location_name)
+        .order_by(modele.location_id, intervalle)
+        .offset(skip)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+
+    rows = await executer_analytique(db, query)
+
+    return [
+        {
+            "date": row.date.isoformat(),
+            "location_id": row.location_id,
+            "location_name": row.location_name,
+            "value": float(row.value) if row.value is not None else None,
+            "metric": metric
+        }
+        for row in rows
+    ]
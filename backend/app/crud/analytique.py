@@ -0,0 +1,200 @@
+import asyncio
+import math
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import Float, cast, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from backend.app.core.cache import CacheLRU, version_donnees
+from backend.app.core.tracage import tracer
+from backend.app.crud.agregation import METRIQUES
+
+# Nombre de séries (pays, métrique, fenêtre) conservées en mémoire par worker
+ANALYTICS_CACHE_MAXSIZE = int(os.getenv("ANALYTICS_CACHE_MAXSIZE", "1024"))
+
+# Marge de sécurité lors de la recherche des lignes modifiées : une transaction
+# d'écriture est horodatée à son début, pas à sa validation
+MARGE_MODIFICATIONS = timedelta(seconds=60)
+
+# Bornes acceptées pour la taille de fenêtre (en jours)
+FENETRE_MIN = 2
+FENETRE_MAX = 90
+
+
+class SerieAnalytique:
+    """Série d'un pays pour une métrique et une fenêtre, avec ses indicateurs dérivés"""
+
+    def __init__(self, fenetre: int):
+        self.fenetre = fenetre
+        self.version: Optional[str] = None
+        self.calculee_a: Optional[datetime] = None
+        self.dates = np.array([], dtype="datetime64[D]")
+        self.valeurs = np.array([], dtype=float)
+        self.moyenne = np.array([], dtype=float)
+        self.croissance = np.array([], dtype=float)
+        self.doublement = np.array([], dtype=float)
+        self.verrou = asyncio.Lock()
+
+    def recalculer(self, depuis: int = 0) -> None:
+        """Recalculer les indicateurs à partir de l'indice `depuis` (les précédents sont conservés)"""
+        w = self.fenetre
+        # Les indicateurs d'une date ne dépendent que des 2 fenêtres qui la précèdent
+        debut = max(0, depuis - 2 * w)
+        valeurs = self.valeurs[debut:]
+
+        # Moyenne glissante des valeurs non nulles sur les `w` dernières lignes
+        presentes = ~np.isnan(valeurs)
+        sommes = np.concatenate(([0.0], np.cumsum(np.where(presentes, valeurs, 0.0))))
+        comptes = np.concatenate(([0], np.cumsum(presentes)))
+        fin = np.arange(1, len(valeurs) + 1)
+        origine = np.maximum(fin - w, 0)
+        effectifs = comptes[fin] - comptes[origine]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            moyenne = (sommes[fin] - sommes[origine]) / effectifs
+        moyenne[(effectifs == 0) | (debut + fin < w)] = np.nan
+
+        # Croissance par rapport à la fenêtre précédente et temps de doublement (jours)
+        precedente = np.full(len(valeurs), np.nan)
+        precedente[w:] = moyenne[:-w]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rapport = moyenne / precedente
+            croissance = rapport - 1.0
+            doublement = np.where(rapport > 1.0, w * math.log(2) / np.log(rapport), np.nan)
+        croissance[~np.isfinite(croissance)] = np.nan
+        doublement[~np.isfinite(doublement)] = np.nan
+
+        decalage = depuis - debut
+        self.moyenne = np.concatenate((self.moyenne[:depuis], moyenne[decalage:]))
+        self.croissance = np.concatenate((self.croissance[:depuis], croissance[decalage:]))
+        self.doublement = np.concatenate((self.doublement[:depuis], doublement[decalage:]))
+
+    def lignes(self, start_date: Optional[date], end_date: Optional[date]) -> List[Dict[str, Any]]:
+        debut = np.searchsorted(self.dates, np.datetime64(start_date, "D")) if start_date else 0
+        fin = np.searchsorted(self.dates, np.datetime64(end_date, "D"), side="right") if end_date else len(self.dates)
+        return [
+            {
+                "date": jour,
+                "value": _nombre(valeur),
+                "moving_average": _nombre(moyenne),
+                "growth_rate": _nombre(croissance),
+                "doubling_time": _nombre(doublement),
+            }
+            for jour, valeur, moyenne, croissance, doublement in zip(
+                self.dates[debut:fin].tolist(),
+                self.valeurs[debut:fin].tolist(),
+                self.moyenne[debut:fin].tolist(),
+                self.croissance[debut:fin].tolist(),
+                self.doublement[debut:fin].tolist(),
+            )
+        ]
+
+
+def _nombre(valeur: float) -> Optional[float]:
+    return None if math.isnan(valeur) else round(valeur, 6)
+
+
+# Séries calculées, par (table, pays, métrique, fenêtre)
+_series = CacheLRU(maxsize=ANALYTICS_CACHE_MAXSIZE, ttl=float("inf"))
+
+
+@tracer()
+async def _lire_valeurs(db: AsyncSession, modele, metric: str, location_id: int, depuis: Optional[date] = None):
+    colonne = cast(getattr(modele, metric), Float)
+    query = select(modele.date, colonne).where(modele.location_id == location_id)
+    if depuis is not None:
+        query = query.where(modele.date >= depuis)
+    result = await db.execute(query.order_by(modele.date))
+    lignes = result.all()
+    dates = np.array([ligne[0] for ligne in lignes], dtype="datetime64[D]")
+    valeurs = np.array([ligne[1] for ligne in lignes], dtype=float)
+    return dates, valeurs
+
+
+@tracer()
+async def _actualiser(db: AsyncSession, modele, metric: str, location_id: int, serie: SerieAnalytique) -> None:
+    """Mettre la série à jour en ne relisant que les dates modifiées depuis le dernier calcul"""
+    version = version_donnees()
+    if serie.version == version:
+        return
+
+    if serie.calculee_a is None:
+        modifiee_depuis = None
+        nombre, maintenant = None, None
+    else:
+        seuil = serie.calculee_a - MARGE_MODIFICATIONS
+        modifiee = or_(modele.created_at > seuil, modele.updated_at > seuil)
+        result = await db.execute(
+            select(
+                func.count(),
+                func.min(modele.date).filter(modifiee),
+                func.localtimestamp()
+            ).where(modele.location_id == location_id)
+        )
+        nombre, modifiee_depuis, maintenant = result.one()
+        if modifiee_depuis is None and nombre == len(serie.dates):
+            # Aucune ligne de ce pays n'a changé : seule la version avance
+            serie.version, serie.calculee_a = version, maintenant
+            return
+
+    if modifiee_depuis is not None:
+        # Recalcul incrémental : relire à partir de la première date modifiée
+        position = int(np.searchsorted(serie.dates, np.datetime64(modifiee_depuis, "D")))
+        dates, valeurs = await _lire_valeurs(db, modele, metric, location_id, modifiee_depuis)
+        if position + len(dates) == nombre:
+            serie.dates = np.concatenate((serie.dates[:position], dates))
+            serie.valeurs = np.concatenate((serie.valeurs[:position], valeurs))
+            serie.recalculer(position)
+            serie.version, serie.calculee_a = version, maintenant
+            return
+
+    # Premier calcul, ou suppression de lignes anciennes : relecture complète
+    if maintenant is None:
+        maintenant = (await db.execute(select(func.localtimestamp()))).scalar_one()
+    serie.dates, serie.valeurs = await _lire_valeurs(db, modele, metric, location_id)
+    serie.recalculer(0)
+    serie.version, serie.calculee_a = version, maintenant
+
+
+@tracer()
+async def obtenir_analytique(
+    db: AsyncSession,
+    modele,
+    metric: str,
+    location_ids: List[int],
+    fenetre: int = 7,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> List[Dict[str, Any]]:
+    """Moyenne glissante, croissance d'une fenêtre à l'autre et temps de doublement par pays
+
+    Les indicateurs sont calculés avec NumPy sur des lignes journalières
+    consécutives et conservés en mémoire par (pays, métrique, fenêtre).
+    Après une écriture, seules les dates modifiées (created_at/updated_at)
+    et les fenêtres qui en dépendent sont recalculées.
+    """
+    valid_metrics = METRIQUES[modele]
+    if metric not in valid_metrics:
+        raise ValueError(f"Métrique invalide. Doit être l'une de: {', '.join(valid_metrics)}")
+    if not FENETRE_MIN <= fenetre <= FENETRE_MAX:
+        raise ValueError(f"La fenêtre doit être comprise entre {FENETRE_MIN} et {FENETRE_MAX} jours")
+    if not location_ids:
+        raise ValueError("Au moins un pays doit être indiqué (location_id, location_ids ou location_names)")
+
+    resultat: List[Dict[str, Any]] = []
+    for location_id in location_ids:
+        cle = f"{modele.__tablename__}:{location_id}:{metric}:{fenetre}"
+        serie = _series.get(cle)
+        if serie is None:
+            serie = SerieAnalytique(fenetre)
+            _series.set(cle, serie)
+        async with serie.verrou:
+            await _actualiser(db, modele, metric, location_id, serie)
+        for ligne in serie.lignes(start_date, end_date):
+            ligne["location_id"] = location_id
+            ligne["metric"] = metric
+            resultat.append(ligne)
+    return resultat
@@ -0,0 +1,133 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from typing import List, Optional, Dict, Any
+from sqlalchemy import func, and_, case, cast, literal_column, Date, Double
+from datetime import date
+from backend.app.models.models import FCovid, FMpox, DLocation
+from backend.app.crud.agregation import GRANULARITES, AGREGATS, METRIQUES, expression_agregat
+from backend.app.core.moteur_analytique import executer_analytique, resoudre_pays_analytique, version_analytique
+from backend.app.core.query_cache import cache_requete
+from backend.app.core.tracage import tracer
+
+
+# Métriques présentes à la fois dans f_covid et dans f_mpox
+METRIQUES_COMMUNES = [metrique for metrique in METRIQUES[FCovid] if metrique in METRIQUES[FMpox]]
+
+
+def _serie(
+    modele,
+    metric: str,
+    granularite: str,
+    agregat: str,
+    location_ids: Optional[List[int]],
+    start_date: Optional[date],
+    end_date: Optional[date]
+):
+    """Sous-requête (location_id, date, value) d'une table de faits, regroupée par intervalle"""
+    if granularite == "day":
+        periode = modele.date
+    else:
+        periode = cast(func.date_trunc(literal_column(f"'{granularite}'"), modele.date), Date)
+    valeur = expression_agregat(modele, agregat, getattr(modele, metric))
+
+    query = select(
+        modele.location_id.label("location_id"),
+        periode.label("date"),
+        valeur.label("value")
+    )
+    filters = []
+    if location_ids is not None:
+        filters.append(modele.location_id.in_(location_ids))
+    if start_date:
+        filters.append(modele.date >= start_date)
+    if end_date:
+        filters.append(modele.date <= end_date)
+    if filters:
+        query = query.where(and_(*filters))
+    return query.group_by(modele.location_id, periode).subquery()
+
+
+def _valeur(colonne, log_safe: bool):
+    """Convertir en float, en remplaçant par NULL les valeurs non représentables sur une échelle log"""
+    if log_safe:
+        colonne = case((colonne > 0, colonne), else_=None)
+    return cast(colonne, Double)
+
+
+@tracer()
+@cache_requete(version=version_analytique)
+async def obtenir_comparaison(
+    db: AsyncSession,
+    metric: str = "new_cases",
+    location_ids: Optional[List[int]] = None,
+    location_names: Optional[List[str]] = None,
+    granularite: str = "day",
+    agregat: str = "sum",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    log_safe: bool = False
+) -> Dict[str, Any]:
+    """Aligner une métrique COVID et Mpox par pays et par intervalle en une seule requête
+
+    Les deux tables sont regroupées puis réunies par jointure externe
+    complète sur (location_id, date) : un intervalle présent dans une seule
+    table apparaît avec une valeur nulle pour l'autre. Le résultat est une
+    série par pays, sous forme de tableaux alignés.
+    """
+    if metric not in METRIQUES_COMMUNES:
+        raise ValueError(f"Métrique invalide. Doit être l'une de: {', '.join(METRIQUES_COMMUNES)}")
+    if granularite not in GRANULARITES:
+        raise ValueError(f"Granularité invalide. Doit être l'une de: {', '.join(GRANULARITES)}")
+    if agregat not in AGREGATS:
+        raise ValueError(f"Agrégat invalide. Doit être l'un de: {', '.join(AGREGATS)}")
+
+    # Les noms sont résolus par la dimension des pays pour filtrer chaque table avant la jointure
+    ids = await resoudre_pays_analytique(db, location_ids=location_ids, location_names=location_names)
+
+    covid = _serie(FCovid, metric, granularite, agregat, ids, start_date, end_date)
+    mpox = _serie(FMpox, metric, granularite, agregat, ids, start_date, end_date)
+    location_id = func.coalesce(covid.c.location_id, mpox.c.location_id)
+    jour = func.coalesce(covid.c.date, mpox.c.date)
+
+    query = (
+        select(
+            location_id.label("location_id"),
+            DLocation.location_name,
+            jour.label("date"),
+            _valeur(covid.c.value, log_safe).label("covid"),
+            _valeur(mpox.c.value, log_safe).label("mpox")
+        )
+        .select_from(
+            covid.join(
+                mpox,
+                and_(covid.c.location_id == mpox.c.location_id, covid.c.date == mpox.c.date),
+                full=True
+            )
+        )
+        .join(DLocation, DLocation.location_id == location_id)
+        .order_by(location_id, jour)
+    )
+
+    result = await executer_analytique(db, query)
+
+    series: List[Dict[str, Any]] = []
+    for row in result:
+        if not series or series[-1]["location_id"] != row.location_id:
+            series.append({
+                "location_id": row.location_id,
+                "location_name": row.location_name,
+                "dates": [],
+                "covid": [],
+                "mpox": []
+            })
+        serie = series[-1]
+        serie["dates"].append(row.date)
+        serie["covid"].append(row.covid)
+        serie["mpox"].append(row.mpox)
+
+    return {
+        "metric": metric,
+        "bucket": granularite,
+        "agg": agregat,
+        "series": series
+    }
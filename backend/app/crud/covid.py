@@ -5,29 +5,26 @@ from sqlalchemy import func, and_
 from datetime import date
 from backend.app.models.models import FCovid, DLocation
 from backend.app.schemas.schemas import FCovidCreate
-from backend.app.crud.location import obtenir_ou_creer_pays
-
-
-async def creer_donnees_covid(db: AsyncSession, covid_data: FCovidCreate) -> FCovid:
-    """Créer un nouvel enregistrement de données COVID"""
-    db_covid = FCovid(
-        date=covid_data.date,
-        location_id=covid_data.location_id,
-        total_cases=covid_data.total_cases,
-        new_cases=covid_data.new_cases,
-        total_deaths=covid_data.total_deaths,
-        new_deaths=covid_data.new_deaths,
-        icu_patients=covid_data.icu_patients,
-        hosp_patients=covid_data.hosp_patients,
-        total_vaccinations=covid_data.total_vaccinations,
-        people_vaccinated=covid_data.people_vaccinated
-    )
-    db.add(db_covid)
-    await db.commit()
-    await db.refresh(db_covid)
-    return db_covid
-
-
+from backend.app.crud.faits import (
+    FAITS_COVID, lier_table, creer_fait, obtenir_fait_par_id, liste_faits, liste_lignes_faits,
+    mettre_a_jour_fait, supprimer_fait
+)
+from backend.app.crud.location import obtenir_ou_creer_pays, filtres_pays
+from backend.app.core.query_cache import cache_requete
+from backend.app.core.moteur_analytique import executer_analytique, version_analytique
+from backend.app.core.tracage import tracer
+
+# Opérations génériques sur les tables de faits, liées à f_covid
+LECTURE_COVID = FAITS_COVID.lecture
+creer_donnees_covid = lier_table(creer_fait, "covid")
+obtenir_donnees_covid_par_id = lier_table(obtenir_fait_par_id, "covid")
+liste_donnees_covid = lier_table(liste_faits, "covid")
+liste_lignes_covid = lier_table(liste_lignes_faits, "covid")
+mettre_a_jour_donnees_covid = lier_table(mettre_a_jour_fait, "covid")
+supprimer_donnees_covid = lier_table(supprimer_fait, "covid")
+
+
+@tracer()
 async def creer_donnees_covid_avec_pays(
     db: AsyncSession, 
     covid_data: Dict[str, Any],
@@ -55,40 +52,8 @@ async def creer_donnees_covid_avec_pays(
     return await creer_donnees_covid(db, covid_create)
 
 
-async def obtenir_donnees_covid_par_id(db: AsyncSession, covid_fact_id: int) -> Optional[FCovid]:
-    """Récupérer un enregistrement COVID par son ID"""
-    result = await db.execute(select(FCovid).where(FCovid.covid_fact_id == covid_fact_id))
-    return result.scalars().first()
-
-
-async def liste_donnees_covid(
-    db: AsyncSession, 
-    skip: int = 0, 
-    limit: int = 100,
-    location_id: Optional[int] = None,
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None
-) -> List[FCovid]:
-    """Récupérer une liste d'enregistrements COVID avec filtres optionnels"""
-    query = select(FCovid)
-    
-    # Appliquer les filtres si fournis
-    filters = []
-    if location_id:
-        filters.append(FCovid.location_id == location_id)
-    if start_date:
-        filters.append(FCovid.date >= start_date)
-    if end_date:
-        filters.append(FCovid.date <= end_date)
-    
-    if filters:
-        query = query.where(and_(*filters))
-    
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    return result.scalars().all()
-
-
+@tracer()
+@cache_requete()
 async def obtenir_statistiques_covid(
     db: AsyncSession,
     location_id: Optional[int] = None
@@ -102,7 +67,7 @@ async def obtenir_statistiques_covid(
     )
     
     # Ajouter le filtre de location si fourni
-    if location_id:
+    if location_id is not None:
         query = query.where(FCovid.location_id == location_id)
     
     result = await db.execute(query)
@@ -114,7 +79,7 @@ async def obtenir_statistiques_covid(
         func.sum(FCovid.people_vaccinated).label("people_vaccinated")
     )
     
-    if location_id:
+    if location_id is not None:
         vax_query = vax_query.where(FCovid.location_id == location_id)
     
     vax_result = await db.execute(vax_query)
@@ -130,12 +95,16 @@ async def obtenir_statistiques_covid(
     }
 
 
+@tracer()
+@cache_requete(version=version_analytique)
 async def obtenir_evolution_temporelle_covid(
     db: AsyncSession,
     location_id: Optional[int] = None,
     metric: str = "total_cases",
     start_date: Optional[date] = None,
-    end_date: Optional[date] = None
+    end_date: Optional[date] = None,
+    location_ids: Optional[List[int]] = None,
+    location_names: Optional[List[str]] = None
 ) -> List[Dict[str, Any]]:
     """Récupérer une série temporelle pour une métrique spécifique"""
     # Vérifier que la métrique est valide
@@ -157,9 +126,7 @@ async def obtenir_evolution_temporelle_covid(
     query = query.add_columns(DLocation.location_name)
     
     # Appliquer les filtres
-    filters = []
-    if location_id:
-        filters.append(FCovid.location_id == location_id)
+    filters = await filtres_pays(db, FCovid, location_id, location_ids, location_names)
     if start_date:
         filters.append(FCovid.date >= start_date)
     if end_date:
@@ -168,11 +135,10 @@ async def obtenir_evolution_temporelle_covid(
     if filters:
         query = query.where(and_(*filters))
     
-    # Ordonner par date
-    query = query.order_by(FCovid.date)
+    # Ordonner par pays puis par date
+    query = query.order_by(FCovid.location_id, FCovid.date)
     
-    result = await db.execute(query)
-    rows = result.fetchall()
+    rows = await executer_analytique(db, query)
     
     # Formatage des résultats
     return [
@@ -187,51 +153,12 @@ async def obtenir_evolution_temporelle_covid(
     ]
 
 
-async def supprimer_donnees_covid(db: AsyncSession, covid_fact_id: int) -> bool:
-    """Supprimer un enregistrement COVID par son ID"""
-    db_covid = await obtenir_donnees_covid_par_id(db, covid_fact_id)
-    if db_covid is None:
-        return False
-    
-    db.delete(db_covid)
-    await db.commit()
-    return True
-
-
-async def mettre_a_jour_donnees_covid(
-    db: AsyncSession, 
-    covid_fact_id: int, 
-    covid_data: FCovidCreate
-) -> Optional[FCovid]:
-    """Mettre à jour un enregistrement COVID existant"""
-    # Vérifier si l'enregistrement existe
-    db_covid = await obtenir_donnees_covid_par_id(db, covid_fact_id)
-    if db_covid is None:
-        return None
-    
-    # Mettre à jour les attributs
-    db_covid.date = covid_data.date
-    db_covid.location_id = covid_data.location_id
-    db_covid.total_cases = covid_data.total_cases
-    db_covid.new_cases = covid_data.new_cases
-    db_covid.total_deaths = covid_data.total_deaths
-    db_covid.new_deaths = covid_data.new_deaths
-    db_covid.icu_patients = covid_data.icu_patients
-    db_covid.hosp_patients = covid_data.hosp_patients
-    db_covid.total_vaccinations = covid_data.total_vaccinations
-    db_covid.people_vaccinated = covid_data.people_vaccinated
-    
-    # Persister les modifications
-    await db.commit()
-    await db.refresh(db_covid)
-    return db_covid
-
-
 # Alias pour assurer la compatibilité avec le code existant
 create_covid_record = creer_donnees_covid
 create_covid_record_with_location = creer_donnees_covid_avec_pays
 get_covid_record = obtenir_donnees_covid_par_id
 get_covid_records = liste_donnees_covid
+get_covid_rows = liste_lignes_covid
 get_covid_stats = obtenir_statistiques_covid
 get_covid_time_series = obtenir_evolution_temporelle_covid
 delete_covid_record = supprimer_donnees_covid
@@ -0,0 +1,202 @@
+import functools
+from datetime import date
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy import Integer, Numeric, and_, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import Select
+
+from backend.app.core.cache_pays import cache_pays
+from backend.app.core.query_cache import cache_requete
+from backend.app.core.serialisation import SchemaLecture
+from backend.app.core.tracage import tracer
+from backend.app.models.models import FCovid, FMpox
+from backend.app.schemas.schemas import FCovidRead, FMpoxRead
+
+
+class TableFaits:
+    """Descripteur d'une table de faits par pays et par date
+
+    Réunit le modèle, sa clé primaire, ses métriques (colonnes Numeric) et
+    son schéma de lecture. Les requêtes de liste sont construites une seule
+    fois par forme (colonnes lues, filtres présents) avec des paramètres
+    liés : chaque appel ne fait que fournir les valeurs, et le texte SQL
+    identique permet de réutiliser les requêtes préparées d'asyncpg.
+    """
+
+    def __init__(self, nom: str, modele, schema_lecture: Type[BaseModel]):
+        self.nom = nom
+        self.modele = modele
+        self.cle = modele.__mapper__.primary_key[0]
+        self.metriques = [colonne.name for colonne in modele.__table__.columns if isinstance(colonne.type, Numeric)]
+        self.lecture = SchemaLecture(modele, schema_lecture)
+        self.requete_par_id = select(modele).where(self.cle == bindparam("fait_id"))
+        self._requetes: Dict[Tuple[Optional[Tuple[str, ...]], FrozenSet[str]], Select] = {}
+
+    def requete_liste(self, champs: Optional[Sequence[str]], filtres: FrozenSet[str]) -> Select:
+        """Requête de liste (entités si champs est None, sinon colonnes) pour une combinaison de filtres"""
+        cle = (tuple(champs) if champs is not None else None, filtres)
+        query = self._requetes.get(cle)
+        if query is None:
+            query = self._requetes[cle] = self._construire_liste(cle[0], filtres)
+        return query
+
+    def _construire_liste(self, champs: Optional[Tuple[str, ...]], filtres: FrozenSet[str]) -> Select:
+        modele = self.modele
+        if champs is None:
+            query = select(modele)
+        else:
+            query = select(*self.lecture.projection(champs).colonnes)
+
+        # Pays résolus d'avance par la dimension en mémoire (identifiants et noms réunis)
+        conditions = []
+        if "location_ids" in filtres:
+            conditions.append(modele.location_id.in_(bindparam("location_ids", expanding=True)))
+        if "start_date" in filtres:
+            conditions.append(modele.date >= bindparam("start_date"))
+        if "end_date" in filtres:
+            conditions.append(modele.date <= bindparam("end_date"))
+        if conditions:
+            query = query.where(and_(*conditions))
+
+        return (
+            query.order_by(modele.location_id, modele.date)
+            .offset(bindparam("skip", type_=Integer))
+            .limit(bindparam("limit", type_=Integer))
+        )
+
+
+# Tables de faits connues de l'API, par nom
+FAITS_COVID = TableFaits("covid", FCovid, FCovidRead)
+FAITS_MPOX = TableFaits("mpox", FMpox, FMpoxRead)
+
+TABLES_FAITS: Dict[str, TableFaits] = {table.nom: table for table in (FAITS_COVID, FAITS_MPOX)}
+
+
+async def _parametres_liste(
+    db: AsyncSession,
+    skip: int,
+    limit: int,
+    location_id: Optional[int],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    location_ids: Optional[List[int]],
+    location_names: Optional[List[str]]
+) -> Tuple[FrozenSet[str], Dict[str, Any]]:
+    """Séparer les filtres fournis (forme de la requête) de leurs valeurs (paramètres liés)
+
+    Les pays désignés par identifiant et par nom sont réunis par
+    cache_pays.resoudre ; un nom inconnu lève ValueError.
+    """
+    filtres = {
+        "location_ids": await cache_pays.resoudre(db, location_id, location_ids, location_names),
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+    valeurs = {nom: valeur for nom, valeur in filtres.items() if valeur is not None}
+    forme = frozenset(valeurs)
+    valeurs["skip"] = skip
+    valeurs["limit"] = limit
+    return forme, valeurs
+
+
+@tracer()
+async def creer_fait(db: AsyncSession, faits: str, donnees: BaseModel):
+    """Créer un enregistrement dans une table de faits"""
+    entite = TABLES_FAITS[faits].modele(**donnees.model_dump())
+    db.add(entite)
+    await db.commit()
+    await db.refresh(entite)
+    return entite
+
+
+@tracer()
+async def obtenir_fait_par_id(db: AsyncSession, faits: str, fait_id: int):
+    """Récupérer un enregistrement par sa clé primaire"""
+    result = await db.execute(TABLES_FAITS[faits].requete_par_id, {"fait_id": fait_id})
+    return result.scalars().first()
+
+
+@tracer()
+@cache_requete()
+async def liste_faits(
+    db: AsyncSession,
+    faits: str,
+    skip: int = 0,
+    limit: int = 100,
+    location_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    location_ids: Optional[List[int]] = None,
+    location_names: Optional[List[str]] = None
+) -> list:
+    """Récupérer une liste d'enregistrements (entités ORM) avec filtres optionnels
+
+    Plusieurs pays peuvent être demandés en une seule requête, par
+    identifiant ou par nom (union des filtres). Les résultats sont ordonnés
+    par pays puis par date.
+    """
+    forme, valeurs = await _parametres_liste(db, skip, limit, location_id, start_date, end_date, location_ids, location_names)
+    result = await db.execute(TABLES_FAITS[faits].requete_liste(None, forme), valeurs)
+    return result.scalars().all()
+
+
+@tracer()
+@cache_requete()
+async def liste_lignes_faits(
+    db: AsyncSession,
+    faits: str,
+    skip: int = 0,
+    limit: int = 100,
+    location_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    location_ids: Optional[List[int]] = None,
+    location_names: Optional[List[str]] = None,
+    fields: Optional[List[str]] = None
+) -> List[tuple]:
+    """Même lecture que liste_faits, sous forme de tuples dans l'ordre du schéma de lecture
+
+    Évite la construction des entités ORM et la conversion des Decimal :
+    les lignes sont destinées à table.lecture.projection(fields).encoder.
+    Seules les colonnes de fields sont lues lorsqu'il est fourni.
+    """
+    table = TABLES_FAITS[faits]
+    champs = table.lecture.projection(fields).champs
+    forme, valeurs = await _parametres_liste(db, skip, limit, location_id, start_date, end_date, location_ids, location_names)
+    result = await db.execute(table.requete_liste(champs, forme), valeurs)
+    return [tuple(ligne) for ligne in result]
+
+
+@tracer()
+async def mettre_a_jour_fait(db: AsyncSession, faits: str, fait_id: int, donnees: BaseModel):
+    """Remplacer les valeurs d'un enregistrement existant (None s'il n'existe pas)"""
+    entite = await obtenir_fait_par_id(db, faits, fait_id)
+    if entite is None:
+        return None
+    for champ, valeur in donnees.model_dump().items():
+        setattr(entite, champ, valeur)
+    await db.commit()
+    await db.refresh(entite)
+    return entite
+
+
+@tracer()
+async def supprimer_fait(db: AsyncSession, faits: str, fait_id: int) -> bool:
+    """Supprimer un enregistrement par sa clé primaire"""
+    entite = await obtenir_fait_par_id(db, faits, fait_id)
+    if entite is None:
+        return False
+    await db.delete(entite)
+    await db.commit()
+    return True
+
+
+def lier_table(fonction, faits: str):
+    """Lier une opération générique à une table de faits : `lier_table(liste_faits, "covid")(db, ...)`"""
+    @functools.wraps(fonction)
+    async def operation(db: AsyncSession, *args, **kwargs):
+        return await fonction(db, faits, *args, **kwargs)
+    return operation
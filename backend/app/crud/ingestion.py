@@ -0,0 +1,222 @@
+import codecs
+import csv
+import time
+from collections import deque
+from datetime import date
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.app.crud.agregation import METRIQUES
+from backend.app.core.cache_pays import cache_pays
+from backend.app.core.database import definir_delai_requetes
+from backend.app.core.tracage import tracer
+
+
+# Nombre maximal d'erreurs de ligne détaillées dans le rapport
+MAX_ERREURS_RAPPORT = 50
+
+# Lignes qu'un champ entre guillemets peut couvrir avant que l'enregistrement soit rejeté
+MAX_LIGNES_ENREGISTREMENT = 1000
+
+# Noms de colonne acceptés pour le pays (format OWID : "location")
+COLONNES_PAYS = ("location", "location_name")
+
+
+class RapportIngestion:
+    """Compteurs mis à jour pendant la lecture du flux CSV"""
+
+    def __init__(self):
+        self.rows_received = 0
+        self.rows_rejected = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def rejeter(self, ligne: int, detail: str) -> None:
+        self.rows_rejected += 1
+        if len(self.errors) < MAX_ERREURS_RAPPORT:
+            self.errors.append({"line": ligne, "detail": detail})
+
+
+async def _lignes_texte(flux: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Découper un flux d'octets en lignes de texte (fin de ligne comprise) sans le charger en entier"""
+    decodeur = codecs.getincrementaldecoder("utf-8-sig")()
+    reste = ""
+    async for morceau in flux:
+        reste += decodeur.decode(morceau)
+        *lignes, reste = reste.split("\n")
+        for ligne in lignes:
+            yield ligne + "\n"
+    reste += decodeur.decode(b"", final=True)
+    if reste:
+        yield reste
+
+
+def _lire_en_attente(lecteur, en_attente: deque, base: int) -> Tuple[Any, int, List[Tuple[int, Optional[List[str]]]]]:
+    """Lire les enregistrements des lignes en attente ; retourne le lecteur, les lignes lues avant lui et les enregistrements"""
+    enregistrements = []
+    while en_attente:
+        debut = base + lecteur.line_num + 1
+        try:
+            valeurs = next(lecteur)
+        except (IndexError, csv.Error):
+            # Le lecteur attendait une ligne de plus : il repart d'un état vide
+            base += lecteur.line_num + len(en_attente)
+            en_attente.clear()
+            lecteur = csv.reader(iter(en_attente.popleft, None))
+            valeurs = None
+        if valeurs != []:
+            enregistrements.append((debut, valeurs))
+    return lecteur, base, enregistrements
+
+
+async def _enregistrements_csv(lignes: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Optional[List[str]]]]:
+    """Enregistrements CSV du flux avec le numéro de leur première ligne
+
+    Un seul lecteur csv conserve son état d'un morceau à l'autre : un champ
+    entre guillemets peut contenir des sauts de ligne (RFC 4180). Les lignes
+    lui sont transmises par enregistrement complet, c'est-à-dire lorsque le
+    nombre de guillemets lus depuis son début est pair (ou au-delà de
+    MAX_LIGNES_ENREGISTREMENT lignes). Un enregistrement aux guillemets mal
+    placés est produit avec None à la place des valeurs.
+    """
+    en_attente: deque = deque()
+    lecteur = csv.reader(iter(en_attente.popleft, None))
+    base = 0
+    guillemets = 0
+    async for ligne in lignes:
+        en_attente.append(ligne)
+        guillemets += ligne.count('"')
+        if guillemets % 2 and len(en_attente) < MAX_LIGNES_ENREGISTREMENT:
+            continue
+        guillemets = 0
+        lecteur, base, enregistrements = _lire_en_attente(lecteur, en_attente, base)
+        for enregistrement in enregistrements:
+            yield enregistrement
+    lecteur, base, enregistrements = _lire_en_attente(lecteur, en_attente, base)
+    for enregistrement in enregistrements:
+        yield enregistrement
+
+
+def _nombre(valeur: str) -> Optional[float]:
+    valeur = valeur.strip()
+    return float(valeur) if valeur else None
+
+
+async def _enregistrements(
+    lignes: AsyncIterator[str],
+    metriques: List[str],
+    rapport: RapportIngestion
+) -> AsyncIterator[Tuple]:
+    """Valider chaque ligne CSV et produire les tuples à copier dans la table de transit"""
+    entete = None
+    async for numero, valeurs in _enregistrements_csv(lignes):
+        if valeurs is None:
+            if entete is None:
+                raise ValueError("En-tête CSV invalide (guillemets mal placés)")
+            rapport.rows_received += 1
+            rapport.rejeter(numero, "guillemets mal placés")
+            continue
+        if not any(valeur.strip() for valeur in valeurs):
+            continue
+
+        if entete is None:
+            entete = {nom.strip(): position for position, nom in enumerate(valeurs)}
+            colonne_pays = next((nom for nom in COLONNES_PAYS if nom in entete), None)
+            if colonne_pays is None or "date" not in entete:
+                raise ValueError("Le fichier CSV doit contenir les colonnes 'location' et 'date'")
+            position_pays = entete[colonne_pays]
+            position_date = entete["date"]
+            # Les métriques absentes du fichier sont chargées à NULL
+            positions = [entete.get(metrique) for metrique in metriques]
+            continue
+
+        rapport.rows_received += 1
+        if len(valeurs) != len(entete):
+            rapport.rejeter(numero, f"{len(valeurs)} colonnes au lieu de {len(entete)}")
+            continue
+        try:
+            pays = valeurs[position_pays].strip()
+            if not pays:
+                raise ValueError("pays manquant")
+            enregistrement = (pays, date.fromisoformat(valeurs[position_date].strip()[:10])) + tuple(
+                _nombre(valeurs[position]) if position is not None else None for position in positions
+            )
+        except ValueError as e:
+            rapport.rejeter(numero, str(e))
+            continue
+        yield enregistrement
+
+    if entete is None:
+        raise ValueError("Le fichier CSV est vide")
+
+
+@tracer()
+async def ingerer_csv(db: AsyncSession, modele, flux: AsyncIterator[bytes]) -> Dict[str, Any]:
+    """Charger un CSV au format OWID dans une table de faits via COPY puis fusion
+
+    Le flux est validé ligne par ligne et copié dans une table temporaire
+    sans être chargé en mémoire. Les pays inconnus sont créés en une
+    requête, puis les faits sont fusionnés selon la clé (location_id, date).
+    """
+    debut = time.perf_counter()
+    table = modele.__tablename__
+    metriques = METRIQUES[modele]
+    transit = f"transit_{table}"
+    rapport = RapportIngestion()
+
+    try:
+        # Le chargement d'un gros fichier ne doit pas être interrompu par le délai des requêtes de lecture
+        await definir_delai_requetes(db, 0)
+        colonnes_sql = ", ".join(f"{metrique} double precision" for metrique in metriques)
+        await db.execute(text(
+            f"CREATE TEMP TABLE {transit} (rang bigint GENERATED ALWAYS AS IDENTITY, "
+            f"location_name text, date date, {colonnes_sql}) ON COMMIT DROP"
+        ))
+
+        # COPY binaire directement sur la connexion asyncpg de la session
+        connexion = await db.connection()
+        brute = await connexion.get_raw_connection()
+        await brute.driver_connection.copy_records_to_table(
+            transit,
+            records=_enregistrements(_lignes_texte(flux), metriques, rapport),
+            columns=["location_name", "date"] + metriques
+        )
+
+        result = await db.execute(text(
+            f"INSERT INTO d_location (location_name) "
+            f"SELECT DISTINCT t.location_name FROM {transit} t "
+            f"WHERE NOT EXISTS (SELECT 1 FROM d_location l WHERE l.location_name = t.location_name)"
+        ))
+        pays_crees = result.rowcount
+
+        colonnes = ", ".join(metriques)
+        mises_a_jour = ", ".join(f"{metrique} = EXCLUDED.{metrique}" for metrique in metriques)
+        result = await db.execute(text(
+            f"INSERT INTO {table} (location_id, date, {colonnes}) "
+            f"SELECT DISTINCT ON (l.location_id, t.date) l.location_id, t.date, "
+            f"{', '.join(f't.{metrique}' for metrique in metriques)} "
+            f"FROM {transit} t JOIN d_location l ON l.location_name = t.location_name "
+            # Doublons dans le fichier : la dernière ligne lue l'emporte
+            f"ORDER BY l.location_id, t.date, t.rang DESC "
+            f"ON CONFLICT (location_id, date) DO UPDATE SET {mises_a_jour}, updated_at = now()"
+        ))
+        lignes_fusionnees = result.rowcount
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    if pays_crees:
+        cache_pays.invalider()
+
+    duree = time.perf_counter() - debut
+    return {
+        "table": table,
+        "rows_received": rapport.rows_received,
+        "rows_rejected": rapport.rows_rejected,
+        "rows_merged": lignes_fusionnees,
+        "locations_created": pays_crees,
+        "duration_s": round(duree, 3),
+        "rows_per_second": round(rapport.rows_received / duree, 1) if duree > 0 else None,
+        "errors": rapport.errors,
+    }
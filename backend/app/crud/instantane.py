@@ -0,0 +1,169 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Float, cast, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from backend.app.core.cache import abonner_invalidation, version_donnees
+from backend.app.core.routage import session_lecture
+from backend.app.core.serialisation import encoder_json
+from backend.app.core.tracage import tracer
+from backend.app.crud.agregation import METRIQUES
+from backend.app.models.models import DLocation, FCovid, FMpox
+
+logger = logging.getLogger(__name__)
+
+
+class Instantane:
+    """Dernières valeurs connues par pays et classements par métrique, gardés en mémoire
+
+    Pour chaque pays et chaque métrique, la valeur retenue est la plus
+    récente non nulle (comme groupby(...).last() dans pandas). Le
+    tableau est construit au démarrage puis reconstruit en tâche de fond
+    après chaque écriture ; une lecture arrivant avant la fin de la
+    reconstruction l'attend, et ne sert jamais la version précédente.
+    """
+
+    def __init__(self, modele):
+        self.modele = modele
+        self.metriques = METRIQUES[modele]
+        self.version: Optional[str] = None
+        self.lignes: List[Dict[str, Any]] = []
+        self.classements: Dict[str, List[Dict[str, Any]]] = {}
+        self.json_lignes = b"[]"
+        self._tache: Optional[asyncio.Task] = None
+        self._a_refaire = False
+
+    @tracer()
+    async def construire(self, db: AsyncSession) -> None:
+        """Recalculer l'instantané en deux requêtes (dates des dernières valeurs, puis valeurs)"""
+        version = version_donnees()
+        modele = self.modele
+
+        # 1. Pour chaque pays, date de la dernière valeur non nulle de chaque métrique
+        dates_metriques = [
+            func.max(modele.date).filter(getattr(modele, metrique).isnot(None)).label(f"date_{metrique}")
+            for metrique in self.metriques
+        ]
+        result = await db.execute(
+            select(modele.location_id, DLocation.location_name, func.max(modele.date).label("date"), *dates_metriques)
+            .join(DLocation, modele.location_id == DLocation.location_id)
+            .group_by(modele.location_id, DLocation.location_name)
+            .order_by(modele.location_id)
+        )
+        pays = result.all()
+
+        # 2. Valeurs aux couples (pays, date) ainsi trouvés
+        paires = {
+            (ligne.location_id, getattr(ligne, f"date_{metrique}"))
+            for ligne in pays
+            for metrique in self.metriques
+            if getattr(ligne, f"date_{metrique}") is not None
+        }
+        valeurs = {}
+        if paires:
+            result = await db.execute(
+                select(
+                    modele.location_id, modele.date,
+                    *[cast(getattr(modele, metrique), Float).label(metrique) for metrique in self.metriques]
+                ).where(tuple_(modele.location_id, modele.date).in_(sorted(paires)))
+            )
+            valeurs = {(ligne.location_id, ligne.date): ligne for ligne in result}
+
+        lignes = []
+        classements: Dict[str, List[Dict[str, Any]]] = {metrique: [] for metrique in self.metriques}
+        for ligne in pays:
+            derniere = {"date": ligne.date, "location_id": ligne.location_id}
+            for metrique in self.metriques:
+                jour = getattr(ligne, f"date_{metrique}")
+                valeur = getattr(valeurs[(ligne.location_id, jour)], metrique) if jour is not None else None
+                derniere[metrique] = valeur
+                if valeur is not None:
+                    classements[metrique].append({
+                        "location_id": ligne.location_id,
+                        "location_name": ligne.location_name,
+                        "date": jour,
+                        "value": valeur
+                    })
+            derniere["location_name"] = ligne.location_name
+            lignes.append(derniere)
+
+        for metrique, classement in classements.items():
+            classement.sort(key=lambda element: element["value"], reverse=True)
+            classements[metrique] = [{"rank": rang, **element} for rang, element in enumerate(classement, start=1)]
+
+        # Remplacement en bloc : une lecture concurrente voit l'ancien ou le nouvel instantané
+        self.lignes, self.classements, self.json_lignes, self.version = (
+            lignes, classements, encoder_json(lignes), version
+        )
+
+    def demander_actualisation(self) -> None:
+        """Planifier une reconstruction en tâche de fond (une seule à la fois)"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._tache is not None and not self._tache.done():
+            self._a_refaire = True
+            return
+        self._tache = asyncio.create_task(self._actualiser())
+
+    async def _actualiser(self) -> None:
+        while True:
+            self._a_refaire = False
+            try:
+                async with session_lecture() as db:
+                    await self.construire(db)
+            except Exception as e:
+                logger.warning(f"Impossible de reconstruire l'instantané {self.modele.__tablename__}: {str(e)}")
+            if not self._a_refaire:
+                return
+
+    @tracer()
+    async def obtenir(self, db: AsyncSession) -> "Instantane":
+        """Retourner l'instantané courant, en relançant sa construction si les données ont changé"""
+        if self.version is None:
+            await self.construire(db)
+        elif self.version != version_donnees():
+            # Import ou écriture : attendre la reconstruction (partagée entre les requêtes concurrentes).
+            # Servir l'ancien instantané le ferait enregistrer sous la nouvelle version par le cache de réponses
+            self.demander_actualisation()
+            if self._tache is not None:
+                await asyncio.shield(self._tache)
+            if self.version != version_donnees():
+                # Reconstruction en échec ou nouvelle écriture entre-temps : reconstruire avec cette session
+                await self.construire(db)
+        return self
+
+    def selection(self, location_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """Dernières valeurs de tous les pays, ou de certains"""
+        if location_ids is None:
+            return self.lignes
+        selection = set(location_ids)
+        return [ligne for ligne in self.lignes if ligne["location_id"] in selection]
+
+    def classement(self, metric: str, n: int) -> List[Dict[str, Any]]:
+        """Les n pays ayant la plus forte dernière valeur pour une métrique"""
+        if metric not in self.classements:
+            raise ValueError(f"Métrique invalide. Doit être l'une de: {', '.join(self.metriques)}")
+        return self.classements[metric][:n]
+
+    def dernieres(self, location_ids: Optional[List[int]] = None) -> bytes:
+        """Dernières valeurs de tous les pays (ou de certains), déjà encodées en JSON"""
+        if location_ids is None:
+            return self.json_lignes
+        return encoder_json(self.selection(location_ids))
+
+    def top(self, metric: str, n: int) -> bytes:
+        """Classement des n premiers pays pour une métrique, encodé en JSON"""
+        return encoder_json(self.classement(metric, n))
+
+
+instantane_covid = Instantane(FCovid)
+instantane_mpox = Instantane(FMpox)
+
+# Reconstruire les instantanés de ce worker après chaque écriture réussie
+abonner_invalidation(instantane_covid.demander_actualisation)
+abonner_invalidation(instantane_mpox.demander_actualisation)
@@ -3,35 +3,60 @@ from sqlalchemy.future import select
 from typing import List, Optional
 from backend.app.models.models import DLocation
 from backend.app.schemas.schemas import DLocationCreate
+from backend.app.core.cache_pays import cache_pays
+from backend.app.core.moteur_analytique import resoudre_pays_analytique
+from backend.app.core.tracage import tracer
 
 
+async def filtres_pays(
+    db: AsyncSession,
+    modele,
+    location_id: Optional[int] = None,
+    location_ids: Optional[List[int]] = None,
+    location_names: Optional[List[str]] = None
+) -> list:
+    """Construire le filtre de pays commun aux requêtes analytiques sur les tables de faits
+
+    Les pays désignés par identifiant et par nom sont réunis, dans la
+    dimension du moteur analytique ; un nom inconnu lève ValueError.
+    """
+    ids = await resoudre_pays_analytique(db, location_id, location_ids, location_names)
+    return [] if ids is None else [modele.location_id.in_(ids)]
+
+
+@tracer()
 async def creer_pays(db: AsyncSession, location: DLocationCreate) -> DLocation:
     """Créer un nouveau pays"""
     db_location = DLocation(location_name=location.location_name)
     db.add(db_location)
     await db.commit()
     await db.refresh(db_location)
+    cache_pays.invalider()
     return db_location
 
 
+@tracer()
 async def obtenir_pays_par_id(db: AsyncSession, location_id: int) -> Optional[DLocation]:
     """Récupérer un pays par son ID"""
     result = await db.execute(select(DLocation).where(DLocation.location_id == location_id))
     return result.scalars().first()
 
 
+@tracer()
 async def obtenir_pays_par_nom(db: AsyncSession, location_name: str) -> Optional[DLocation]:
     """Récupérer un pays par son nom"""
     result = await db.execute(select(DLocation).where(DLocation.location_name == location_name))
     return result.scalars().first()
 
 
+@tracer()
 async def liste_pays(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[DLocation]:
     """Récupérer une liste de pays"""
     result = await db.execute(select(DLocation).offset(skip).limit(limit))
     return result.scalars().all()
 
 
+@tracer()
 async def obtenir_ou_creer_pays(db: AsyncSession, location_name: str) -> DLocation:
     """Récupérer un pays par son nom ou le créer s'il n'existe pas"""
     db_location = await obtenir_pays_par_nom(db, location_name)
@@ -40,17 +65,20 @@ async def obtenir_ou_creer_pays(db: AsyncSession, location_name: str) -> DLocati
         db.add(db_location)
         await db.commit()
         await db.refresh(db_location)
+        cache_pays.invalider()
     return db_location
 
 
+@tracer()
 async def supprimer_pays(db: AsyncSession, location_id: int) -> bool:
     """Supprimer un pays par son ID"""
     db_location = await obtenir_pays_par_id(db, location_id)
     if db_location is None:
         return False
     
-    db.delete(db_location)
+    await db.delete(db_location)
     await db.commit()
+    cache_pays.invalider()
     return True
 
 
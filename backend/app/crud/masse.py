@@ -0,0 +1,124 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import Boolean, Date, Integer, case, column, func, literal_column, update, values
+from typing import Any, Dict, List, Tuple
+
+from backend.app.core.tracage import tracer
+
+
+# Nombre de lignes par INSERT multi-lignes (asyncpg limite le nombre de paramètres par requête)
+TAILLE_LOT = 1000
+
+# Nombre maximal de paramètres liés dans une même requête PostgreSQL
+MAX_PARAMETRES = 30000
+
+# Colonnes qui identifient une ligne de fait indépendamment de sa clé technique
+CLE_NATURELLE = ("location_id", "date")
+
+
+@tracer()
+async def inserer_lot(db: AsyncSession, modele, lignes: List[Dict[str, Any]]) -> List[Tuple[int, int, Any]]:
+    """Insérer un lot de lignes avec un INSERT ... ON CONFLICT DO NOTHING multi-lignes
+
+    Une ligne dont la clé (location_id, date) existe déjà est ignorée.
+    Retourne l'identifiant et la clé des lignes effectivement insérées.
+    """
+    if not lignes:
+        return []
+    cle_primaire = modele.__table__.primary_key.columns.values()[0]
+    query = (
+        pg_insert(modele)
+        .on_conflict_do_nothing(index_elements=list(CLE_NATURELLE))
+        .returning(cle_primaire, modele.location_id, modele.date)
+    )
+    try:
+        result = await db.execute(query, lignes)
+        inserees = [tuple(row) for row in result]
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return inserees
+
+
+@tracer()
+async def upsert_lot(db: AsyncSession, modele, lignes: List[Dict[str, Any]]) -> List[Tuple[int, bool]]:
+    """Insérer ou mettre à jour un lot de lignes selon la clé (location_id, date)
+
+    Les clés doivent être uniques dans le lot. Retourne, pour chaque ligne
+    et dans l'ordre du lot, son identifiant et un booléen indiquant si elle
+    a été créée (True) ou mise à jour (False).
+    """
+    if not lignes:
+        return []
+    cle_primaire = modele.__table__.primary_key.columns.values()[0]
+    query = pg_insert(modele)
+    colonnes = [champ for champ in lignes[0] if champ not in CLE_NATURELLE]
+    query = query.on_conflict_do_update(
+        index_elements=list(CLE_NATURELLE),
+        set_={**{champ: query.excluded[champ] for champ in colonnes}, "updated_at": func.now()}
+    ).returning(
+        cle_primaire,
+        modele.location_id,
+        modele.date,
+        # xmax vaut 0 pour une ligne nouvellement insérée
+        literal_column("(xmax = 0)", Boolean).label("inserted")
+    )
+    try:
+        result = await db.execute(query, lignes)
+        # Associer les lignes retournées aux lignes du lot par leur clé naturelle
+        par_cle = {(row.location_id, row.date): (row[0], row.inserted) for row in result}
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return [par_cle[(ligne["location_id"], ligne["date"])] for ligne in lignes]
+
+
+@tracer()
+async def corriger_lot(db: AsyncSession, modele, correctifs: List[Dict[str, Any]]) -> List[Tuple[int, int, Any]]:
+    """Appliquer des correctifs partiels avec un seul UPDATE ... FROM (VALUES ...)
+
+    Chaque correctif contient la clé (location_id, date) et uniquement les
+    champs modifiés. Un indicateur par colonne permet de distinguer un champ
+    absent d'un champ explicitement remis à NULL. Retourne les clés des
+    lignes effectivement mises à jour.
+    """
+    if not correctifs:
+        return []
+    cle_primaire = modele.__table__.primary_key.columns.values()[0]
+    champs = sorted({champ for correctif in correctifs for champ in correctif if champ not in CLE_NATURELLE})
+    if not champs:
+        return []
+
+    colonnes = [column("location_id", Integer), column("date", Date)]
+    colonnes += [column(champ, getattr(modele, champ).type) for champ in champs]
+    colonnes += [column(f"{champ}__set", Boolean) for champ in champs]
+    taille = max(1, MAX_PARAMETRES // len(colonnes))
+
+    mises_a_jour = []
+    try:
+        for debut in range(0, len(correctifs), taille):
+            lot = correctifs[debut:debut + taille]
+            donnees = values(*colonnes, name="correctifs").data([
+                (c["location_id"], c["date"])
+                + tuple(c.get(champ) for champ in champs)
+                + tuple(champ in c for champ in champs)
+                for c in lot
+            ])
+            query = (
+                update(modele)
+                .where(modele.location_id == donnees.c.location_id, modele.date == donnees.c.date)
+                .values({
+                    champ: case((donnees.c[f"{champ}__set"], donnees.c[champ]), else_=getattr(modele, champ))
+                    for champ in champs
+                })
+                .returning(cle_primaire, modele.location_id, modele.date)
+            )
+            result = await db.execute(query)
+            mises_a_jour.extend(tuple(row) for row in result)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return mises_a_jour
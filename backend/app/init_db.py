@@ -2,12 +2,74 @@ import sys
 sys.stdout.reconfigure(encoding='utf-8')
 
 import asyncio
+import hashlib
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.schema import CreateIndex, CreateTable, DropIndex
 from backend.app.core.database import Base, engine
-from backend.app.models import models 
+from backend.app.models import models
+
+# Empreinte du schéma créé par init_db, conservée dans la base (hors des modèles de l'API)
+_metadata_empreinte = MetaData()
+schema_empreinte = Table(
+    "schema_empreinte", _metadata_empreinte,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("empreinte", String(64), nullable=False),
+    Column("updated_at", DateTime, server_default=func.now(), onupdate=func.now())
+)
+
+
+def empreinte_schema() -> str:
+    """Empreinte SHA-256 du DDL des modèles (tables et index), pour le dialecte de l'engine"""
+    ddl = []
+    for table in Base.metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=engine.dialect)))
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            ddl.append(str(CreateIndex(index).compile(dialect=engine.dialect)))
+    return hashlib.sha256("\n".join(ddl).encode("utf-8")).hexdigest()
+
+
+async def migrer_index_couvrants(conn):
+    """Fusionner l'ancien index couvrant séparé dans l'index unique (location_id, date) des tables de faits"""
+    for table in (models.FCovid.__table__, models.FMpox.__table__):
+        await conn.execute(text(f"DROP INDEX IF EXISTS ix_{table.name}_location_date_couvrant"))
+        for index in table.indexes:
+            if not index.dialect_options["postgresql"]["include"]:
+                continue
+            definition = (await conn.execute(
+                text("SELECT indexdef FROM pg_indexes WHERE indexname = :nom"), {"nom": index.name}
+            )).scalar()
+            if definition is not None and " INCLUDE " not in definition:
+                await conn.execute(DropIndex(index))
+                await conn.execute(CreateIndex(index))
+
 
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await migrer_index_couvrants(conn)
+        await conn.run_sync(_metadata_empreinte.create_all)
+        empreinte = empreinte_schema()
+        await conn.execute(
+            insert(schema_empreinte)
+            .values(id=1, empreinte=empreinte)
+            .on_conflict_do_update(index_elements=[schema_empreinte.c.id], set_={"empreinte": empreinte, "updated_at": func.now()})
+        )
+
+
+async def init_db_si_necessaire() -> bool:
+    """Créer le schéma seulement si l'empreinte enregistrée ne correspond pas aux modèles
+
+    Retourne True si init_db a été exécuté.
+    """
+    async with engine.connect() as conn:
+        existe = await conn.run_sync(lambda sync_conn: sync_conn.dialect.has_table(sync_conn, schema_empreinte.name))
+        if existe:
+            enregistree = (await conn.execute(select(schema_empreinte.c.empreinte))).scalar()
+            if enregistree == empreinte_schema():
+                return False
+    await init_db()
+    return True
 
 if __name__ == "__main__":
     asyncio.run(init_db())
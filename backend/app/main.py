@@ -1,11 +1,86 @@
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from backend.app.api.api import api_router
+from backend.app.core.admission import AdmissionMiddleware, etat_admission
+from backend.app.core.cache import ResponseCacheMiddleware
+from backend.app.core.cache_pays import cache_pays
+from backend.app.core.database import engine, etat_pool, prechauffer_pool
+from backend.app.core.metriques import METRICS_ENABLED, JaugeCalculee, MetriquesMiddleware, exposer
+from backend.app.core.moteur_analytique import moteur_duckdb
+from backend.app.core.routage import routeur_lecture, session_lecture
+from backend.app.core.taches import JOBS_ENABLED, gestionnaire_taches
+from backend.app.core.tracage import TRACING_ENABLED, TracageMiddleware
+from backend.app.crud.instantane import instantane_covid, instantane_mpox
+
+logger = logging.getLogger(__name__)
+
+# Durée du préchauffage de ce worker (pool, caches en mémoire), mesurée au démarrage
+demarrage = {"pid": os.getpid(), "startup_s": None}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    debut = time.perf_counter()
+    demarrage["pid"] = os.getpid()
+
+    # Ouvrir d'avance les connexions du pool (pool_warmup du profil)
+    try:
+        connexions = await prechauffer_pool() + await routeur_lecture.prechauffer()
+        logger.info(f"{connexions} connexion(s) ouverte(s) au démarrage")
+    except Exception as e:
+        logger.warning(f"Impossible d'ouvrir les connexions du pool au démarrage: {str(e)}")
+
+    # Charger la dimension des pays en mémoire avant de servir les requêtes
+    try:
+        async with session_lecture() as db:
+            await cache_pays.charger(db)
+        logger.info(f"Dimension des pays chargée en mémoire ({len(cache_pays)} pays)")
+    except Exception as e:
+        # Le cache sera chargé à la première requête qui l'utilise
+        logger.warning(f"Impossible de charger la dimension des pays au démarrage: {str(e)}")
+
+    # Construire les instantanés des dernières valeurs (/latest, /top)
+    for instantane in (instantane_covid, instantane_mpox):
+        try:
+            async with session_lecture() as db:
+                await instantane.construire(db)
+        except Exception as e:
+            logger.warning(f"Impossible de construire l'instantané {instantane.modele.__tablename__}: {str(e)}")
+
+    # Charger les fichiers de l'ETL dans DuckDB s'il sert les requêtes analytiques
+    if moteur_duckdb is not None:
+        try:
+            await moteur_duckdb.charger()
+        except Exception as e:
+            logger.warning(f"Impossible de charger les fichiers de l'ETL dans DuckDB: {str(e)}")
+
+    # Exécuter les tâches de fond (ETL, imports) mises en attente par /api/admin/taches
+    if JOBS_ENABLED:
+        gestionnaire_taches.demarrer()
+
+    demarrage["startup_s"] = round(time.perf_counter() - debut, 3)
+    logger.info(f"Worker {demarrage['pid']} prêt en {demarrage['startup_s']} s")
+    yield
+
+    # Interrompre la tâche de fond en cours (marquée en échec) avant de fermer le pool
+    await gestionnaire_taches.arreter()
+
+    # Fermer proprement les connexions du pool à l'arrêt du worker
+    await routeur_lecture.fermer()
+    await engine.dispose()
+
 
 app = FastAPI(
     title="API COVID-19 & Mpox",
     description="API pour accéder aux données COVID-19 et Mpox - Projet MSPR Data Science",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Page d'accueil
@@ -18,5 +93,71 @@ async def accueil():
         "aide": "Utilisez la documentation interactive pour explorer les endpoints disponibles."
     }
 
+# État du pool de connexions à la base de données
+@app.get("/sante")
+async def sante():
+    return {
+        "status": "ok",
+        "database_pool": etat_pool(),
+        "replicas": routeur_lecture.etat(),
+        "primary_reads": routeur_lecture.lectures_principale,
+        "admission": etat_admission(),
+        "worker": demarrage
+    }
+
+def _etats_pools():
+    """État du pool de la base principale et de chaque réplica, par URL"""
+    etats = [(engine.url.render_as_string(hide_password=True), etat_pool())]
+    etats += [(replica["url"], replica["pool"]) for replica in routeur_lecture.etat()]
+    return etats
+
+
+# Mesures lues au moment de l'exposition : pools de connexions et classes d'admission
+for nom, cle, aide, type_metrique in (
+    ("db_pool_checked_out", "checked_out", "Connexions du pool empruntées", "gauge"),
+    ("db_pool_checked_in", "checked_in", "Connexions disponibles dans le pool", "gauge"),
+    ("db_pool_overflow", "overflow", "Connexions ouvertes au-delà de pool_size", "gauge"),
+    ("db_pool_connections_opened_total", "connections_opened", "Connexions ouvertes depuis le démarrage", "counter"),
+    ("db_pool_checkouts_total", "checkouts", "Emprunts de connexion depuis le démarrage", "counter"),
+    ("db_pool_invalidations_total", "invalidations", "Connexions invalidées depuis le démarrage", "counter"),
+):
+    JaugeCalculee(
+        nom, aide, ("database",),
+        lambda cle=cle: {(database,): etat[cle] for database, etat in _etats_pools()},
+        type_metrique
+    )
+for nom, cle, aide, type_metrique in (
+    ("api_admission_in_flight", "in_flight", "Requêtes admises en cours, par classe de coût", "gauge"),
+    ("api_admission_waiting", "waiting", "Requêtes en file d'attente, par classe de coût", "gauge"),
+    ("api_admission_admitted_total", "admitted", "Requêtes admises, par classe de coût", "counter"),
+    ("api_admission_rejected_total", "rejected", "Requêtes refusées (503), par classe de coût", "counter"),
+):
+    JaugeCalculee(
+        nom, aide, ("class",),
+        lambda cle=cle: {(classe,): etat[cle] for classe, etat in etat_admission().get("classes", {}).items()},
+        type_metrique
+    )
+
+
+# Mesures du worker au format Prometheus
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metriques():
+    return PlainTextResponse(exposer(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Contrôle d'admission par classe de coût (503 + Retry-After en cas de surcharge) ;
+# déclaré avant le cache de réponses pour que les réponses en cache n'occupent pas de place
+app.add_middleware(AdmissionMiddleware, prefix="/api", exclure=("/api/admin",))
+
+# Cache des réponses GET de l'API (ETag / 304, invalidé par les écritures) ; hors administration
+app.add_middleware(ResponseCacheMiddleware, prefix="/api", exclure=("/api/admin",))
+
+# Spans de chaque requête tracée (échantillonnage TRACING_SAMPLE_RATE, requêtes lentes TRACING_SLOW_MS)
+if TRACING_ENABLED:
+    app.add_middleware(TracageMiddleware)
+
+# Durée, statut et taille des réponses par route (middleware le plus externe : tout est mesuré)
+if METRICS_ENABLED:
+    app.add_middleware(MetriquesMiddleware)
+
 # Inclusion des routes de l'API
 app.include_router(api_router, prefix="/api")
@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, String, Date, DateTime, Numeric, ForeignKey, func
+    JSON, BigInteger, Column, Integer, String, Text, Date, DateTime, Numeric, ForeignKey, Index, func
 )
 from backend.app.core.database import Base
 
@@ -13,6 +13,14 @@ class DLocation(Base):
 class FCovid(Base):
     """Table de faits principale pour les données COVID"""
     __tablename__ = 'f_covid'
+    __table_args__ = (
+        # Clé naturelle des upserts et des correctifs en masse, couvrant les métriques les plus
+        # demandées : parcours d'index seul avec fields=
+        Index(
+            'uq_f_covid_location_date', 'location_id', 'date', unique=True,
+            postgresql_include=['total_cases', 'new_cases', 'total_deaths', 'new_deaths']
+        ),
+    )
     
     covid_fact_id = Column(Integer, primary_key=True, autoincrement=True)
     date = Column(Date, nullable=False)  # Format: YYYY-MM-DD
@@ -40,6 +48,12 @@ class FCovid(Base):
 class FMpox(Base):
     """Table de faits pour les données MPOX (variole du singe)"""
     __tablename__ = 'f_mpox'
+    __table_args__ = (
+        Index(
+            'uq_f_mpox_location_date', 'location_id', 'date', unique=True,
+            postgresql_include=['total_cases', 'new_cases', 'total_deaths', 'new_deaths']
+        ),
+    )
 
     mpox_fact_id = Column(Integer, primary_key=True, autoincrement=True)
     date = Column(Date, nullable=False)
@@ -63,3 +77,29 @@ class FMpox(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
+
+
+class Tache(Base):
+    """Exécution d'une tâche de fond (ETL, imports) lancée depuis l'API d'administration"""
+    __tablename__ = 'tache'
+    __table_args__ = (
+        # Recherche des tâches en attente ou en cours (réclamation, chevauchements)
+        Index('ix_tache_statut', 'statut', 'tache_id'),
+    )
+
+    tache_id = Column(Integer, primary_key=True, autoincrement=True)
+    type = Column(String(30), nullable=False)
+    statut = Column(String(20), nullable=False, server_default='queued')  # queued, running, succeeded, failed
+
+    # Avancement : étape courante, lignes traitées et historique des étapes
+    etape = Column(String(100))
+    lignes = Column(BigInteger, nullable=False, server_default='0')
+    etapes = Column(JSON, nullable=False, server_default='[]')
+    journal = Column(Text)  # dernières lignes de sortie du script
+    erreur = Column(Text)
+
+    pid = Column(Integer)  # processus de l'API qui exécute la tâche
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    finished_at = Column(DateTime)
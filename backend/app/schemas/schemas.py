@@ -1,5 +1,5 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, create_model
+from typing import Any, Dict, Optional, List
 from datetime import date, datetime
 
 # ----------- d_location -----------#
@@ -13,6 +13,10 @@ class DLocationRead(DLocationBase):
     location_id: int
     model_config = ConfigDict(from_attributes=True)
 
+class ResultatRecherchePays(DLocationRead):
+    score: float
+    match: str
+
 # ----------- f_covid -----------#
 class FCovidBase(BaseModel):
     date: date
@@ -33,18 +37,182 @@ class FCovidRead(FCovidBase):
     covid_fact_id: int
     model_config = ConfigDict(from_attributes=True)
 
+class FCovidDernieresValeurs(FCovidBase):
+    location_name: str
+
+
+def modele_projection(modele, nom: str):
+    """Variante d'un schéma de lecture dont tous les champs sont facultatifs
+
+    Décrit les lignes des listes projetées par `fields=` : seuls les champs
+    demandés sont présents (tous par défaut).
+    """
+    return create_model(
+        nom,
+        __doc__=f"{modele.__name__} réduit aux champs demandés par fields= (tous par défaut)",
+        **{champ: (Optional[info.annotation], None) for champ, info in modele.model_fields.items()}
+    )
+
+FCovidProjection = modele_projection(FCovidRead, "FCovidProjection")
+
 
 # ----------- f_mpox -----------#
 class FMpoxBase(BaseModel):
     date: date
     location_id: int
-    cases: Optional[float]
+    total_cases: Optional[float] = None
+    total_deaths: Optional[float] = None
+    new_cases: Optional[float] = None
+    new_deaths: Optional[float] = None
+    new_cases_smoothed: Optional[float] = None
+    new_deaths_smoothed: Optional[float] = None
+    new_cases_per_million: Optional[float] = None
+    total_cases_per_million: Optional[float] = None
+    new_cases_smoothed_per_million: Optional[float] = None
+    new_deaths_per_million: Optional[float] = None
+    total_deaths_per_million: Optional[float] = None
+    new_deaths_smoothed_per_million: Optional[float] = None
 
 class FMpoxCreate(FMpoxBase):
     pass
 
 class FMpoxRead(FMpoxBase):
     mpox_fact_id: int
+    model_config = ConfigDict(from_attributes=True)
+
+class FMpoxDernieresValeurs(FMpoxBase):
+    location_name: str
+
+FMpoxProjection = modele_projection(FMpoxRead, "FMpoxProjection")
+
+
+# ----------- agrégations temporelles -----------#
+class AgregationRead(BaseModel):
+    date: date
+    location_id: int
+    location_name: str
+    value: Optional[float] = None
+    metric: str
+
+
+class AnalytiqueRead(BaseModel):
+    date: date
+    location_id: int
+    metric: str
+    value: Optional[float] = None
+    moving_average: Optional[float] = None
+    growth_rate: Optional[float] = None
+    doubling_time: Optional[float] = None
+
 
-    class Config:
-        orm_mode = True
+class ClassementRead(BaseModel):
+    rank: int
+    location_id: int
+    location_name: str
+    date: date
+    value: float
+
+
+# ----------- comparaison COVID / Mpox -----------#
+class SerieComparaison(BaseModel):
+    location_id: int
+    location_name: str
+    dates: List[date]
+    covid: List[Optional[float]]
+    mpox: List[Optional[float]]
+
+class ComparaisonRead(BaseModel):
+    metric: str
+    bucket: str
+    agg: str
+    series: List[SerieComparaison]
+
+
+# ----------- requêtes groupées -----------#
+class FiltresLot(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    location_id: Optional[int] = None
+    location_ids: Optional[List[int]] = None
+    location_names: Optional[List[str]] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+class ParametresLot(FiltresLot):
+    metric: Optional[str] = None
+    bucket: Optional[str] = None
+    agg: Optional[str] = None
+    window: Optional[int] = None
+    n: Optional[int] = Field(None, ge=1, le=1000)
+    skip: Optional[int] = Field(None, ge=0)
+    limit: Optional[int] = Field(None, ge=1)
+    fields: Optional[List[str]] = None
+    log_safe: Optional[bool] = None
+
+class SousRequeteLot(BaseModel):
+    op: str
+    params: ParametresLot = ParametresLot()
+
+class RequeteLot(BaseModel):
+    filters: FiltresLot = FiltresLot()
+    queries: Dict[str, SousRequeteLot]
+
+class ResultatSousRequete(BaseModel):
+    status: int
+    data: Optional[Any] = None
+    detail: Optional[str] = None
+
+class ResultatLot(BaseModel):
+    duration_s: float
+    results: Dict[str, ResultatSousRequete]
+
+
+# ----------- imports en masse -----------#
+class ErreurLigne(BaseModel):
+    index: int
+    detail: str
+
+class ResultatImportMasse(BaseModel):
+    inserted: int
+    updated: int = 0
+    ids: List[int]
+    errors: List[ErreurLigne]
+
+class ErreurIngestion(BaseModel):
+    line: int
+    detail: str
+
+class ResultatIngestion(BaseModel):
+    table: str
+    rows_received: int
+    rows_rejected: int
+    rows_merged: int
+    locations_created: int
+    duration_s: float
+    rows_per_second: Optional[float] = None
+    errors: List[ErreurIngestion]
+
+# ----------- tâches de fond -----------#
+class TacheCreate(BaseModel):
+    type: str = Field(..., description="etl, import_covid, import_mpox ou actualisation (les trois à la suite)")
+
+class EtapeTache(BaseModel):
+    stage: str
+    rows: Optional[int] = None
+    started_at: str
+
+class TacheRead(BaseModel):
+    tache_id: int
+    type: str
+    statut: str
+    etape: Optional[str] = None
+    lignes: int
+    etapes: List[EtapeTache]
+    journal: Optional[str] = None
+    erreur: Optional[str] = None
+    pid: Optional[int] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
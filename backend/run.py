@@ -14,7 +14,7 @@ if __name__ == "__main__":
     
     if command == "etl":
         import etl_script
-        etl_script.main()
+        sys.exit(0 if etl_script.main() else 1)
     elif command == "dashboard":
         import dashboard
         dashboard.app.run(debug=False, host='127.0.0.1', port=8050, use_reloader=False)
@@ -23,10 +23,10 @@ if __name__ == "__main__":
         start_analysis.main()
     elif command == "importCovid":
         import import_db
-        import_db.insert_f_covid()
+        sys.exit(0 if import_db.insert_f_covid() else 1)
     elif command == "importMpox":
         import import_db
-        import_db.insert_f_mpox()
+        sys.exit(0 if import_db.insert_f_mpox() else 1)
     else:
         print("Commande non reconnue. Utilisez 'etl', 'dashboard', 'analysis', 'importCovid' ou 'importMpox'.")
         sys.exit(1)
\ No newline at end of file
@@ -1,4 +1,5 @@
-import uvicorn
+import argparse
+import os
 import sys
 import asyncio
 from pathlib import Path
@@ -7,38 +8,121 @@ import time
 # Ajouter le répertoire parent au PYTHONPATH pour permettre les imports
 sys.path.append(str(Path(__file__).parent.parent))
 
-from backend.app.init_db import init_db
+import uvicorn
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # gunicorn est optionnel : sans lui, les workers sont lancés par uvicorn (sans préchargement)
+    BaseApplication = None
+
+# Délai laissé aux requêtes en cours à l'arrêt (SIGTERM) avant de couper les connexions (secondes)
+API_GRACEFUL_TIMEOUT_S = int(os.getenv("API_GRACEFUL_TIMEOUT_S", "30"))
 
 async def setup():
     """Initialiser la base de données"""
+    from backend.app.init_db import init_db
     print("🔧 Initialisation de la base de données...")
     await init_db()
     print("✅ Base de données initialisée avec succès.")
 
+async def setup_production():
+    """Créer le schéma seulement s'il a changé depuis la dernière initialisation"""
+    from backend.app.core.database import engine
+    from backend.app.init_db import init_db_si_necessaire
+    debut = time.perf_counter()
+    cree = await init_db_si_necessaire()
+    await engine.dispose()  # aucune connexion ouverte ne doit être héritée par les workers
+    etat = "schéma créé ou mis à jour" if cree else "schéma inchangé (empreinte identique), création ignorée"
+    print(f"🔧 Base de données : {etat} ({time.perf_counter() - debut:.2f} s)")
+
+
+if BaseApplication is not None:
+    class ApplicationGunicorn(BaseApplication):
+        """gunicorn piloté depuis Python : application préchargée puis workers uvicorn forkés"""
+
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for cle, valeur in self.options.items():
+                self.cfg.set(cle, valeur)
+
+        def load(self):
+            from backend.app.main import app
+            return app
+
+
+def lancer_production(host: str, port: int, workers: int, access_log: bool):
+    """Servir l'API avec plusieurs workers, sans rechargement automatique"""
+    # Profil de connexion de production, sauf s'il est choisi explicitement
+    os.environ.setdefault("DB_PROFILE", "prod")
+    asyncio.run(setup_production())
+
+    print(f"⏳ Démarrage de {workers} worker(s) sur http://{host}:{port} ...")
+    if BaseApplication is not None:
+        # L'application est importée une seule fois dans le processus maître puis
+        # partagée par fork : chaque worker n'a plus qu'à préchauffer son pool et ses caches
+        ApplicationGunicorn({
+            "bind": f"{host}:{port}",
+            "workers": workers,
+            "worker_class": "uvicorn.workers.UvicornWorker",
+            "preload_app": True,
+            "graceful_timeout": API_GRACEFUL_TIMEOUT_S,
+            "accesslog": "-" if access_log else None,
+        }).run()
+    else:
+        print("ℹ️  gunicorn n'est pas installé : workers lancés par uvicorn, sans préchargement")
+        uvicorn.run(
+            "backend.app.main:app",
+            host=host,
+            port=port,
+            workers=workers,
+            access_log=access_log,
+            timeout_graceful_shutdown=API_GRACEFUL_TIMEOUT_S,
+            log_level="info"
+        )
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lancer l'API COVID-19 & Mpox")
+    parser.add_argument("--prod", action="store_true", default=os.getenv("API_MODE") == "prod",
+                        help="mode production : plusieurs workers, sans rechargement (API_MODE=prod)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", os.cpu_count() or 1)),
+                        help="nombre de workers en mode production (API_WORKERS, par défaut un par cœur)")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument("--access-log", action="store_true", default=os.getenv("API_ACCESS_LOG") == "true",
+                        help="journaliser chaque requête en mode production (API_ACCESS_LOG=true)")
+    args = parser.parse_args()
+
+    if args.prod:
+        lancer_production(args.host, args.port, args.workers, args.access_log)
+        sys.exit(0)
+
     # Afficher un message de bienvenue
     print("""
     🚀 Démarrage de l'API COVID-19 & Mpox
     ====================================
-    
+
     Projet MSPR Data Science - EPSI
     """)
-    
+
     # Exécuter l'initialisation de la base de données
     asyncio.run(setup())
-    
+
     print("\n📌 Informations importantes :")
-    print("  • URL de l'API : http://localhost:8000")
-    print("  • Documentation : http://localhost:8000/docs")
-    print("  • Endpoints API : http://localhost:8000/api/...")
+    print(f"  • URL de l'API : http://localhost:{args.port}")
+    print(f"  • Documentation : http://localhost:{args.port}/docs")
+    print(f"  • Endpoints API : http://localhost:{args.port}/api/...")
     print("\n⏳ Démarrage du serveur...")
     time.sleep(1)  # Petite pause pour laisser le temps de lire
-    
+
     # Démarrer l'API
     uvicorn.run(
         "backend.app.main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=args.host,
+        port=args.port,
         reload=True,
         log_level="info"
-    ) 
\ No newline at end of file
+    )
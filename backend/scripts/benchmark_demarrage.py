@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Mesurer le temps de démarrage et le débit de l'API en mode production.
+
+Pour chaque nombre de workers, l'API est lancée par `run_api.py --prod` :
+- démarrage : délai entre le lancement et la première réponse de GET /sante
+  (schéma vérifié, application chargée, pool et caches préchauffés)
+- débit : requêtes GET par seconde, cumulées sur `clients` processus clients
+  pendant `duree` secondes (liste, agrégation, dernières valeurs, pays)
+- arrêt : délai entre SIGTERM et la fin du processus
+
+Usage : python backend/scripts/benchmark_demarrage.py [workers,...] [duree] [clients]
+"""
+
+import multiprocessing
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+RACINE = Path(__file__).resolve().parents[2]
+PORT = 8765
+URL = f"http://127.0.0.1:{PORT}"
+CHEMINS = [
+    "/api/covid/?limit=100",
+    "/api/covid/agregation?metric=new_cases&bucket=month",
+    "/api/covid/latest",
+    "/api/mpox/?limit=100",
+    "/api/pays/",
+]
+
+
+def attendre_pret(processus: subprocess.Popen, delai: float = 120) -> float:
+    debut = time.perf_counter()
+    while time.perf_counter() - debut < delai:
+        if processus.poll() is not None:
+            raise RuntimeError("L'API s'est arrêtée pendant le démarrage")
+        try:
+            if requests.get(f"{URL}/sante", timeout=1).status_code == 200:
+                return time.perf_counter() - debut
+        except requests.RequestException:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError(f"L'API n'a pas répondu en {delai:g} s")
+
+
+def client(duree: float) -> int:
+    session = requests.Session()
+    fin = time.perf_counter() + duree
+    reponses = 0
+    while time.perf_counter() < fin:
+        for chemin in CHEMINS:
+            session.get(URL + chemin).raise_for_status()
+            reponses += 1
+    return reponses
+
+
+def mesurer(workers: int, duree: float, clients: int):
+    processus = subprocess.Popen(
+        [sys.executable, str(RACINE / "backend" / "run_api.py"), "--prod", "--workers", str(workers), "--port", str(PORT)],
+        cwd=RACINE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        demarrage = attendre_pret(processus)
+        time.sleep(1)  # laisser les autres workers terminer leur préchauffage
+        debut = time.perf_counter()
+        with multiprocessing.Pool(clients) as pool:
+            reponses = sum(pool.map(client, [duree] * clients))
+        debit = reponses / (time.perf_counter() - debut)
+    finally:
+        debut_arret = time.perf_counter()
+        processus.send_signal(signal.SIGTERM)
+        processus.wait()
+        arret = time.perf_counter() - debut_arret
+    return demarrage, debit, arret
+
+
+def main(liste_workers, duree: float, clients: int):
+    print(f"=== Mode production : {clients} clients pendant {duree:g} s par mesure ===")
+    print(f"{'workers':>8} {'démarrage (s)':>14} {'requêtes/s':>11} {'arrêt (s)':>10}")
+    for workers in liste_workers:
+        demarrage, debit, arret = mesurer(workers, duree, clients)
+        print(f"{workers:>8} {demarrage:>14.2f} {debit:>11.0f} {arret:>10.2f}")
+
+
+if __name__ == "__main__":
+    liste_workers = [int(n) for n in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1, 2, 4]
+    duree = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    clients = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    main(liste_workers, duree, clients)
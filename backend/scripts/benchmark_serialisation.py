@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Comparer le débit de /api/covid/ entre le chemin ORM + Pydantic et le chemin rapide.
+
+Chaque itération exécute la lecture et la sérialisation JSON complètes
+d'une page de `limit` lignes, avec le cache de requêtes désactivé :
+- ORM : entités FCovid, validation List[FCovidRead] puis encodage JSON (comme FastAPI)
+- rapide : tuples de colonnes encodés par le schéma de lecture précompilé
+
+Usage : python backend/scripts/benchmark_serialisation.py [limit] [iterations]
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+# Ajouter la racine du projet au PYTHONPATH pour permettre les imports
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from pydantic import TypeAdapter
+
+from backend.app.core.database import SessionLocal, engine
+from backend.app.core.query_cache import definir_backend
+from backend.app.core.serialisation import orjson
+from backend.app.crud.covid import LECTURE_COVID, liste_donnees_covid, liste_lignes_covid
+from backend.app.schemas.schemas import FCovidRead
+
+ADAPTATEUR = TypeAdapter(List[FCovidRead])
+
+
+async def chemin_orm(db, limit: int) -> bytes:
+    entites = await liste_donnees_covid(db, limit=limit)
+    valides = ADAPTATEUR.validate_python(entites, from_attributes=True)
+    contenu = ADAPTATEUR.dump_python(valides, mode="json")
+    return json.dumps(contenu, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+async def chemin_rapide(db, limit: int) -> bytes:
+    return LECTURE_COVID.encoder(await liste_lignes_covid(db, limit=limit))
+
+
+async def mesurer(chemin, limit: int, iterations: int):
+    async with SessionLocal() as db:
+        corps = await chemin(db, limit)  # échauffement (connexion, cache de requêtes préparées)
+        debut = time.perf_counter()
+        for _ in range(iterations):
+            await chemin(db, limit)
+        duree = time.perf_counter() - debut
+    return corps, duree / iterations
+
+
+async def main(limit: int, iterations: int):
+    definir_backend(None)
+    engine.echo = False
+    corps_orm, duree_orm = await mesurer(chemin_orm, limit, iterations)
+    corps_rapide, duree_rapide = await mesurer(chemin_rapide, limit, iterations)
+
+    lignes = len(json.loads(corps_rapide))
+    print(f"=== /api/covid/ : {lignes} lignes par page, {iterations} itérations ===")
+    print(f"Encodeur JSON rapide : {'orjson' if orjson is not None else 'json (orjson non installé)'}")
+    print(f"ORM + Pydantic : {duree_orm * 1000:8.1f} ms/page  {lignes / duree_orm:10.0f} lignes/s")
+    print(f"Chemin rapide  : {duree_rapide * 1000:8.1f} ms/page  {lignes / duree_rapide:10.0f} lignes/s")
+    print(f"Accélération   : x{duree_orm / duree_rapide:.1f}")
+    if json.loads(corps_orm) != json.loads(corps_rapide):
+        print("⚠️  Les deux chemins ne produisent pas le même contenu JSON")
+        sys.exit(1)
+    print("✅ Contenu JSON identique")
+
+
+if __name__ == "__main__":
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    asyncio.run(main(limit, iterations))
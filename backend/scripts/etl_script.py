@@ -8,6 +8,11 @@ import requests
 from io import StringIO
 import kagglehub
 
+try:
+    from progression import signaler
+except ImportError:
+    from scripts.progression import signaler
+
 # Création du répertoire pour stocker les données
 if not os.path.exists('data'):
     os.makedirs('data')
@@ -241,26 +246,35 @@ def generate_visualizations(covid_df, mpox_df):
     print("Visualisations enregistrées dans data/covid_mpox_visualizations.png")
 
 def main():
+    """Extraire, nettoyer et enregistrer les deux jeux de données ; retourne False si aucun n'a pu être produit"""
     print("Début du processus ETL pour COVID-19 et mpox...")
     
     # Extraction et transformation des données
+    signaler("extraction covid")
     covid_df = load_and_clean_covid_data()
+    signaler("extraction covid", len(covid_df) if covid_df is not None else None)
+    signaler("extraction mpox")
     mpox_df = load_and_clean_mpox_data()
+    signaler("extraction mpox", len(mpox_df) if mpox_df is not None else None)
     
     # Sauvegarde des données transformées
     if covid_df is not None:
         covid_df.to_csv('data/covid_processed.csv', index=False)
+        signaler("sauvegarde covid_processed.csv", len(covid_df))
         print("Données COVID-19 transformées enregistrées dans data/covid_processed.csv")
     
     if mpox_df is not None:
         mpox_df.to_csv('data/mpox_processed.csv', index=False)
+        signaler("sauvegarde mpox_processed.csv", len(mpox_df))
         print("Données mpox transformées enregistrées dans data/mpox_processed.csv")
     
     # Génération des visualisations
     if covid_df is not None or mpox_df is not None:
+        signaler("visualisations")
         generate_visualizations(covid_df, mpox_df)
     
     print("Processus ETL terminé.")
+    return covid_df is not None or mpox_df is not None
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -6,9 +6,17 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
 from dotenv import load_dotenv
 
+try:
+    from progression import signaler
+except ImportError:
+    from scripts.progression import signaler
+
 # Charger les variables d'environnement
 load_dotenv()
 
+# Lignes écrites par instruction lors de l'import d'une table de faits
+TAILLE_LOT_IMPORT = int(os.getenv("IMPORT_CHUNK_ROWS", "50000"))
+
 def get_sync_db():
     DATABASE_URL = os.getenv("DATABASE_URL")
     if not DATABASE_URL:
@@ -19,9 +27,74 @@ def get_sync_db():
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     return SessionLocal()
 
+def marquer_version_donnees(variable="DATASET_VERSION_FILE", fichier='.version'):
+    """Faire avancer un fichier témoin de version lu par les caches de l'API"""
+    dossier = os.path.dirname(os.getenv(
+        "DATASET_VERSION_FILE",
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', '.version')
+    ))
+    version_path = os.getenv(variable, os.path.join(dossier, fichier))
+    os.makedirs(os.path.dirname(version_path), exist_ok=True)
+    with open(version_path, 'a'):
+        os.utime(version_path, None)
+    if variable == "DATASET_VERSION_FILE":
+        avancer_version_partagee()
+
+def avancer_version_partagee():
+    """Avancer le compteur de version du cache de requêtes Redis, partagé entre les hôtes de l'API"""
+    if os.getenv("QUERY_CACHE_BACKEND", "sqlite") != "redis":
+        return
+    try:
+        import redis
+        redis.from_url(os.getenv("QUERY_CACHE_URL") or "redis://localhost:6379/0").incr("qc:version")
+    except Exception as e:
+        print(f"⚠️ Impossible d'avancer la version du cache Redis : {e}")
+
+def creer_index_cle_naturelle(db, table):
+    """Recréer l'index unique (location_id, date) utilisé par les upserts de l'API
+
+    Il couvre les métriques principales : les lectures avec projection
+    fields= sont servies par un parcours d'index seul.
+    """
+    db.execute(text(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{table}_location_date ON {table} (location_id, date) "
+        f"INCLUDE (total_cases, new_cases, total_deaths, new_deaths)"
+    ))
+
+def restaurer_cle_primaire(db, table, colonne):
+    """Rétablir la clé primaire auto-incrémentée que pandas ne crée pas"""
+    db.execute(text(f"ALTER TABLE {table} ALTER COLUMN {colonne} SET NOT NULL"))
+    db.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY ({colonne})"))
+    db.execute(text(f"ALTER TABLE {table} ALTER COLUMN {colonne} ADD GENERATED BY DEFAULT AS IDENTITY"))
+    db.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{table}', '{colonne}'), COALESCE(MAX({colonne}), 0) + 1, false) "
+        f"FROM {table}"
+    ))
+
+def aligner_schema_faits(db, table, cle_primaire):
+    """Rendre une table de faits créée par pandas conforme au modèle SQLAlchemy de l'API"""
+    restaurer_cle_primaire(db, table, cle_primaire)
+    db.execute(text(f"ALTER TABLE {table} ALTER COLUMN date TYPE date"))
+    db.execute(text(
+        f"ALTER TABLE {table} "
+        f"ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT now(), "
+        f"ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT now()"
+    ))
+    creer_index_cle_naturelle(db, table)
+
+def importer_faits(df, table, index_label, db):
+    """Écrire une table de faits par lots, en signalant les lignes écrites"""
+    for debut in range(0, max(len(df), 1), TAILLE_LOT_IMPORT):
+        lot = df.iloc[debut:debut + TAILLE_LOT_IMPORT]
+        lot.to_sql(table, db.bind, if_exists='replace' if debut == 0 else 'append', index=True, index_label=index_label)
+        signaler(f"import {table}", debut + len(lot))
+
 def insert_f_covid():
+    """Importer covid_processed.csv (d_location et f_covid) ; retourne False en cas d'erreur"""
     data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'covid_processed.csv')
+    signaler("lecture covid_processed.csv")
     df = pd.read_csv(data_path)
+    signaler("lecture covid_processed.csv", len(df))
 
     df['date'] = pd.to_datetime(df['date'])
 
@@ -34,6 +107,12 @@ def insert_f_covid():
         print("Import de la table d_location...")
         locations_df = pd.DataFrame({'location_name': df['location'].unique()})
         locations_df.to_sql('d_location', db.bind, if_exists='fail', index=True, index_label='location_id')
+        signaler("import d_location", len(locations_df))
+        restaurer_cle_primaire(db, 'd_location', 'location_id')
+        db.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_d_location_name ON d_location (location_name)"))
+        db.commit()
+        # Les identifiants de pays ont pu changer : recharger la dimension en mémoire de l'API
+        marquer_version_donnees("LOCATION_VERSION_FILE", '.version_pays')
 
         location_mapping = pd.read_sql('SELECT location_id, location_name FROM d_location', db.bind)
 
@@ -53,18 +132,28 @@ def insert_f_covid():
         ]]
 
         print("Import de la table f_covid...")
-        f_covid.to_sql('f_covid', db.bind, if_exists='replace', index=True, index_label='covid_fact_id')
+        importer_faits(f_covid, 'f_covid', 'covid_fact_id', db)
+        signaler("index f_covid", len(f_covid))
+        aligner_schema_faits(db, 'f_covid', 'covid_fact_id')
         db.commit()
+        # Tables recréées : chaque worker de l'API renouvelle ses connexions
+        marquer_version_donnees("SCHEMA_VERSION_FILE", '.version_schema')
+        marquer_version_donnees()
         print("✅ Import COVID terminé.")
+        return True
     except Exception as e:
         print(f"❌ Erreur lors de l'import COVID : {e}")
         db.rollback()
+        return False
     finally:
         db.close()
 
 def insert_f_mpox():
+    """Importer mpox_processed.csv dans f_mpox ; retourne False en cas d'erreur"""
     data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'mpox_processed.csv')
+    signaler("lecture mpox_processed.csv")
     df = pd.read_csv(data_path)
+    signaler("lecture mpox_processed.csv", len(df))
 
     df['date'] = pd.to_datetime(df['date'])
 
@@ -96,12 +185,18 @@ def insert_f_mpox():
         ]]
 
         print("Import de la table f_mpox...")
-        f_mpox.to_sql('f_mpox', db.bind, if_exists='replace', index=True, index_label='mpox_fact_id')
+        importer_faits(f_mpox, 'f_mpox', 'mpox_fact_id', db)
+        signaler("index f_mpox", len(f_mpox))
+        aligner_schema_faits(db, 'f_mpox', 'mpox_fact_id')
         db.commit()
+        marquer_version_donnees("SCHEMA_VERSION_FILE", '.version_schema')
+        marquer_version_donnees()
         print("✅ Import Mpox terminé.")
+        return True
     except Exception as e:
         print(f"❌ Erreur lors de l'import Mpox : {e}")
         db.rollback()
+        return False
     finally:
         db.close()
 
@@ -0,0 +1,15 @@
+import json
+import os
+
+# Préfixe des lignes d'avancement lues par le gestionnaire de tâches de l'API
+PREFIXE_PROGRESSION = "[progression] "
+
+
+def signaler(etape, lignes=None):
+    """Signaler l'étape en cours et le nombre de lignes traitées
+
+    Sans effet en ligne de commande : la ligne n'est écrite que lorsque le
+    script est lancé par l'API (variable JOB_PROGRESS définie).
+    """
+    if os.getenv("JOB_PROGRESS"):
+        print(PREFIXE_PROGRESSION + json.dumps({"stage": etape, "rows": lignes}), flush=True)
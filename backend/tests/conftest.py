@@ -0,0 +1,77 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+# Engine créé à l'import de l'application : les tests sur base utilisent leur propre engine
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://test@localhost/test")
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+# Base PostgreSQL au schéma de l'application (ex. une copie de la base de développement) ;
+# les tests qui en ont besoin sont ignorés si elle n'est pas fournie
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+class BaseTest:
+    """Application réelle branchée sur TEST_DATABASE_URL, caches isolés dans un dossier temporaire"""
+
+    def __init__(self, client, sessions: async_sessionmaker):
+        self.client = client
+        self.sessions = sessions
+
+    def executer(self, sql: str, **parametres):
+        """Exécuter une instruction SQL et valider ; retourne les lignes d'un SELECT ou d'un RETURNING"""
+        async def executer():
+            async with self.sessions() as db:
+                result = await db.execute(text(sql), parametres)
+                lignes = result.all() if result.returns_rows else []
+                await db.commit()
+                return lignes
+
+        return asyncio.run(executer())
+
+
+@pytest.fixture
+def base(monkeypatch, tmp_path):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL non définie")
+
+    from fastapi.testclient import TestClient
+
+    from backend.app.api import lot
+    from backend.app.core import cache, cache_pays, query_cache
+    from backend.app.core.database import get_db
+    from backend.app.core.routage import get_db_lecture
+    from backend.app.main import app
+
+    # Sans pool : chaque requête du client de test tourne dans sa propre boucle d'événements
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def get_db_test():
+        async with sessions() as session:
+            yield session
+
+    @asynccontextmanager
+    async def session_test():
+        async with sessions() as session:
+            yield session
+
+    monkeypatch.setattr(cache, "DATASET_VERSION_FILE", tmp_path / ".version")
+    # Pas de reconstruction des instantanés en arrière-plan sur l'engine de l'application
+    monkeypatch.setattr(cache, "_abonnes_invalidation", [])
+    monkeypatch.setattr(cache_pays, "LOCATION_VERSION_FILE", tmp_path / ".version_pays")
+    monkeypatch.setattr(cache_pays.cache_pays, "_version", None)
+    monkeypatch.setattr(query_cache, "_backend", None)
+    monkeypatch.setattr(query_cache, "_backend_initialise", True)
+    monkeypatch.setattr(lot, "session_lecture", session_test)
+    monkeypatch.setitem(app.dependency_overrides, get_db, get_db_test)
+    monkeypatch.setitem(app.dependency_overrides, get_db_lecture, get_db_test)
+    # Les réponses mises en cache par un test précédent ne sont plus servies
+    cache.marquer_donnees_modifiees()
+
+    yield BaseTest(TestClient(app), sessions)
+    asyncio.run(engine.dispose())
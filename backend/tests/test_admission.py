@@ -0,0 +1,111 @@
+import asyncio
+import json
+import os
+
+# Engine créé à l'import des modules CRUD : aucune connexion n'est ouverte par ces tests
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://test@localhost/test")
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from backend.app.core import admission
+from backend.app.core.admission import AdmissionMiddleware, ClasseAdmission, classe_lot, classe_requete
+
+
+@pytest.fixture(autouse=True)
+def dimension(monkeypatch):
+    """Dimension de 200 pays, seuil lourd à 5000 lignes"""
+    monkeypatch.setattr(admission.cache_pays, "_pays", [None] * 200)
+    monkeypatch.setattr(admission, "ADMISSION_HEAVY_ROWS", 5000)
+
+
+@pytest.mark.parametrize("methode, chemin, query_string, attendu", [
+    ("GET", "/api/pays/", "", "light"),
+    ("GET", "/api/covid/latest", "", "light"),
+    ("GET", "/api/covid/42", "", "light"),
+    ("GET", "/api/covid/", "", "standard"),
+    ("GET", "/api/covid/", "limit=100000", "heavy"),
+    ("GET", "/api/covid/", "limit=100000&location_id=0", "standard"),
+    ("GET", "/api/covid/agregation", "", "heavy"),
+    ("GET", "/api/covid/agregation", "location_ids=1&location_ids=2&start_date=2022-01-01&end_date=2022-12-31", "standard"),
+    ("POST", "/api/covid/bulk", "", "heavy"),
+    ("PATCH", "/api/mpox/bulk", "", "heavy"),
+    ("POST", "/api/covid/", "", "standard"),
+    ("POST", "/api/lot/", "", "heavy"),
+])
+def test_classe_requete(methode, chemin, query_string, attendu):
+    assert classe_requete(methode, chemin, query_string) == attendu
+
+
+def lot(filtres, **requetes):
+    return json.dumps({"filters": filtres, "queries": requetes}).encode()
+
+
+def test_classe_lot():
+    assert classe_lot(lot({}, a={"op": "covid.latest"}, b={"op": "covid.top"})) == "light"
+    assert classe_lot(lot({"location_id": 3}, a={"op": "covid.agregation"}, b={"op": "covid.latest"})) == "standard"
+    assert classe_lot(lot({}, a={"op": "covid.agregation"})) == "heavy"
+    # Sous-requêtes standard dont les lignes cumulées dépassent le seuil
+    trois_pays = {"location_ids": [1, 2, 3]}
+    assert classe_lot(lot(trois_pays, a={"op": "covid.agregation"})) == "standard"
+    assert classe_lot(lot(trois_pays, a={"op": "covid.agregation"}, b={"op": "mpox.agregation"})) == "heavy"
+    # Corps invalide : refusé ensuite par la validation
+    assert classe_lot(b"{") == "standard"
+
+
+def creer_application(classes):
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, prefix="/api", classes=classes)
+    liberation = asyncio.Event()
+
+    @app.get("/api/covid/latest")
+    async def bloquante():
+        await liberation.wait()
+        return {}
+
+    @app.post("/api/lot/")
+    async def lot_endpoint(request: Request):
+        return await request.json()
+
+    return app, liberation
+
+
+def test_corps_du_lot_rejoue_apres_classement():
+    classes = {nom: ClasseAdmission(nom, 1, 0) for nom in ("light", "standard", "heavy")}
+    app, _ = creer_application(classes)
+    corps = lot({}, a={"op": "covid.latest"})
+    reponse = TestClient(app).post("/api/lot/", content=corps)
+    assert reponse.status_code == 200
+    assert reponse.json() == json.loads(corps)
+    assert classes["light"].admises == 1
+
+
+def test_file_pleine_refusee_avec_retry_after():
+    classes = {nom: ClasseAdmission(nom, 1, 0) for nom in ("light", "standard", "heavy")}
+    app, liberation = creer_application(classes)
+    messages = []
+
+    async def requete():
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/api/covid/latest", "query_string": b"", "headers": []}
+        await app(scope, receive, send)
+
+    async def scenario():
+        premiere = asyncio.create_task(requete())
+        while classes["light"].en_cours == 0:
+            await asyncio.sleep(0.01)
+        await requete()
+        liberation.set()
+        await premiere
+
+    asyncio.run(scenario())
+    statuts = [message["status"] for message in messages if message["type"] == "http.response.start"]
+    assert statuts == [503, 200]
+    assert (b"retry-after", b"1") in messages[0]["headers"]
+    assert classes["light"].refusees == 1
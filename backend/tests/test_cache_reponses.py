@@ -0,0 +1,72 @@
+import os
+
+# Engine créé à l'import de l'application : aucune connexion n'est ouverte par ces tests
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://test@localhost/test")
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app.api.endpoints import lot
+from backend.app.core import cache
+from backend.app.core.cache import ResponseCacheMiddleware, modifie_donnees
+
+
+def creer_application():
+    """Application minimale : le vrai endpoint de lot, une lecture et une écriture factices"""
+    app = FastAPI()
+    app.add_middleware(ResponseCacheMiddleware, prefix="/api")
+    covid = APIRouter()
+
+    @covid.get("/")
+    async def lecture():
+        return {"lignes": []}
+
+    @covid.post("/")
+    @modifie_donnees
+    async def ecriture():
+        return {"ok": True}
+
+    app.include_router(lot.router, prefix="/api/lot")
+    app.include_router(covid, prefix="/api/covid")
+    return app
+
+
+def preparer(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, "DATASET_VERSION_FILE", tmp_path / ".version")
+    # Pas de reconstruction des instantanés en arrière-plan : la base n'est pas joignable
+    monkeypatch.setattr(cache, "_abonnes_invalidation", [])
+
+    async def executer_lot(requete):
+        return {"results": {nom: {"status": 200, "data": []} for nom in requete.queries}}
+
+    monkeypatch.setattr(lot, "executer_lot", executer_lot)
+    return TestClient(creer_application())
+
+
+def test_lot_ne_modifie_pas_la_version(monkeypatch, tmp_path):
+    client = preparer(monkeypatch, tmp_path)
+    assert client.get("/api/covid/").headers["x-cache"] == "MISS"
+    assert client.get("/api/covid/").headers["x-cache"] == "HIT"
+    version = cache.version_donnees()
+
+    reponse = client.post("/api/lot/", json={"queries": {"serie": {"op": "covid.latest"}}})
+    assert reponse.status_code == 200
+    assert cache.version_donnees() == version
+    assert client.get("/api/covid/").headers["x-cache"] == "HIT"
+
+
+def test_ecriture_marquee_invalide_le_cache(monkeypatch, tmp_path):
+    client = preparer(monkeypatch, tmp_path)
+    client.get("/api/covid/")
+    version = cache.version_donnees()
+
+    assert client.post("/api/covid/").status_code == 200
+    assert cache.version_donnees() != version
+    assert client.get("/api/covid/").headers["x-cache"] == "MISS"
+
+
+def test_if_none_match_etoile_exige_une_entree(monkeypatch, tmp_path):
+    client = preparer(monkeypatch, tmp_path)
+    assert client.get("/api/covid/", headers={"If-None-Match": "*"}).status_code == 200
+    assert client.get("/api/covid/", headers={"If-None-Match": "*"}).status_code == 304
+    assert client.get("/api/inconnue", headers={"If-None-Match": "*"}).status_code == 404
@@ -0,0 +1,55 @@
+import pytest
+
+PERIODE = {"start_date": "2099-01-01", "end_date": "2099-01-31"}
+
+
+@pytest.fixture
+def pays(base):
+    """Faits de test pour le pays d'identifiant 0 (le premier pays chargé par l'ETL) et un autre pays"""
+    cree = not base.executer("SELECT 1 FROM d_location WHERE location_id = 0")
+    if cree:
+        base.executer("INSERT INTO d_location (location_id, location_name) VALUES (0, 'Test pays zéro')")
+    autre = base.executer(
+        "INSERT INTO d_location (location_name) VALUES ('Test autre pays') RETURNING location_id"
+    )[0][0]
+    for table in ("f_covid", "f_mpox"):
+        base.executer(
+            f"INSERT INTO {table} (location_id, date, new_cases, total_cases) VALUES "
+            "(0, '2099-01-01', 1, 10), (:autre, '2099-01-01', 100, 1000)",
+            autre=autre
+        )
+    yield autre
+    for table in ("f_covid", "f_mpox"):
+        base.executer(f"DELETE FROM {table} WHERE location_id IN (0, :autre) AND date >= '2099-01-01'", autre=autre)
+    base.executer("DELETE FROM d_location WHERE location_id = :autre", autre=autre)
+    if cree:
+        base.executer("DELETE FROM d_location WHERE location_id = 0")
+
+
+@pytest.mark.parametrize("maladie", ["covid", "mpox"])
+def test_liste_filtree_sur_le_pays_zero(base, pays, maladie):
+    reponse = base.client.get(f"/api/{maladie}/", params={"location_id": 0, **PERIODE})
+    assert reponse.status_code == 200
+    assert [(ligne["location_id"], ligne["new_cases"]) for ligne in reponse.json()] == [(0, 1)]
+
+    # Union avec les autres filtres de pays
+    reponse = base.client.get(f"/api/{maladie}/", params={"location_id": 0, "location_ids": [pays], **PERIODE})
+    assert sorted(ligne["location_id"] for ligne in reponse.json()) == [0, pays]
+
+
+def test_agregation_filtree_sur_le_pays_zero(base, pays):
+    reponse = base.client.get("/api/covid/agregation", params={"location_id": 0, "bucket": "year", **PERIODE})
+    assert reponse.status_code == 200
+    assert [(ligne["location_id"], ligne["value"]) for ligne in reponse.json()] == [(0, 1)]
+
+
+def test_statistiques_filtrees_sur_le_pays_zero(base, pays):
+    reponse = base.client.post("/api/lot/", json={
+        "filters": {"location_id": 0},
+        "queries": {"stats": {"op": "covid.statistiques"}},
+    })
+    assert reponse.status_code == 200
+    resultat = reponse.json()["results"]["stats"]
+    assert resultat["status"] == 200
+    attendu = base.executer("SELECT sum(total_cases) FROM f_covid WHERE location_id = 0")[0][0]
+    assert float(resultat["data"]["total_cases"]) == float(attendu)
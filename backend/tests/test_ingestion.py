@@ -0,0 +1,62 @@
+import asyncio
+import os
+from datetime import date
+
+# Engine créé à l'import des modules CRUD : aucune connexion n'est ouverte par ces tests
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://test@localhost/test")
+
+import pytest
+
+from backend.app.crud import ingestion
+
+CSV = (
+    'location,date,new_cases,commentaire\r\n'
+    '"Korea, South",2022-01-01,5,"sur\nplusieurs ""lignes"""\r\n'
+    '\r\n'
+    'France,2022-01-02,,x\r\n'
+    'France,pas une date,1,y\r\n'
+    'France,2022-01-03,2\r\n'
+    'Italy,2022-01-04,7,z'
+)
+
+
+async def _flux(texte: str, taille: int):
+    donnees = texte.encode("utf-8")
+    for debut in range(0, len(donnees), taille):
+        yield donnees[debut:debut + taille]
+
+
+def lire(texte: str, taille: int = 1000):
+    rapport = ingestion.RapportIngestion()
+
+    async def collecter():
+        lignes = ingestion._lignes_texte(_flux(texte, taille))
+        return [enregistrement async for enregistrement in ingestion._enregistrements(lignes, ["new_cases"], rapport)]
+
+    return asyncio.run(collecter()), rapport
+
+
+@pytest.mark.parametrize("taille", [1, 7, 1000])
+def test_champs_multilignes_quel_que_soit_le_decoupage(taille):
+    enregistrements, rapport = lire(CSV, taille)
+    assert enregistrements == [
+        ("Korea, South", date(2022, 1, 1), 5.0),
+        ("France", date(2022, 1, 2), None),
+        ("Italy", date(2022, 1, 4), 7.0),
+    ]
+    assert rapport.rows_received == 5
+    # Les numéros de ligne comptent les sauts de ligne des champs entre guillemets
+    assert [erreur["line"] for erreur in rapport.errors] == [6, 7]
+
+
+def test_guillemet_non_ferme_rejete_sans_interrompre_le_fichier():
+    enregistrements, rapport = lire('location,date,new_cases\nFrance,2022-01-01,1\nFrance,"2022-01-02,2\n')
+    assert enregistrements == [("France", date(2022, 1, 1), 1.0)]
+    assert rapport.errors == [{"line": 3, "detail": "guillemets mal placés"}]
+
+
+def test_colonnes_obligatoires():
+    with pytest.raises(ValueError):
+        lire("pays,date\nFrance,2022-01-01\n")
+    with pytest.raises(ValueError):
+        lire("")
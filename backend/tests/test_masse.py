@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+JOUR = "2099-01-0{}"
+
+
+@pytest.fixture
+def pays(base):
+    """Pays créé pour le test, supprimé avec ses faits à la fin"""
+    location_id = base.executer(
+        "INSERT INTO d_location (location_name) VALUES ('Test import en masse') RETURNING location_id"
+    )[0][0]
+    yield location_id
+    base.executer("DELETE FROM f_covid WHERE location_id = :id", id=location_id)
+    base.executer("DELETE FROM f_mpox WHERE location_id = :id", id=location_id)
+    base.executer("DELETE FROM d_location WHERE location_id = :id", id=location_id)
+
+
+def lignes_covid(base, location_id):
+    return base.executer(
+        "SELECT date::text, new_cases, total_cases FROM f_covid WHERE location_id = :id ORDER BY date",
+        id=location_id
+    )
+
+
+def test_insertion_dedoublonne_et_signale_les_conflits(base, pays):
+    ligne = lambda jour, cas: {"location_id": pays, "date": JOUR.format(jour), "new_cases": cas}
+
+    reponse = base.client.post("/api/covid/bulk", json=[ligne(1, 1), ligne(1, 2), ligne(2, 3)])
+    assert reponse.status_code == 207
+    resultat = reponse.json()
+    assert resultat["inserted"] == 2
+    assert [erreur["index"] for erreur in resultat["errors"]] == [0]
+    # Doublon dans le corps : la dernière ligne l'emporte
+    assert [(jour, float(cas)) for jour, cas, _ in lignes_covid(base, pays)] == [("2099-01-01", 2), ("2099-01-02", 3)]
+
+    # Une clé déjà en base est signalée sans faire échouer le reste du lot
+    reponse = base.client.post("/api/covid/bulk", json=[ligne(1, 9), ligne(3, 4)])
+    assert reponse.status_code == 207
+    assert reponse.json()["inserted"] == 1
+    assert "existe déjà" in reponse.json()["errors"][0]["detail"]
+    assert float(lignes_covid(base, pays)[0][1]) == 2
+
+    reponse = base.client.post("/api/covid/bulk", json=[ligne(1, 9)])
+    assert reponse.status_code == 422
+    assert reponse.json()["inserted"] == 0
+
+
+def test_insertion_sans_erreur_et_pays_inconnu(base, pays):
+    corps = "\n".join(json.dumps({"location_id": pays, "date": JOUR.format(jour), "new_cases": jour}) for jour in (1, 2))
+    reponse = base.client.post("/api/mpox/bulk", content=corps, headers={"content-type": "application/x-ndjson"})
+    assert reponse.status_code == 201
+    assert reponse.json()["inserted"] == 2 and reponse.json()["errors"] == []
+
+    reponse = base.client.post("/api/covid/bulk", json=[{"location_id": -1, "date": JOUR.format(1)}])
+    assert reponse.status_code == 422
+    assert "n'existe pas" in reponse.json()["errors"][0]["detail"]
+
+
+def test_upsert_cree_ou_remplace(base, pays):
+    base.client.post("/api/covid/bulk", json=[{"location_id": pays, "date": JOUR.format(1), "new_cases": 1, "total_cases": 10}])
+
+    reponse = base.client.put("/api/covid/bulk", json=[
+        {"location_id": pays, "date": JOUR.format(1), "new_cases": 5},
+        {"location_id": pays, "date": JOUR.format(2), "new_cases": 6},
+    ])
+    assert reponse.status_code == 200
+    resultat = reponse.json()
+    assert (resultat["inserted"], resultat["updated"], resultat["errors"]) == (1, 1, [])
+    # Remplacement complet : les champs absents repassent à NULL
+    assert [(jour, float(cas), total) for jour, cas, total in lignes_covid(base, pays)] == [
+        ("2099-01-01", 5, None), ("2099-01-02", 6, None)
+    ]
+
+
+def test_patch_ne_modifie_que_les_champs_fournis(base, pays):
+    base.client.post("/api/covid/bulk", json=[{"location_id": pays, "date": JOUR.format(1), "new_cases": 1, "total_cases": 10}])
+
+    reponse = base.client.patch("/api/covid/bulk", json=[
+        {"location_id": pays, "date": JOUR.format(1), "new_cases": 7},
+        {"location_id": pays, "date": JOUR.format(2), "new_cases": 8},
+    ])
+    assert reponse.status_code == 207
+    resultat = reponse.json()
+    assert resultat["updated"] == 1
+    assert [erreur["index"] for erreur in resultat["errors"]] == [1]
+    assert [(jour, float(cas), float(total)) for jour, cas, total in lignes_covid(base, pays)] == [("2099-01-01", 7, 10)]
+
+    reponse = base.client.patch("/api/covid/bulk", json=[{"location_id": pays, "date": JOUR.format(3), "new_cases": 1}])
+    assert reponse.status_code == 422
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import time
+
+# Engine créé à l'import des modules CRUD : aucune connexion n'est ouverte par ces tests
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://test@localhost/test")
+
+import pytest
+
+from backend.app.core import cache, query_cache
+from backend.app.core.query_cache import SQLiteBackend, cache_requete
+
+
+@pytest.fixture
+def backend(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, "DATASET_VERSION_FILE", tmp_path / ".version")
+    monkeypatch.setattr(cache, "_abonnes_invalidation", [])
+    backend = SQLiteBackend(str(tmp_path / "query_cache.sqlite"))
+    monkeypatch.setattr(query_cache, "_backend", backend)
+    monkeypatch.setattr(query_cache, "_backend_initialise", True)
+    return backend
+
+
+def test_cle_depend_des_arguments_et_de_la_version(backend):
+    appels = []
+
+    @cache_requete()
+    async def lire(db, location_id):
+        appels.append(location_id)
+        return {"location_id": location_id}
+
+    async def scenario():
+        assert await lire(None, 1) == {"location_id": 1}
+        assert await lire("autre session", 1) == {"location_id": 1}
+        await lire(None, 2)
+        cache.marquer_donnees_modifiees()
+        await lire(None, 1)
+
+    asyncio.run(scenario())
+    # La session ne fait pas partie de la clé ; une écriture invalide les entrées existantes
+    assert appels == [1, 2, 1]
+
+
+def test_attente_cesse_a_la_liberation_du_verrou(backend):
+    """Un détenteur en échec ne publie rien : les autres workers ne l'attendent pas jusqu'au TTL"""
+    cle = "qc:test"
+
+    async def scenario():
+        assert await backend.acquerir_verrou(cle, query_cache.QUERY_CACHE_LOCK_TTL)
+        attente = asyncio.create_task(query_cache._attendre_resultat(backend, cle))
+        await asyncio.sleep(0.05)
+        await backend.liberer_verrou(cle)
+        debut = time.monotonic()
+        assert await attente is None
+        return time.monotonic() - debut
+
+    assert asyncio.run(scenario()) < 2
+
+
+def test_attente_recoit_le_resultat_publie(backend):
+    cle = "qc:test"
+
+    async def scenario():
+        assert await backend.acquerir_verrou(cle, query_cache.QUERY_CACHE_LOCK_TTL)
+        attente = asyncio.create_task(query_cache._attendre_resultat(backend, cle))
+        await backend.set(cle, b"[1]", 60)
+        await backend.liberer_verrou(cle)
+        return await attente
+
+    assert asyncio.run(scenario()) == b"[1]"